@@ -0,0 +1,47 @@
+"""Synthetic question dumps in the layout the extractor parses."""
+import random
+from typing import List
+
+WORDS = {
+    "ar": ["ما", "هو", "الذي", "في", "من", "على", "أي", "مما", "يلي", "العضو", "الخلية", "الدم", "القلب",
+           "الجهاز", "العصبي", "يعتبر", "أكثر", "أقل", "صحيح", "خطأ", "المرض", "العلاج", "الدواء"],
+    "en": ["which", "of", "the", "following", "is", "most", "least", "likely", "cell", "blood", "heart",
+           "nerve", "drug", "dose", "true", "false", "cause", "sign", "treatment", "except", "patient"],
+}
+OPTIONS = {"ar": "أبجده", "en": "abcde"}
+ANSWER = {"ar": "الجواب", "en": "answer"}
+NOTES = {"ar": ["ملاحظة", "توضيح", "شرح"], "en": ["note", "hint"]}
+
+def synthetic_corpus(questions: int, lang: str = "ar", lectures: int = 10, note_density: float = 0.2,
+                     seed: int = 7) -> str:
+    """A dump of `questions` questions split into `lectures` numbering runs.
+
+    note_density is the chance, per question, of each kind of note: an
+    inline note on the answer line, a keyword note line, and untagged lines
+    under the answer (what multiline_note collects).
+    """
+    rnd = random.Random(seed)
+    words, opts = WORDS[lang], OPTIONS[lang]
+    qmark = "؟" if lang == "ar" else "?"
+    per_lecture = max(1, questions // max(1, lectures))
+
+    def text(lo: int, hi: int) -> str:
+        return " ".join(rnd.choices(words, k=rnd.randint(lo, hi)))
+
+    out: List[str] = []
+    for i in range(questions):
+        out.append(f"{i % per_lecture + 1}{rnd.choice('.-)')} {text(6, 16)}{qmark}")
+        if rnd.random() < 0.3:
+            out.append(text(5, 12))
+        for ch in opts[:rnd.randint(3, 5)]:
+            out.append(f"{ch}) {text(1, 5)}")
+        answer = f"{ANSWER[lang]}: {rnd.choice(opts[:3])}"
+        if rnd.random() < note_density:
+            answer += f" {rnd.choice(NOTES[lang])}: {text(3, 8)}"
+        out.append(answer)
+        if rnd.random() < note_density:
+            out.append(f"{rnd.choice(NOTES[lang])}: {text(4, 10)}")
+        if rnd.random() < note_density:
+            out.extend(text(4, 10) for _ in range(rnd.randint(1, 3)))
+        out.append("")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,110 @@
+"""QuestionParser throughput and memory over every option combination.
+
+    python -m benchmarks.parser_bench                      # compare with baseline.json
+    python -m benchmarks.parser_bench --update-baseline    # record this machine's numbers
+    python -m benchmarks.parser_bench --questions 50000 --lang en --note-density 0.5
+
+Exits with status 1 when a case is slower (lines/s) or uses more peak
+memory than the baseline by more than --threshold. Numbers depend on the
+machine, so record the baseline on the machine that runs the comparison.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from benchmarks.corpus import synthetic_corpus
+from core.parser import QuestionParser
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+OPTION_NAMES = ("split_lectures", "inline_note", "multiline_note")
+
+Results = Dict[str, Dict[str, float]]
+
+def option_sets() -> List[Dict[str, bool]]:
+    return [dict(zip(OPTION_NAMES, flags)) for flags in itertools.product((False, True), repeat=len(OPTION_NAMES))]
+
+def case_name(options: Dict[str, bool]) -> str:
+    return "+".join(k for k in OPTION_NAMES if options[k]) or "default"
+
+def measure(path: str, options: Dict[str, bool], repeat: int = 3) -> Dict[str, float]:
+    """Best-of-repeat lines/s of parse_text, and its peak traced memory in KiB (from a separate run)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = sum(1 for _ in f)
+    # Built-in keyword defaults, whatever the local config.json says
+    parser = QuestionParser(config_path=path + ".no-config")
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse_text(path, **options)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        parser.parse_text(path, **options)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"lines_per_s": lines / best, "peak_kib": peak / 1024}
+
+def run(questions: int, lang: str, note_density: float, repeat: int) -> Results:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(synthetic_corpus(questions, lang=lang, note_density=note_density))
+        return {case_name(o): measure(path, o, repeat) for o in option_sets()}
+
+def regressions(results: Results, baseline: Results, threshold: float) -> List[str]:
+    """Cases slower or hungrier than baseline by more than threshold (a fraction)."""
+    found = []
+    for case, base in baseline.items():
+        now = results.get(case)
+        if now is None: continue
+        if now["lines_per_s"] < base["lines_per_s"] * (1 - threshold):
+            found.append(f"{case}: {now['lines_per_s']:,.0f} lines/s vs {base['lines_per_s']:,.0f}")
+        if now["peak_kib"] > base["peak_kib"] * (1 + threshold):
+            found.append(f"{case}: {now['peak_kib']:,.0f} KiB peak vs {base['peak_kib']:,.0f}")
+    return found
+
+def main(argv: List[str] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--questions", type=int, default=20000)
+    ap.add_argument("--lang", choices=("ar", "en"), default="ar")
+    ap.add_argument("--note-density", type=float, default=0.2)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--update-baseline", action="store_true")
+    args = ap.parse_args(argv)
+
+    corpus = {"questions": args.questions, "lang": args.lang, "note_density": args.note_density}
+    results = run(args.questions, args.lang, args.note_density, args.repeat)
+    print(f"{'case':<44}{'lines/s':>12}{'peak KiB':>12}")
+    for case, r in results.items():
+        print(f"{case:<44}{r['lines_per_s']:>12,.0f}{r['peak_kib']:>12,.0f}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"corpus": corpus, "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with; run with --update-baseline first.")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline: Dict[str, Any] = json.load(f)
+    if baseline.get("corpus") != corpus:
+        print(f"Baseline was recorded for {baseline.get('corpus')}; not comparable with {corpus}.")
+        return 0
+    found = regressions(results, baseline["results"], args.threshold)
+    for line in found:
+        print("REGRESSION " + line)
+    return 1 if found else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
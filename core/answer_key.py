@@ -0,0 +1,166 @@
+# --- START OF FILE core/answer_key.py ---
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from core.bank_store import bank_storage, open_bank
+from core.parser import QUESTION_NUM_RE, OPTION_RE, option_index
+
+ANSWER_KEY_FILE = "answer_key.json"
+MARK_OVERLAP = 0.5      # Share of an option line a highlight or fill must cover
+BOLD_SHARE = 0.6        # Share of an option's characters that must be bold
+_MARK_ANNOTS = (fitz.PDF_ANNOT_HIGHLIGHT, fitz.PDF_ANNOT_UNDERLINE, fitz.PDF_ANNOT_SQUIGGLY)
+_BOLD_FLAG = 16
+
+AnswerKey = Dict[Tuple[int, int], List[int]]  # (lecture, question number) -> marked options
+
+def _coloured(color: Optional[Tuple[float, ...]]) -> bool:
+    """A visible tint: not white paper and not black/grey ink."""
+    if not color or len(color) < 3: return False
+    return max(color) - min(color) > 0.15 and min(color) < 0.95
+
+def _covered(line: fitz.Rect, marks: List[fitz.Rect]) -> bool:
+    area = line.get_area()
+    if area <= 0: return False
+    return any((line & m).get_area() / area >= MARK_OVERLAP for m in marks)
+
+def page_marks(page: fitz.Page) -> List[fitz.Rect]:
+    """Highlight-style annotations and coloured fills that sit behind a line of text."""
+    marks = []
+    for annot in page.annots(types=_MARK_ANNOTS) or ():
+        quads = annot.vertices
+        if quads:
+            # One rect per marked line, so a multi-line highlight doesn't cover the gap between lines
+            marks.extend(fitz.Quad(quads[i:i + 4]).rect for i in range(0, len(quads), 4))
+        else:
+            marks.append(annot.rect)
+    for d in page.get_drawings():
+        r = d.get("rect")
+        # Page backgrounds and table shading are taller than a few lines
+        if r is not None and d.get("fill") is not None and _coloured(d["fill"]) and 0 < r.height < 60:
+            marks.append(r)
+    return marks
+
+def _page_lines(page: fitz.Page):
+    """(text, bbox, bold character share) per text line, in reading order."""
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT, sort=True)["blocks"]:
+        for line in block.get("lines", ()):
+            spans = line["spans"]
+            text = "".join(s["text"] for s in spans).strip()
+            if not text: continue
+            total = sum(len(s["text"].strip()) for s in spans) or 1
+            bold = sum(len(s["text"].strip()) for s in spans
+                       if s["flags"] & _BOLD_FLAG or "bold" in s["font"].lower())
+            yield text, fitz.Rect(line["bbox"]), bold / total
+
+def lecture_numbers(nums: Iterable[Optional[int]]) -> List[Optional[Tuple[int, int]]]:
+    """(lecture, number) per question number, None staying None.
+
+    Numbering restarts in every lecture, so a number lower than the one
+    before starts the next lecture (the rule lecture_events splits banks by).
+    """
+    keys: List[Optional[Tuple[int, int]]] = []
+    lecture, last = 1, 0
+    for num in nums:
+        if num is None:
+            keys.append(None)
+            continue
+        if num < last: lecture += 1
+        last = num
+        keys.append((lecture, num))
+    return keys
+
+def _marked(options: List[Tuple[int, bool, float]]) -> Optional[List[int]]:
+    if len(options) < 2: return None
+    marked = [i for i, hit, _ in options if hit]
+    if not marked or len(marked) == len(options):
+        marked = [i for i, _, bold in options if bold >= BOLD_SHARE]
+    return sorted(set(marked)) if marked and len(marked) < len(options) else None
+
+def _document_answers(doc: fitz.Document) -> List[Tuple[int, Optional[List[int]]]]:
+    """(number, marked options or None) for each question line of a document, in order."""
+    questions: List[Tuple[int, List[Tuple[int, bool, float]]]] = []
+    for page in doc:
+        marks = page_marks(page)
+        for text, bbox, bold in _page_lines(page):
+            q = QUESTION_NUM_RE.match(text)
+            if q:
+                questions.append((int(q.group(1)), []))
+                continue
+            opt = OPTION_RE.match(text)
+            if opt and questions:
+                questions[-1][1].append((option_index(opt.group(1)), _covered(bbox, marks), bold))
+    return [(num, _marked(options)) for num, options in questions]
+
+def _answer_key(answers: List[Tuple[int, Optional[List[int]]]]) -> AnswerKey:
+    key: AnswerKey = {}
+    for k, (_, answer) in zip(lecture_numbers(num for num, _ in answers), answers):
+        if answer is None: continue
+        if k in key and key[k] != answer:
+            logging.warning("Question %s of lecture %s is marked differently twice; keeping the first", k[1], k[0])
+            continue
+        key.setdefault(k, answer)
+    return key
+
+def extract_answer_key(doc: fitz.Document) -> AnswerKey:
+    """Reads the marked option of every question in a document.
+
+    Options are the lines the text parser would take as options, grouped
+    under the question number line before them. An option counts as marked
+    when a highlight/underline annotation or a coloured fill covers it, or
+    when it is bold and its siblings are not. Questions where every option
+    looks marked (a highlighted block, an all-bold layout) are left out.
+    """
+    return _answer_key(_document_answers(doc))
+
+def apply_answer_key(bank: List[Dict[str, Any]], key: AnswerKey) -> int:
+    """Writes correct_options into bank questions by (lecture, number); returns how many changed."""
+    nums = []
+    for q in bank:
+        m = QUESTION_NUM_RE.match(q.get("question", ""))
+        nums.append(int(m.group(1)) if m else None)
+    changed = 0
+    for q, k in zip(bank, lecture_numbers(nums)):
+        answer = key.get(k) if k is not None else None
+        if answer is not None and q.get("correct_options") != answer:
+            q["correct_options"] = answer
+            changed += 1
+    return changed
+
+def write_answer_key(folder: str, key: AnswerKey) -> Tuple[str, int]:
+    """Patches the bank next to an export folder, or saves ANSWER_KEY_FILE there.
+
+    folder is where the images went: the bank is looked up in it and in its
+    parent (the usual <bank>/images layout). Returns (written path, answers applied).
+    """
+    for bank_folder in (folder, os.path.dirname(folder)):
+        if bank_storage(bank_folder) is None: continue
+        with open_bank(bank_folder) as store:
+            bank = store.load_all()
+            before = [q.get("correct_options") for q in bank]
+            changed = apply_answer_key(bank, key)
+            store.update_many({i: q for i, q in enumerate(bank) if q.get("correct_options") != before[i]})
+            return store.path, changed
+    path = os.path.join(folder, ANSWER_KEY_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(_key_json(key), f, indent=2, ensure_ascii=False)
+    return path, len(key)
+
+def _key_json(key: AnswerKey) -> Dict[str, Dict[str, List[int]]]:
+    """{lecture: {number: answer}} with string keys, as ANSWER_KEY_FILE stores it."""
+    out: Dict[str, Dict[str, List[int]]] = {}
+    for (lecture, num), answer in sorted(key.items()):
+        out.setdefault(str(lecture), {})[str(num)] = answer
+    return out
+
+def extract_documents_key(docs: List[fitz.Document]) -> AnswerKey:
+    """Key of several documents read in order as one sequence.
+
+    A document that starts over at 1 is the next lecture, as when their
+    crops are exported into one bank; an earlier mark wins on repeats.
+    """
+    return _answer_key([a for doc in docs for a in _document_answers(doc)])
+# --- END OF FILE core/answer_key.py ---
@@ -0,0 +1,244 @@
+# --- START OF FILE core/bank_store.py ---
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+BANK_JSON = "bank.json"
+BANK_DB = "bank.db"
+STORAGES = ("json", "sqlite")
+LOCK_TIMEOUT = 5.0  # Seconds to wait for a bank.db another window is writing
+
+Question = Dict[str, Any]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_pos ON questions(pos);
+"""
+
+def bank_storage(folder: str) -> Optional[str]:
+    """Backend a bank folder is stored in, or None if it holds no bank. bank.db wins over bank.json."""
+    if os.path.exists(os.path.join(folder, BANK_DB)): return "sqlite"
+    if os.path.exists(os.path.join(folder, BANK_JSON)): return "json"
+    return None
+
+def _dumps(q: Question) -> str:
+    return json.dumps(q, ensure_ascii=False)
+
+class JsonBankStore:
+    """A bank as one bank.json array: the format every bank had before bank.db.
+
+    Each change rewrites the whole file, through a temp file so a crash
+    never leaves a half-written bank.
+    """
+    storage = "json"
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.path = os.path.join(folder, BANK_JSON)
+        self._data: Optional[List[Question]] = None
+
+    def _questions(self) -> List[Question]:
+        if self._data is None:
+            self._data = []
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+        return self._data
+
+    def _flush(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._questions(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def load_all(self) -> List[Question]:
+        return list(self._questions())
+
+    def count(self) -> int:
+        return len(self._questions())
+
+    def get(self, index: int) -> Question:
+        if not 0 <= index < self.count(): raise IndexError(index)
+        return self._questions()[index]
+
+    def update(self, index: int, q: Question) -> None:
+        self.update_many({index: q})
+
+    def update_many(self, changes: Dict[int, Question]) -> None:
+        if not changes: return
+        data = self._questions()
+        for index, q in changes.items():
+            if not 0 <= index < len(data): raise IndexError(index)
+            data[index] = q
+        self._flush()
+
+    def delete(self, index: int) -> None:
+        if not 0 <= index < self.count(): raise IndexError(index)
+        self._questions().pop(index)
+        self._flush()
+
+    def replace_all(self, questions: Iterable[Question]) -> None:
+        self._data = list(questions)
+        self._flush()
+
+    def close(self) -> None:
+        self._data = None
+
+    def __enter__(self) -> "JsonBankStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+class SqliteBankStore:
+    """A bank as bank.db: one row per question, ordered by an indexed position.
+
+    Rows hold the question's JSON exactly as bank.json would, so export is
+    lossless. Every change is its own transaction and only touches the
+    rows it concerns; a delete also shifts the positions after it.
+    """
+    storage = "sqlite"
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.path = os.path.join(folder, BANK_DB)
+        self.conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT)
+        self.conn.executescript(_SCHEMA)
+
+    def load_all(self) -> List[Question]:
+        return [json.loads(d) for d, in self.conn.execute("SELECT data FROM questions ORDER BY pos")]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def get(self, index: int) -> Question:
+        row = self.conn.execute("SELECT data FROM questions WHERE pos = ?", (index,)).fetchone()
+        if row is None: raise IndexError(index)
+        return json.loads(row[0])
+
+    def update(self, index: int, q: Question) -> None:
+        self.update_many({index: q})
+
+    def update_many(self, changes: Dict[int, Question]) -> None:
+        with self.conn:
+            for index, q in changes.items():
+                if self.conn.execute("UPDATE questions SET data = ? WHERE pos = ?", (_dumps(q), index)).rowcount == 0:
+                    raise IndexError(index)  # Rolls back the whole batch
+
+    def delete(self, index: int) -> None:
+        with self.conn:
+            if self.conn.execute("DELETE FROM questions WHERE pos = ?", (index,)).rowcount == 0:
+                raise IndexError(index)
+            self.conn.execute("UPDATE questions SET pos = pos - 1 WHERE pos > ?", (index,))
+
+    def replace_all(self, questions: Iterable[Question]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM questions")
+            self.conn.executemany("INSERT INTO questions (pos, data) VALUES (?, ?)",
+                                  ((i, _dumps(q)) for i, q in enumerate(questions)))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "SqliteBankStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+BankStore = Union[JsonBankStore, SqliteBankStore]
+
+def open_bank(folder: str, default: str = "json") -> BankStore:
+    """The store of a bank folder, in the backend it is saved in (default for a new bank)."""
+    storage = bank_storage(folder) or default
+    return SqliteBankStore(folder) if storage == "sqlite" else JsonBankStore(folder)
+
+class BankWriter:
+    """Writes a new bank question by question into a temp file, then moves it into its folder.
+
+    The folder is only needed at commit, so a bank can be streamed before
+    its name is known. JSON output has the same bytes as json.dump(indent=2).
+    """
+    def __init__(self, tmp_base: str, storage: str = "json") -> None:
+        if storage not in STORAGES: raise ValueError(f"Unknown bank storage: {storage}")
+        self.storage = storage
+        self.tmp_path = tmp_base + (".db.tmp" if storage == "sqlite" else ".json.tmp")
+        self._count = 0
+        if os.path.exists(self.tmp_path): os.remove(self.tmp_path)
+        if storage == "sqlite":
+            self._conn = sqlite3.connect(self.tmp_path)
+            self._conn.executescript(_SCHEMA)
+        else:
+            self._file = open(self.tmp_path, 'w', encoding='utf-8')
+            self._file.write("[")
+
+    def add(self, q: Question) -> None:
+        if self.storage == "sqlite":
+            self._conn.execute("INSERT INTO questions (pos, data) VALUES (?, ?)", (self._count, _dumps(q)))
+        else:
+            if self._count: self._file.write(",")
+            # json.dump(list, indent=2) renders each item one level deeper
+            self._file.write("\n  " + json.dumps(q, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+        self._count += 1
+
+    def commit(self, folder: str) -> str:
+        """Moves the bank into folder, replacing any bank there in either backend; returns its path."""
+        if self.storage == "sqlite":
+            self._conn.commit()
+            self._conn.close()
+            name, other = BANK_DB, BANK_JSON
+        else:
+            self._file.write("\n]" if self._count else "]")
+            self._file.close()
+            name, other = BANK_JSON, BANK_DB
+        path = os.path.join(folder, name)
+        os.replace(self.tmp_path, path)
+        if os.path.exists(os.path.join(folder, other)): os.remove(os.path.join(folder, other))
+        return path
+
+    def abort(self) -> None:
+        if self.storage == "sqlite":
+            self._conn.close()
+        else:
+            self._file.close()
+        if os.path.exists(self.tmp_path): os.remove(self.tmp_path)
+
+def write_bank(folder: str, questions: Iterable[Question], storage: str = "json") -> str:
+    """Saves questions as the bank of folder in the given backend; returns the bank file."""
+    writer = BankWriter(os.path.join(folder, ".bank"), storage)
+    try:
+        for q in questions:
+            writer.add(q)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit(folder)
+
+def export_json(folder: str, json_path: str) -> int:
+    """Writes a bank (either backend) to a bank.json-format file; returns the question count."""
+    with open_bank(folder) as store:
+        data = store.load_all()
+    tmp = json_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, json_path)
+    return len(data)
+
+def import_json(json_path: str, folder: str, storage: str = "sqlite") -> str:
+    """Makes a bank.json-format file the bank of folder; returns the bank file."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return write_bank(folder, data, storage)
+
+def convert_bank(folder: str, storage: str) -> str:
+    """Moves a bank to the other backend in place; returns the new bank file."""
+    with open_bank(folder) as store:
+        if store.storage == storage: return store.path
+        data = store.load_all()
+    return write_bank(folder, data, storage)
+# --- END OF FILE core/bank_store.py ---
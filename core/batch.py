@@ -0,0 +1,81 @@
+# --- START OF FILE core/batch.py ---
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.parser import QuestionParser, source_lines
+
+SOURCE_EXTS = ('.txt', '.pdf')
+
+Job = Tuple[str, str]  # (source file, bank folder name)
+
+def collect_sources(paths: Iterable[str]) -> List[str]:
+    """Question sources (.txt, .pdf) among paths, with folders expanded (not recursively) in name order."""
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            with os.scandir(p) as it:
+                found = [e.path for e in it if e.is_file() and e.name.lower().endswith(SOURCE_EXTS)]
+            files.extend(sorted(found, key=lambda f: os.path.basename(f).lower()))
+        elif p.lower().endswith(SOURCE_EXTS):
+            files.append(p)
+    return files
+
+def plan_jobs(files: List[str], group: str = "") -> List[Job]:
+    """Bank folder name per file: its stem, under group when given.
+
+    Two files with the same stem (from different folders) get "_2", "_3", ...
+    so neither overwrites the other's bank.
+    """
+    jobs, seen = [], {}
+    for f in files:
+        stem = os.path.splitext(os.path.basename(f))[0]
+        n = seen[stem.lower()] = seen.get(stem.lower(), 0) + 1
+        name = stem if n == 1 else f"{stem}_{n}"
+        jobs.append((f, os.path.join(group, name) if group else name))
+    return jobs
+
+def convert_file(path: str, base_name: str, options: Dict[str, Any], create_img_folder: bool = True,
+                 config_path: str = "config.json") -> Dict[str, Any]:
+    """Parses one file and writes its banks. Runs in a worker process, so it only takes and returns plain data."""
+    start = time.perf_counter()
+    parser = QuestionParser(config_path)
+    questions = lines = 0
+
+    def counted(events):
+        nonlocal questions
+        for kind, value in events:
+            if kind == "question": questions += 1
+            yield kind, value
+
+    def lines_of(f):
+        nonlocal lines
+        for line in f:
+            lines += 1
+            yield line
+
+    with source_lines(path) as src:
+        banks = parser.save_banks_stream(counted(parser.parse_lines(lines_of(src), **options)), base_name, create_img_folder)
+    return {"path": path, "banks": banks, "questions": questions, "lines": lines,
+            "bytes": os.path.getsize(path), "seconds": time.perf_counter() - start}
+
+def convert_batch(jobs: List[Job], options: Dict[str, Any], create_img_folder: bool = True,
+                  workers: Optional[int] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """Converts jobs on a process pool, yielding (path, result, error) as each file finishes.
+
+    Workers are spawned rather than forked: the caller is usually a Qt
+    process with live threads, which fork does not copy safely.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(convert_file, path, name, options, create_img_folder, os.path.abspath("config.json")): path
+                   for path, name in jobs}
+        for fut in as_completed(futures):
+            try:
+                yield futures[fut], fut.result(), None
+            except Exception as e:
+                yield futures[fut], None, str(e) or type(e).__name__
+# --- END OF FILE core/batch.py ---
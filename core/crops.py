@@ -0,0 +1,203 @@
+# --- START OF FILE core/crops.py ---
+import itertools
+from collections import defaultdict
+from collections.abc import MutableSequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+GRID_CELL = 256.0  # Spatial index cell size in scene units (~85pt at PDF_ZOOM)
+
+_uids = itertools.count(1)
+
+class Crop:
+    """One crop rectangle in scene coordinates plus its linking info.
+
+    Slotted and Qt-free, so tens of thousands of them stay small and a
+    session can be pickled or written without a QApplication. Treated as
+    immutable: edits go through replace() and return a new record.
+
+    Every crop gets a uid when created; replace() keeps it, so scene items
+    can follow a crop through edits and undo.
+    """
+    __slots__ = ('x', 'y', 'w', 'h', 'id', 'order', 'is_note', 'uid')
+
+    def __init__(self, x: float, y: float, w: float, h: float, id: Optional[int] = None,
+                 order: Optional[int] = None, is_note: bool = False, uid: Optional[int] = None) -> None:
+        self.x, self.y, self.w, self.h = float(x), float(y), float(w), float(h)
+        self.id, self.order, self.is_note = id, order, is_note
+        self.uid = uid if uid is not None else next(_uids)
+
+    @classmethod
+    def from_rect(cls, rect: Any, **fields: Any) -> "Crop":
+        """Builds a crop from anything with QRectF-style left()/top()/right()/bottom()."""
+        return cls(rect.left(), rect.top(), rect.right() - rect.left(), rect.bottom() - rect.top(), **fields)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Crop":
+        """Converts the legacy {'rect': QRectF, 'id', 'order', 'is_note'} form."""
+        return cls.from_rect(d['rect'], id=d.get('id'), order=d.get('order'),
+                             is_note=d.get('is_note', False), uid=d.get('uid'))
+
+    @property
+    def left(self) -> float: return self.x
+    @property
+    def top(self) -> float: return self.y
+    @property
+    def right(self) -> float: return self.x + self.w
+    @property
+    def bottom(self) -> float: return self.y + self.h
+
+    def geometry(self) -> Tuple[float, float, float, float]:
+        return self.x, self.y, self.w, self.h
+
+    def replace(self, **changes: Any) -> "Crop":
+        fields = {k: getattr(self, k) for k in self.__slots__}
+        fields.update(changes)
+        return Crop(**fields)
+
+    def with_rect(self, rect: Any) -> "Crop":
+        return self.replace(x=rect.left(), y=rect.top(), w=rect.right() - rect.left(), h=rect.bottom() - rect.top())
+
+    def intersects(self, x: float, y: float, w: float, h: float) -> bool:
+        return self.x < x + w and x < self.right and self.y < y + h and y < self.bottom
+
+    def contains(self, px: float, py: float) -> bool:
+        return self.x <= px <= self.right and self.y <= py <= self.bottom
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        for k, v in zip(self.__slots__, state): setattr(self, k, v)
+
+    def __repr__(self) -> str:
+        return (f"Crop({self.x:g}, {self.y:g}, {self.w:g}, {self.h:g}, id={self.id!r}, "
+                f"order={self.order!r}, is_note={self.is_note!r})")
+
+def as_crop(obj: Any) -> Crop:
+    return obj if isinstance(obj, Crop) else Crop.from_dict(obj)
+
+def _cells(x: float, y: float, w: float, h: float) -> Iterator[Tuple[int, int]]:
+    for cx in range(int(x // GRID_CELL), int((x + w) // GRID_CELL) + 1):
+        for cy in range(int(y // GRID_CELL), int((y + h) // GRID_CELL) + 1):
+            yield cx, cy
+
+class PageCrops(MutableSequence):
+    """The crops of one page in display order, with a uniform-grid spatial index.
+
+    Behaves like a list (the undo commands only need insert/pop/item and
+    slice assignment) while keeping the grid current, so hit tests and
+    overlap queries only look at crops in nearby cells. It also counts
+    neighbours out of reading order, so sorted_position needs no scan.
+    """
+    def __init__(self, crops: Iterable[Crop] = ()) -> None:
+        self._items: List[Crop] = []
+        self._grid: Dict[Tuple[int, int], List[Crop]] = defaultdict(list)
+        self._unsorted = 0  # adjacent pairs where the upper crop comes second
+        for c in crops: self.append(c)
+
+    def _descending(self, i: int) -> int:
+        """1 if crops i and i + 1 both exist and are out of reading order."""
+        return int(0 <= i < len(self._items) - 1 and self._items[i].y > self._items[i + 1].y)
+
+    def _recount(self) -> None:
+        self._unsorted = sum(self._descending(i) for i in range(len(self._items) - 1))
+
+    def _index(self, crop: Crop) -> None:
+        for cell in _cells(*crop.geometry()): self._grid[cell].append(crop)
+
+    def _unindex(self, crop: Crop) -> None:
+        for cell in _cells(*crop.geometry()):
+            bucket = self._grid[cell]
+            for i, c in enumerate(bucket):
+                if c is crop:
+                    del bucket[i]
+                    break
+            if not bucket: del self._grid[cell]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def __setitem__(self, i, value) -> None:
+        if isinstance(i, slice):
+            old, new = self._items[i], [as_crop(c) for c in value]
+            for c in old: self._unindex(c)
+            self._items[i] = new
+            for c in new: self._index(c)
+            self._recount()
+            return
+        value = as_crop(value)
+        i = range(len(self._items))[i]
+        self._unsorted -= self._descending(i - 1) + self._descending(i)
+        self._unindex(self._items[i])
+        self._items[i] = value
+        self._index(value)
+        self._unsorted += self._descending(i - 1) + self._descending(i)
+
+    def __delitem__(self, i) -> None:
+        if isinstance(i, slice):
+            for c in self._items[i]: self._unindex(c)
+            del self._items[i]
+            self._recount()
+            return
+        i = range(len(self._items))[i]
+        self._unsorted -= self._descending(i - 1) + self._descending(i)
+        self._unindex(self._items[i])
+        del self._items[i]
+        self._unsorted += self._descending(i - 1)
+
+    def insert(self, i: int, value: Crop) -> None:
+        value = as_crop(value)
+        i = min(max(i + len(self._items) if i < 0 else i, 0), len(self._items))  # list.insert's clamping
+        self._unsorted -= self._descending(i - 1)
+        self._items.insert(i, value)
+        self._index(value)
+        self._unsorted += self._descending(i - 1) + self._descending(i)
+
+    def __eq__(self, other: Any) -> bool:
+        return list(self) == list(other) if isinstance(other, (PageCrops, list)) else NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PageCrops({self._items!r})"
+
+    def sorted_position(self, top: float) -> Optional[int]:
+        """Insert position keeping the page in reading order; None if it is not sorted."""
+        if self._unsorted: return None
+        lo, hi = 0, len(self._items)
+        while lo < hi:  # bisect_right on y (bisect's key= needs Python 3.10)
+            mid = (lo + hi) // 2
+            if top < self._items[mid].y: hi = mid
+            else: lo = mid + 1
+        return lo
+
+    def query(self, x: float, y: float, w: float, h: float) -> List[Crop]:
+        """Crops whose area overlaps the rectangle, top to bottom."""
+        seen, hits = set(), []
+        for cell in _cells(x, y, w, h):
+            for c in self._grid.get(cell, ()):
+                if id(c) not in seen and c.intersects(x, y, w, h):
+                    seen.add(id(c))
+                    hits.append(c)
+        hits.sort(key=lambda c: (c.y, c.x))
+        return hits
+
+    def at(self, px: float, py: float) -> List[Crop]:
+        """Crops containing the point (edges included), top to bottom."""
+        cell = (int(px // GRID_CELL), int(py // GRID_CELL))
+        return sorted((c for c in self._grid.get(cell, ()) if c.contains(px, py)), key=lambda c: (c.y, c.x))
+
+    def overlapping(self, crop: Crop) -> List[Crop]:
+        """Other crops on this page whose area overlaps crop, top to bottom."""
+        return [c for c in self.query(*crop.geometry()) if c is not crop]
+
+class CropPages(dict):
+    """page index -> PageCrops; plain lists stored into it are converted."""
+    def __setitem__(self, page: int, crops: Iterable[Crop]) -> None:
+        super().__setitem__(page, crops if isinstance(crops, PageCrops) else PageCrops(crops))
+
+    def setdefault(self, page: int, default: Iterable[Crop] = ()) -> PageCrops:
+        if page not in self: self[page] = default
+        return self[page]
+# --- END OF FILE core/crops.py ---
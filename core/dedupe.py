@@ -0,0 +1,105 @@
+# --- START OF FILE core/dedupe.py ---
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from core.pdf_ops import render_page_gray
+
+HASH_SIZE = 16          # dHash grid; 16 gives a 256-bit hash
+HASH_RENDER_WIDTH = 128  # Pages are rendered this small before hashing
+MAX_DISTANCE = 24        # Hamming distance still treated as the same page (~10% of the bits)
+_BLANK_STD = 2.0         # Renders flatter than this are blank pages, never duplicates
+BUCKET_CAP = 200         # Bands shared by more hashes than this (blank margins) carry no signal
+_EDGE_DELTA = 4          # Brightness step that counts as an edge; flat paper must not flip bits on scan noise
+
+Fingerprint = Tuple[Optional[int], Optional[str]]
+
+def dhash(gray: np.ndarray, size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a size x size grid."""
+    small = np.asarray(Image.fromarray(gray).resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] - small[:, :-1] > _EDGE_DELTA).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+def text_hash(text: str) -> Optional[str]:
+    norm = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest() if norm else None
+
+def fingerprint_page(file_entry) -> Fingerprint:
+    """(dHash of a low-res render or None for blank pages, text-layer hash or None)."""
+    file_type, file_obj, extra = file_entry
+    txt = text_hash(file_obj.load_page(extra).get_text("text")) if file_type == 'pdf' else None
+    gray, _ = render_page_gray(file_type, file_obj, extra, HASH_RENDER_WIDTH)
+    return (dhash(gray) if gray.std() >= _BLANK_STD else None), txt
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def find_duplicates(fingerprints: Sequence[Fingerprint], max_distance: int = MAX_DISTANCE,
+                    bits: int = HASH_SIZE * HASH_SIZE) -> Dict[int, int]:
+    """Maps each duplicate page to the first page it repeats.
+
+    Pages with a text layer on both sides compare by text hash only; the
+    image hash is used when either side is a scan. Near-identical image
+    hashes are found by banding: split into max_distance + 1 bands, any
+    two hashes within max_distance share at least one band exactly, so only
+    pages sharing a band bucket are ever compared.
+    """
+    parent = list(range(len(fingerprints)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a: int, b: int) -> None:
+        ra, rb = find(a), find(b)
+        if ra != rb: parent[max(ra, rb)] = min(ra, rb)
+
+    by_text: Dict[str, List[int]] = defaultdict(list)
+    by_hash: Dict[int, List[int]] = defaultdict(list)
+    for i, (h, txt) in enumerate(fingerprints):
+        if txt: by_text[txt].append(i)
+        if h is not None: by_hash[h].append(i)
+    for pages in by_text.values():
+        for p in pages[1:]: union(pages[0], p)
+
+    def comparable(a: int, b: int) -> bool:
+        ta, tb = fingerprints[a][1], fingerprints[b][1]
+        return not (ta and tb) or ta == tb
+
+    def link(group_a: List[int], group_b: List[int]) -> None:
+        for a in group_a:
+            for b in group_b:
+                if a != b and comparable(a, b): union(a, b)
+
+    for pages in by_hash.values():
+        link(pages, pages)
+
+    n_bands = max_distance + 1
+    width = max(1, bits // n_bands)
+    mask = (1 << width) - 1
+    buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for h in by_hash:
+        for band in range(n_bands):
+            buckets[(band, (h >> (band * width)) & mask)].append(h)
+    # Two text pages were already settled by their text, so only pairs with a scan are compared
+    scan = {h: any(fingerprints[p][1] is None for p in pages) for h, pages in by_hash.items()}
+    checked = set()
+    for hashes in buckets.values():
+        if len(hashes) > BUCKET_CAP: continue
+        for ha in hashes:
+            if not scan[ha]: continue
+            for hb in hashes:
+                key = (ha, hb) if ha < hb else (hb, ha)
+                if ha == hb or key in checked: continue
+                checked.add(key)
+                if _hamming(ha, hb) <= max_distance:
+                    link(by_hash[ha], by_hash[hb])
+
+    return {i: find(i) for i in range(len(fingerprints)) if find(i) != i}
+# --- END OF FILE core/dedupe.py ---
@@ -0,0 +1,167 @@
+# --- START OF FILE core/incremental.py ---
+import difflib
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.bank_store import BankStore, open_bank
+from core.parser import QuestionParser, apply_key_tables, lecture_events, source_lines
+
+Block = List[str]
+Entry = Tuple[str, Dict[str, Any]]  # (block hash, parsed question)
+Record = List[Tuple[str, str, bool]]  # (block hash, question label, still in the bank) per source question
+
+def question_blocks(parser: QuestionParser, lines: Iterable[str]) -> List[Block]:
+    """Lines grouped from each question line up to the next; block 0 holds any preamble.
+
+    Every question line resets the parser's state, so a block parses the
+    same on its own as inside the whole file.
+    """
+    blocks: List[Block] = [[]]
+    for line in lines:
+        if parser.re_num.match(line.strip()):
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+def block_hash(block: Block) -> str:
+    return hashlib.sha1("".join(block).encode("utf-8")).hexdigest()
+
+class IncrementalBanks:
+    """Keeps the banks of one source file up to date as the file is edited.
+
+    Only questions whose block text changed are parsed again. A bank whose
+    questions changed is patched: entries of unchanged questions are kept
+    as they are on disk (with any later edits, e.g. from the viewer), and
+    only changed, inserted or removed questions are touched. When no
+    question was inserted or removed, just the changed rows are rewritten.
+    Questions deleted in the viewer stay deleted until their source changes.
+    """
+    def __init__(self, parser: QuestionParser, file_path: str, base_folder: str, options: Dict[str, bool],
+                 create_img_folder: bool = True) -> None:
+        self.parser = parser
+        self.file_path = file_path
+        self.base_folder = base_folder
+        self.options = options
+        self.create_img_folder = create_img_folder
+        self._parsed: Dict[str, Optional[Tuple[int, Dict[str, Any]]]] = {}  # block hash -> parsed question
+        self._banks: Dict[str, Record] = {}  # suffix -> its source questions as last written
+        self._file_hash: Optional[str] = None
+
+    def _parse_block(self, h: str, block: Block) -> Optional[Tuple[int, Dict[str, Any]]]:
+        if h not in self._parsed:
+            found = list(self.parser.parse_questions(block, self.options.get("inline_note", False),
+                                                     self.options.get("multiline_note", False)))
+            self._parsed[h] = found[0] if found else None
+        return self._parsed[h]
+
+    def refresh(self) -> Dict[str, int]:
+        """Re-reads the source and updates its banks; returns {bank folder: questions written}."""
+        with source_lines(self.file_path) as src:
+            lines = list(src)
+        file_hash = hashlib.sha1("".join(lines).encode("utf-8")).hexdigest()
+        if file_hash == self._file_hash: return {}
+
+        numbered = self._keyed(lines) if self.options.get("answer_key") else self._numbered(lines)
+
+        banks: Dict[str, List[Entry]] = {}
+        current: List[Entry] = []
+        for kind, value in lecture_events(numbered, self.options.get("split_lectures", False)):
+            if kind == "question":
+                current.append(value)
+            else:
+                banks[value] = current
+                current = []
+
+        written = {}
+        for suffix, entries in banks.items():
+            old = self._banks.get(suffix)
+            if old is not None and [h for h, _, _ in old] == [h for h, _ in entries]: continue
+            full_path = self.parser.bank_folder(self.base_folder + suffix, self.create_img_folder)
+            with open_bank(full_path, self.parser.config.get('bank_storage', 'json')) as store:
+                written[full_path], self._banks[suffix] = self._patch(store, old, entries)
+        # Only now: a refresh that failed half-way must not make the same content look done
+        self._file_hash = file_hash
+        return written
+
+    def _numbered(self, lines: List[str]) -> List[Tuple[int, Tuple[str, Dict[str, Any]]]]:
+        """(number, (block hash, question)), parsing only blocks not seen before."""
+        numbered = []
+        live = set()
+        for block in question_blocks(self.parser, lines):
+            h = block_hash(block)
+            live.add(h)
+            parsed = self._parse_block(h, block)
+            if parsed is not None:
+                numbered.append((parsed[0], (h, parsed[1])))
+        # Blocks that left the file won't come back verbatim often enough to keep
+        self._parsed = {h: v for h, v in self._parsed.items() if h in live}
+        return numbered
+
+    def _keyed(self, lines: List[str]) -> List[Tuple[int, Tuple[str, Dict[str, Any]]]]:
+        """Like _numbered with answer-key tables, which answer questions in other blocks.
+
+        The whole file is parsed again; questions are keyed by their content,
+        so banks are still only patched where a question actually changed.
+        """
+        keys: Dict[int, Dict[int, int]] = {}
+        questions = apply_key_tables(self.parser.parse_questions(lines, self.options.get("inline_note", False),
+                                                                 self.options.get("multiline_note", False), keys), keys)
+        return [(num, (hashlib.sha1(json.dumps(q, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest(), q))
+                for num, q in questions]
+
+    def _patch(self, store: BankStore, old: Optional[Record], entries: List[Entry]) -> Tuple[int, Record]:
+        """Brings one bank in line with its parsed entries; returns (questions rewritten, new record)."""
+        if old is None:
+            store.replace_all(q for _, q in entries)
+            return len(entries), [(h, _label(q), True) for h, q in entries]
+        ops = difflib.SequenceMatcher(None, [h for h, _, _ in old], [h for h, _ in entries], autojunk=False).get_opcodes()
+        changed = sum(j2 - j1 for op, _, _, j1, j2 in ops if op != "equal")
+
+        existing = None
+        present = [i for i, (_, _, kept) in enumerate(old) if kept]
+        if store.count() == len(present):
+            disk = {i: pos for pos, i in enumerate(present)}
+        else:
+            existing = store.load_all()
+            disk = _align(present, [old[i][1] for i in present], [_label(q) for q in existing])
+        in_place = len(disk) == len(present) and all(
+            op == "equal" or (op == "replace" and i2 - i1 == j2 - j1 and all(i in disk for i in range(i1, i2)))
+            for op, i1, i2, j1, j2 in ops)
+        if not in_place and existing is None:
+            existing = store.load_all()
+
+        record: Record = []
+        data, updates = [], {}
+        for op, i1, i2, j1, j2 in ops:
+            if op == "equal":
+                for i in range(i1, i2):
+                    record.append((old[i][0], old[i][1], i in disk))
+                    if i in disk and not in_place: data.append(existing[disk[i]])
+            else:
+                for k, (h, q) in enumerate(entries[j1:j2]):
+                    record.append((h, _label(q), True))
+                    if in_place: updates[disk[i1 + k]] = q
+                    else: data.append(q)
+        if in_place:
+            store.update_many(updates)
+        else:
+            store.replace_all(data)
+        return changed, record
+
+def _label(q: Dict[str, Any]) -> str:
+    return q.get("question", "")
+
+def _align(indices: List[int], labels: List[str], disk_labels: List[str]) -> Dict[int, int]:
+    """Bank position of each recorded question still found there, matched in order by label.
+
+    A run of questions that differs on both sides pairs up by position
+    (edited in the viewer); questions only on our side were deleted there.
+    """
+    disk = {}
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, labels, disk_labels, autojunk=False).get_opcodes():
+        if op in ("equal", "replace"):
+            for k in range(min(i2 - i1, j2 - j1)):
+                disk[indices[i1 + k]] = j1 + k
+    return disk
+# --- END OF FILE core/incremental.py ---
@@ -0,0 +1,108 @@
+# --- START OF FILE core/linking.py ---
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+
+from core.crops import Crop
+from core.parser import QUESTION_NUM_RE
+from core.pdf_ops import PDF_ZOOM
+
+ALIGN_LOOKAHEAD = 50  # Bank entries an anchor may skip over to find its number
+ANCHOR_SLACK = 6.0    # Scene units a crop may start below its question number line
+
+Anchor = Tuple[int, float, float]  # (question number, scene x, scene y of the line top)
+
+def question_anchors(file_entry) -> List[Anchor]:
+    """Question-number lines on a page, from the text layer, top to bottom.
+
+    Image pages have no text layer and give no anchors.
+    """
+    file_type, file_obj, extra = file_entry
+    if file_type != 'pdf': return []
+    page = file_obj.load_page(extra)
+    anchors = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT, sort=True)["blocks"]:
+        for line in block.get("lines", ()):
+            m = QUESTION_NUM_RE.match("".join(s["text"] for s in line["spans"]).strip())
+            if m:
+                # Text is in unrotated page space, the scene shows the rotated page
+                p = fitz.Point(line["bbox"][0], line["bbox"][1]) * page.rotation_matrix * PDF_ZOOM
+                anchors.append((int(m.group(1)), p.x, p.y))
+    return sorted(anchors, key=lambda a: a[2])
+
+def bank_numbers(bank: List[Dict[str, Any]]) -> List[Optional[int]]:
+    """Question number of each bank entry (None when its text has none)."""
+    nums = []
+    for q in bank:
+        m = QUESTION_NUM_RE.match(q.get("question", ""))
+        nums.append(int(m.group(1)) if m else None)
+    return nums
+
+def align_to_bank(anchor_nums: Sequence[int], bank_nums: Sequence[Optional[int]],
+                  lookahead: int = ALIGN_LOOKAHEAD) -> List[Optional[int]]:
+    """Bank position of each anchor, walking both sequences in order.
+
+    Numbers restart per lecture, so an anchor matches the next bank entry
+    with its number within lookahead; anything else (a year, a page number
+    that looks like "12.") stays unmatched instead of derailing the rest.
+    """
+    positions: List[Optional[int]] = []
+    j = 0
+    for num in anchor_nums:
+        hit = next((k for k in range(j, min(len(bank_nums), j + lookahead)) if bank_nums[k] == num), None)
+        positions.append(hit)
+        if hit is not None: j = hit + 1
+    return positions
+
+def link_crops(file_list, pages_crops: Dict[int, Sequence[Crop]], bank: List[Dict[str, Any]]):
+    """Works out the id/order every crop needs so exports line up with bank.
+
+    A crop that contains a question-number line starts that question; crops
+    below it (on the same or later pages) without their own number are its
+    further parts, numbered in page order. Notes take the id of the question
+    they follow. Returns (changes, report): changes maps (page, index) to
+    (id, order) for crops that must change; report lists what didn't match.
+    """
+    page_anchors = {p: question_anchors(file_list[p]) for p in range(len(file_list))}
+    flat = [(p, a) for p in sorted(page_anchors) for a in page_anchors[p]]
+    positions = align_to_bank([a[0] for _, a in flat], bank_numbers(bank))
+    bank_id = {(p, a): (pos + 1 if pos is not None else None) for (p, a), pos in zip(flat, positions)}
+
+    report: Dict[str, List[Any]] = {"unmatched_numbers": [], "uncropped": [], "orphan_crops": [],
+                                    "merged_crops": [], "missing_in_pdf": []}
+    for (p, a), pos in zip(flat, positions):
+        if pos is None: report["unmatched_numbers"].append((p + 1, a[0]))
+    matched = {pos for pos in positions if pos is not None}
+    report["missing_in_pdf"] = [i + 1 for i in range(len(bank)) if i not in matched]
+
+    changes: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    parts: Dict[int, int] = {}
+    notes: Dict[int, int] = {}
+    used = set()
+    current: Optional[Tuple[int, Anchor]] = None
+    for p in sorted(pages_crops):
+        anchors = page_anchors.get(p, [])
+        for idx, crop in enumerate(pages_crops[p]):
+            inside = [a for a in anchors if crop.top - ANCHOR_SLACK <= a[2] <= crop.bottom and crop.left - ANCHOR_SLACK <= a[1] <= crop.right]
+            above = [a for a in anchors if a[2] < crop.top - ANCHOR_SLACK]
+            if inside and not crop.is_note:
+                if len(inside) > 1: report["merged_crops"].append((p + 1, idx + 1, [a[0] for a in inside]))
+                current = (p, inside[0])
+            elif above and (current is None or current[0] != p or current[1][2] < above[-1][2]):
+                current = (p, above[-1])
+            elif current is None or (not anchors and file_list[p][0] != 'pdf'):
+                report["orphan_crops"].append((p + 1, idx + 1))
+                continue
+            gid = bank_id.get(current)
+            if gid is None:
+                report["orphan_crops"].append((p + 1, idx + 1))
+                continue
+            used.add(current)
+            counter = notes if crop.is_note else parts
+            counter[gid] = counter.get(gid, 0) + 1
+            if (crop.id, crop.order) != (gid, counter[gid]):
+                changes[(p, idx)] = (gid, counter[gid])
+
+    report["uncropped"] = [(p + 1, a[0]) for p, a in flat if bank_id[(p, a)] is not None and (p, a) not in used]
+    return changes, report
+# --- END OF FILE core/linking.py ---
@@ -24,22 +24,38 @@ TRANS = {
         "next": "التالي",
         "home": "الرئيسية",
         "detect_msg": "تم كشف {} سؤال.",
-        "no_detect_msg": "لم يتم كشف أسئلة أو الملف ليس PDF.",
+        "no_detect_msg": "لم يتم كشف أسئلة.",
         "bulk_prompt": "أدخل نطاق الصفحات (الإجمالي: {})\nالصيغة: بداية-نهاية",
+        "bad_page_range": "نطاق الصفحات \"{}\" غير صالح، استخدم أرقاماً بين 1 و {}",
         "bulk_confirm": "سيتم استبدال القص الموجود في {} صفحة.\nهل أنت متأكد؟",
         "processing": "جاري المعالجة...",
         "saved_msg": "تم حفظ {} صورة (وتم دمج المجموعات).",
         "ext_title": "محول النص إلى JSON",
         "ext_input": "الملف المصدري",
         "browse": "تصفح...",
+        "browse_folder": "مجلد...",
+        "batch_files": "{} ملفات نصية",
+        "batch_summary": "تم تحويل {} ملف، وفشل {}.\n{} سؤال في {:.1f} ث ({:,.0f} سطر/ث، {:.2f} ميجابايت/ث).",
         "parsing_opts": "خيارات التحليل",
         "opt_split": "تفعيل وضع 'فصل المحاضرات/الفصول'",
         "opt_inline": "اعتبار النص بجانب 'الحل' ملاحظة",
         "opt_multiline": "اعتبار الأسطر أسفل 'الحل' ملاحظة",
+        "opt_key_table": "قراءة جداول الإجابات (مثل: 1-أ 2-ج 3-ب)",
+        "opt_sqlite": "حفظ البنوك بصيغة SQLite ‏(bank.db)",
         "out_opts": "خيارات الحفظ",
+        "answer_kw": "كلمات الحل:",
+        "note_kw": "كلمات الملاحظة:",
+        "preview": "معاينة مباشرة",
+        "preview_summary": "{} سؤال ({} بإجابة، {} بملاحظة)",
+        "preview_lectures": "{} محاضرات:",
+        "preview_partial": "أول {} كيلوبايت فقط، جاري تحليل بقية الملف...",
         "use_fname": "استخدام اسم الملف كاسم للمجلد",
         "use_custom": "اسم مجلد مخصص:",
         "create_img": "إنشاء مجلد للصور 'images'",
+        "opt_watch": "مراقبة الملف وتحديث البنك تلقائياً عند الحفظ",
+        "watch_started": "تمت كتابة {} سؤال من {}؛ جاري مراقبة التعديلات...",
+        "watch_updated": "تم تحديث {} سؤال في {} ({})",
+        "watch_stopped": "توقفت المراقبة.",
         "run_btn": "بدء التحويل",
         "help_btn": "شرح الخيارات",
         "settings_btn": "إعدادات الكلمات المفتاحية",
@@ -55,12 +71,51 @@ TRANS = {
         "view_wrong": "إجابة خاطئة، حاول مجدداً.",
         "view_ans_header": "الإجابة الصحيحة:",
         "view_note_header": "ملاحظة / الشرح:",
+        "bank_storage": "تخزين البنك",
+        "bank_to_sqlite": "🗄 تحويل إلى SQLite",
+        "bank_to_json": "🗄 تحويل إلى JSON",
+        "bank_converted": "تم حفظ البنك في:\n{}",
         "align_title": "خيارات الدمج",
         "align_label": "محاذاة الصور المدمجة:",
         "align_menu": "محاذاة الدمج",
         "align_right": "يمين",
         "align_center": "وسط",
         "align_left": "يسار",
+        "export_format_menu": "صيغة التصدير",
+        "format_jpg": "صور JPEG",
+        "format_pdf": "PDF متجه (دقة عالية)",
+        "capture_text": "حفظ نص الأسئلة (للبحث)",
+        "open_session": "فتح جلسة",
+        "save_session": "حفظ الجلسة باسم",
+        "session_title": "جلسة القص",
+        "resume_session_prompt": "توجد جلسة محفوظة تلقائياً لهذه الملفات. هل تريد استعادتها؟",
+        "session_sources_changed": "تغيرت بعض ملفات المصدر منذ حفظ الجلسة، قد لا تطابق القصاصات الصفحات.",
+        "session_missing_files": "ملفات المصدر غير موجودة:\n{}",
+        "session_saved": "تم حفظ الجلسة: {}",
+        "session_backup": "تم الاحتفاظ بالجلسة السابقة في: {}",
+        "profiler": "قياس الأداء",
+        "profiler_report": "زمن معالجة أحداث لوحة القص (التفاصيل أدناه).",
+        "capture_template": "حفظ كقالب",
+        "apply_template": "تطبيق القالب (نطاق)",
+        "template_captured": "تم حفظ قالب من {} قصاصة.",
+        "template_empty": "لا يوجد قالب، ارسم القصاصات على صفحة ثم اضغط حفظ كقالب.",
+        "crop_overlaps": "هذه القصاصة تتداخل مع {} قصاصة أخرى",
+        "template_snap_prompt": "ضبط كل قصاصة على محتوى الصفحة القريب؟",
+        "skip_duplicates": "تخطي الصفحات المكررة",
+        "duplicate_of": "(مكررة من ص {})",
+        "duplicates_scanning": "جاري البحث عن الصفحات المكررة... {}/{}",
+        "duplicates_found": "تم العثور على {} صفحة مكررة.",
+        "open_folder": "فتح مجلد صور",
+        "folder_no_images": "لا توجد صور في هذا المجلد.",
+        "answer_key": "استخراج الإجابات المظللة",
+        "answer_key_msg": "تم تسجيل {} إجابة في:\n{}",
+        "link_bank": "ربط القصاصات ببنك الأسئلة",
+        "link_bank_done": "تم تعديل ترقيم {} قصاصة.",
+        "link_unmatched_numbers": "أرقام في الملف غير موجودة في البنك (صفحة، رقم): {}",
+        "link_uncropped": "أسئلة في الملف بلا قصاصة (صفحة، رقم): {}",
+        "link_orphan_crops": "قصاصات لا تتبع أي سؤال (صفحة، قصاصة): {}",
+        "link_merged_crops": "قصاصات تغطي أكثر من سؤال (صفحة، قصاصة، أرقام): {}",
+        "link_missing_in_pdf": "أسئلة في البنك غير موجودة في الملف (ترتيب): {}",
         "link_prompt_id": "أدخل رقم السؤال الرئيسي (Global ID):",
         "link_prompt_order": "أدخل ترتيب هذا الجزء (1, 2, 3...):",
         "renumber_link_title": "تغيير ترتيب الجزء",
@@ -144,22 +199,38 @@ TRANS = {
         "next": "Next",
         "home": "Home",
         "detect_msg": "Detected {} questions.",
-        "no_detect_msg": "No questions detected or not a PDF.",
+        "no_detect_msg": "No questions detected.",
         "bulk_prompt": "Enter Page Range (Total: {})\nFormat: Start-End",
+        "bad_page_range": "Invalid page range \"{}\": use pages 1 to {}",
         "bulk_confirm": "This will overwrite existing crops on {} pages.\nProceed?",
         "processing": "Processing...",
         "saved_msg": "Saved {} images (groups merged).",
         "ext_title": "Text to JSON Extractor",
         "ext_input": "Input Source",
         "browse": "Browse",
+        "browse_folder": "Folder...",
+        "batch_files": "{} text files",
+        "batch_summary": "Converted {} files, {} failed.\n{} questions in {:.1f} s ({:,.0f} lines/s, {:.2f} MB/s).",
         "parsing_opts": "Parsing Logic",
         "opt_split": "Enable 'Lecture/Chapter Split' Mode",
         "opt_inline": "Treat text next to 'Answer' as Note",
         "opt_multiline": "Treat lines under 'Answer' as Note",
+        "opt_key_table": "Read answer-key tables (e.g. 1-a 2-c 3-b)",
+        "opt_sqlite": "Save banks as SQLite (bank.db)",
         "out_opts": "Output Settings",
+        "answer_kw": "Answer keywords:",
+        "note_kw": "Note keywords:",
+        "preview": "Live Preview",
+        "preview_summary": "{} questions ({} with an answer, {} with a note)",
+        "preview_lectures": "{} lectures:",
+        "preview_partial": "First {} KB only, parsing the rest of the file...",
         "use_fname": "Use Source Filename as Folder Name",
         "use_custom": "Custom Folder Name:",
         "create_img": "Create 'images' subfolder",
+        "opt_watch": "Watch the file and update the bank on save",
+        "watch_started": "Wrote {} questions from {}; watching for changes...",
+        "watch_updated": "Updated {} questions in {} ({})",
+        "watch_stopped": "Stopped watching.",
         "run_btn": "Extract & Convert",
         "help_btn": "Help / Examples",
         "settings_btn": "Keyword Settings",
@@ -175,12 +246,51 @@ TRANS = {
         "view_wrong": "Wrong Answer, try again.",
         "view_ans_header": "Correct Answer:",
         "view_note_header": "Note / Explanation:",
+        "bank_storage": "Bank Storage",
+        "bank_to_sqlite": "🗄 Convert to SQLite",
+        "bank_to_json": "🗄 Convert to JSON",
+        "bank_converted": "Bank saved to:\n{}",
         "align_title": "Merge Options",
         "align_label": "Merged Image Alignment:",
         "align_menu": "Merge Alignment",
         "align_right": "Right",
         "align_center": "Center",
         "align_left": "Left",
+        "export_format_menu": "Export Format",
+        "format_jpg": "JPEG Images",
+        "format_pdf": "Vector PDF (crisp)",
+        "capture_text": "Capture Text (searchable)",
+        "open_session": "Open Session",
+        "save_session": "Save Session As",
+        "session_title": "Cropper Session",
+        "resume_session_prompt": "An autosaved session exists for these files. Restore it?",
+        "session_sources_changed": "Some source files changed since the session was saved; crops may not match the pages.",
+        "session_missing_files": "Source files not found:\n{}",
+        "session_saved": "Session saved: {}",
+        "session_backup": "Previous session kept as: {}",
+        "profiler": "Profiler",
+        "profiler_report": "Canvas event timings (see details).",
+        "capture_template": "Capture Template",
+        "apply_template": "Apply Template (Range)",
+        "template_captured": "Template captured from {} crops.",
+        "template_empty": "No template yet: draw crops on a page, then Capture Template.",
+        "crop_overlaps": "This crop overlaps {} other crop(s)",
+        "template_snap_prompt": "Snap each crop to nearby page content?",
+        "skip_duplicates": "Skip Duplicate Pages",
+        "duplicate_of": "(duplicate of p. {})",
+        "duplicates_scanning": "Scanning for duplicate pages... {}/{}",
+        "duplicates_found": "Found {} duplicate pages.",
+        "open_folder": "Open Image Folder",
+        "folder_no_images": "No images found in this folder.",
+        "answer_key": "Extract Marked Answers",
+        "answer_key_msg": "Recorded {} answers in:\n{}",
+        "link_bank": "Link Crops to Bank",
+        "link_bank_done": "Renumbered {} crops.",
+        "link_unmatched_numbers": "Numbers in the PDF not in the bank (page, number): {}",
+        "link_uncropped": "Questions in the PDF with no crop (page, number): {}",
+        "link_orphan_crops": "Crops not under any matched question (page, crop): {}",
+        "link_merged_crops": "Crops covering several questions (page, crop, numbers): {}",
+        "link_missing_in_pdf": "Bank questions not found in the PDF (position): {}",
         "link_prompt_id": "Enter Main Question ID (Global):",
         "link_prompt_order": "Enter Sub-Order (1, 2, 3...):",
         "renumber_link_title": "Change Sub-Order",
@@ -0,0 +1,58 @@
+# --- START OF FILE core/numbering.py ---
+from typing import Dict, Iterable, List
+from core.crops import Crop
+
+def is_auto_numbered(crop: Crop) -> bool:
+    """True for question crops that take the next automatic id (no manual id, not a note)."""
+    return (crop.id is None or crop.id <= 0) and not crop.is_note
+
+class AutoIdIndex:
+    """Prefix counts of auto-numbered question crops per page.
+
+    A Fenwick tree over pages: the first automatic id of a page and the
+    update after an edit both cost O(log pages), so labels on page 1,000
+    are as cheap as on page 1.
+    """
+    def __init__(self, n_pages: int = 0) -> None:
+        self._counts: List[int] = [0] * n_pages
+        self._tree: List[int] = [0] * (n_pages + 1)
+
+    @classmethod
+    def from_pages(cls, pages: Dict[int, Iterable[Crop]], n_pages: int) -> "AutoIdIndex":
+        index = cls(n_pages)
+        for page, crops in pages.items():
+            index.set_page(page, crops)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def set_page(self, page: int, crops: Iterable[Crop]) -> None:
+        self.set_count(page, sum(1 for c in crops if is_auto_numbered(c)))
+
+    def set_count(self, page: int, count: int) -> None:
+        # A negative page would never advance the tree walk below
+        if page < 0 or page >= len(self._counts): raise IndexError(page)
+        delta = count - self._counts[page]
+        if not delta: return
+        self._counts[page] = count
+        i = page + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def count_before(self, page: int) -> int:
+        """Auto-numbered crops on all pages before page."""
+        total, i = 0, page
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def start_for(self, page: int) -> int:
+        """First automatic id used on page."""
+        return self.count_before(page) + 1
+
+    def total(self) -> int:
+        return self.count_before(len(self._counts))
+# --- END OF FILE core/numbering.py ---
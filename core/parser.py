@@ -1,19 +1,179 @@
 # --- START OF FILE core/parser.py ---
+import io
 import re
 import json
+import multiprocessing
 import os
-from typing import Any, Dict, List, Optional, Tuple
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.bank_store import BankWriter, write_bank
+from core.pdf_text import is_pdf, iter_pdf_lines
+
+QUESTION_NUM_RE = re.compile(r'^(\d+)\s*[-.)]')
+OPTION_RE = re.compile(r'^([a-zA-Zأ-ي])\s*[-.)]')
+ARABIC_OPTION_CHARS = "أبجدهوزحطيكلمنسعفصقرشتثخذضظغ"
+
+# One "number-letter" pair of an answer-key table such as "1-a 2-c 3-b" or "1) أ، 2) ج"
+KEY_PAIR_RE = re.compile(r'(\d+)\s*[-.):]?\s*([a-zA-Zأ-ي])(?![a-zA-Zأ-ي])')
+KEY_LINE_RE = re.compile(r'(?:\d+\s*[-.):]?\s*[a-zA-Zأ-ي](?![a-zA-Zأ-ي])[\s,;،|/]*)+')
+ANSWER_TAIL = r'[:.\s-]*([a-zA-Zأ-ي0-9])'  # What follows an answer keyword: separators, then the option
+_NOTE_PREFIX_RE = re.compile(r'^[-:.)(]+')
+
+PARALLEL_CHUNK_BYTES = 8 << 20  # Input per worker task in parse_parallel
+
+ParseEvent = Tuple[str, Any]  # ("question", dict) or ("lecture", bank suffix)
+
+def option_index(char: str) -> int:
+    """Maps an option letter (a, b, ... or أ, ب, ...) to its 0-based index."""
+    char = char.lower()
+    if 'a' <= char <= 'z': return ord(char) - ord('a')
+    if char in ARABIC_OPTION_CHARS: return ARABIC_OPTION_CHARS.index(char)
+    return 0
+
+def _keyword_scanner(keywords: List[str]) -> Optional["re.Pattern[str]"]:
+    """One alternation over all keywords: a single C-level scan tells whether any occurs."""
+    return re.compile("|".join(re.escape(kw) for kw in keywords)) if keywords else None
+
+def lecture_events(numbered: Iterable[Tuple[int, Dict[str, Any]]], split_lectures: bool) -> Iterator[ParseEvent]:
+    """Turns numbered questions into parse events, closing a lecture where numbering goes back."""
+    lecture_counter = 1
+    lecture_size = 0
+    last_q_num = 0
+    for q_num, q in numbered:
+        # Check for numbering reset (Lectures)
+        if split_lectures and q_num < last_q_num and lecture_size:
+            yield "lecture", f"_Lecture_{lecture_counter}"
+            lecture_size = 0
+            lecture_counter += 1
+        last_q_num = q_num
+        yield "question", q
+        lecture_size += 1
+    if lecture_size:
+        yield "lecture", f"_Lecture_{lecture_counter}" if split_lectures and lecture_counter > 1 else ""
+
+@contextmanager
+def source_lines(file_path: str, workers: Optional[int] = None):
+    """Lines of a question source: a UTF-8 .txt file, or a PDF's text layer
+    streamed page by page without its header/footer bands."""
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    if is_pdf(file_path):
+        lines = iter_pdf_lines(file_path, workers)
+        try:
+            yield lines
+        finally:
+            lines.close()
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield f
+
+def chunk_offsets(file_path: str, chunk_size: int = PARALLEL_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """(start, end) byte ranges of about chunk_size, each after the first starting on a question line.
+
+    A question line resets all question state (including multiline-note
+    collection), so chunks cut there parse the same alone as in sequence.
+    """
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, 'rb') as f:
+        pos = chunk_size
+        while pos < size:
+            f.seek(pos)
+            f.readline()  # Finish the line we landed in
+            start = f.tell()
+            line = f.readline()
+            # Text mode also ends lines at a lone "\r", so only what comes before one counts
+            while line and not QUESTION_NUM_RE.match(line.split(b"\r")[0].decode('utf-8', 'ignore').strip()):
+                start = f.tell()
+                line = f.readline()
+            if not line: break
+            bounds.append(start)
+            pos = start + chunk_size
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _parse_chunk(config: Dict[str, Any], file_path: str, start: int, end: int,
+                 inline_note: bool, multiline_note: bool) -> List[Tuple[int, Dict[str, Any]]]:
+    """Worker-process side of parse_parallel: the numbered questions of one byte range."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Same decoding and newline handling as the sequential open(..., 'r')
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    return list(QuestionParser(config=config).parse_questions(lines, inline_note, multiline_note))
+
+def key_table_pairs(line: str, continuing: bool = False) -> Optional[Dict[int, int]]:
+    """{question number: option index} when the whole line is an answer-key table, else None.
+
+    A line needs two pairs to count ("1- a" alone is more likely a
+    question), except right after another key line, where a table's last
+    row may hold a single pair.
+    """
+    if not KEY_LINE_RE.fullmatch(line): return None
+    pairs = {int(n): option_index(ch) for n, ch in KEY_PAIR_RE.findall(line)}
+    return pairs if len(pairs) >= (1 if continuing else 2) else None
+
+def apply_key_tables(numbered: Iterable[Tuple[int, Dict[str, Any]]],
+                     keys: Dict[int, Dict[int, int]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Fills unanswered questions from the key tables parse_questions collects into keys.
+
+    Questions are held back until their numbering run ends (numbers go back
+    or the input ends), since a run's key usually comes after its questions;
+    keys[run] holds the tables read during that run.
+    """
+    run, last, held = 0, 0, []
+
+    def release():
+        key = keys.pop(run, {})
+        for num, q in held:
+            if not q["correct_options"] and num in key: q["correct_options"] = [key[num]]
+        return held
+
+    for num, q in numbered:
+        if num < last:
+            yield from release()
+            run, held = run + 1, []
+        last = num
+        held.append((num, q))
+    yield from release()
 
 class QuestionParser:
-    def __init__(self, config_path: str = "config.json") -> None:
-        self.config = self._load_config(config_path)
-        self.re_num = re.compile(r'^(\d+)\s*[-.)]') 
-        self.re_opt = re.compile(r'^([a-zA-Zأ-ي])\s*[-.)]') 
+    def __init__(self, config_path: str = "config.json", config: Optional[Dict[str, Any]] = None) -> None:
+        self.config = config if config is not None else self._load_config(config_path)
+        self.re_num = QUESTION_NUM_RE
+        self.re_opt = OPTION_RE
+        self._compile_rules()
+
+    def _compile_rules(self) -> None:
+        """Precompiles the keyword rules; config order still decides which keyword wins."""
+        self._answer_rules = [(kw, re.compile(re.escape(kw) + ANSWER_TAIL)) for kw in self.config['answer_keywords']]
+        self._answer_scan = _keyword_scanner(self.config['answer_keywords'])
+        self._note_keywords = list(self.config['note_keywords'])
+        self._note_scan = _keyword_scanner(self._note_keywords)
+
+    def _match_answer(self, line: str) -> Optional["re.Match[str]"]:
+        """Match of the first answer keyword in the line; None also when that keyword has no option after it."""
+        if self._answer_scan is None or not self._answer_scan.search(line): return None
+        for kw, pattern in self._answer_rules:
+            if kw in line: return pattern.search(line)
+        return None
+
+    def _note_keyword(self, text: str) -> Optional[str]:
+        """First note keyword (in config order) found in the text."""
+        if self._note_scan is None or not self._note_scan.search(text): return None
+        return next(kw for kw in self._note_keywords if kw in text)
 
     def _load_config(self, path: str) -> Dict[str, Any]:
         defaults: Dict[str, Any] = {
             "answer_keywords": ["الحل", "الجواب", "الاجابة", "answer"],
             "note_keywords": ["ملاحظة", "توضيح", "شرح", "تنويه", "note", "hint"],
+            "bank_storage": "json",
             "language": "ar"
         }
         if os.path.exists(path):
@@ -22,23 +182,97 @@ class QuestionParser:
         return defaults
 
     def _map_char_to_index(self, char: str) -> int:
-        char = char.lower()
-        if 'a' <= char <= 'z': return ord(char) - ord('a')
-        arabic_chars = "أبجدهوزحطيكلمنسعفصقرشتثخذضظغ"
-        if char in arabic_chars: return arabic_chars.index(char)
-        return 0 
+        return option_index(char)
+
+    def parse_text(self, file_path: str, split_lectures: bool = False, inline_note: bool = False, multiline_note: bool = False,
+                   answer_key: bool = False) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        banks = []
+        current_questions = []
+        for kind, value in self.parse_iter(file_path, split_lectures, inline_note, multiline_note, answer_key):
+            if kind == "question":
+                current_questions.append(value)
+            else:
+                banks.append((value, current_questions))
+                current_questions = []
+        return banks
 
-    def parse_text(self, file_path: str, split_lectures: bool = False, inline_note: bool = False, multiline_note: bool = False) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    def parse_iter(self, file_path: str, split_lectures: bool = False, inline_note: bool = False, multiline_note: bool = False,
+                   answer_key: bool = False) -> Iterator[ParseEvent]:
+        """Streams parse events from a .txt or .pdf file; see parse_lines."""
+        with source_lines(file_path) as lines:
+            yield from self.parse_lines(lines, split_lectures, inline_note, multiline_note, answer_key)
+
+    def parse_parallel(self, file_path: str, split_lectures: bool = False, inline_note: bool = False, multiline_note: bool = False,
+                       answer_key: bool = False, workers: Optional[int] = None, chunk_size: int = PARALLEL_CHUNK_BYTES) -> Iterator[ParseEvent]:
+        """parse_iter for large files: chunks are parsed in worker processes and stitched in order.
+
+        Workers only return numbered questions; lecture splitting runs here
+        over the stitched sequence, so the events match parse_iter exactly.
+        Files of a single chunk (or a single worker) are parsed in-process.
+        For a PDF the page text is extracted in parallel instead, and parsed
+        here as it arrives. Key tables can answer questions in earlier
+        chunks, so answer_key parses text files in-process.
+        """
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        if is_pdf(file_path):
+            with source_lines(file_path, workers or os.cpu_count()) as lines:
+                yield from self.parse_lines(lines, split_lectures, inline_note, multiline_note, answer_key)
+            return
+        chunks = chunk_offsets(file_path, chunk_size)
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        if workers < 2 or answer_key:
+            yield from self.parse_iter(file_path, split_lectures, inline_note, multiline_note, answer_key)
+            return
+        yield from lecture_events(self._parallel_questions(os.path.abspath(file_path), chunks, workers, inline_note, multiline_note),
+                                  split_lectures)
 
-        banks = [] 
-        current_questions = []
+    def _parallel_questions(self, file_path: str, chunks: List[Tuple[int, int]], workers: int,
+                            inline_note: bool, multiline_note: bool) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # Spawned, not forked: callers are Qt processes with live threads.
+        # Only a few chunks are in flight, so memory stays bounded by workers, not file size.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            def submit(chunk: Tuple[int, int]):
+                return pool.submit(_parse_chunk, self.config, file_path, chunk[0], chunk[1], inline_note, multiline_note)
+
+            todo = iter(chunks)
+            pending = deque(submit(c) for c in islice(todo, workers * 2))
+            while pending:
+                done = pending.popleft()
+                nxt = next(todo, None)
+                if nxt is not None: pending.append(submit(nxt))
+                yield from done.result()
+
+    def parse_lines(self, lines: Iterable[str], split_lectures: bool = False, inline_note: bool = False, multiline_note: bool = False,
+                    answer_key: bool = False) -> Iterator[ParseEvent]:
+        """Parses lines one at a time, yielding ("question", q) once q is complete
+        and ("lecture", suffix) after the last question of each lecture.
+
+        Only the question being read is held in memory; with answer_key, the
+        questions of one numbering run are, until its key table has been read.
+        The suffix is the one parse_text gives the lecture's bank ("" when
+        nothing was split).
+        """
+        if answer_key:
+            keys: Dict[int, Dict[int, int]] = {}
+            numbered = apply_key_tables(self.parse_questions(lines, inline_note, multiline_note, keys), keys)
+        else:
+            numbered = self.parse_questions(lines, inline_note, multiline_note)
+        yield from lecture_events(numbered, split_lectures)
+
+    def parse_questions(self, lines: Iterable[str], inline_note: bool, multiline_note: bool,
+                        keys: Optional[Dict[int, Dict[int, int]]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(number, question) for each question, once its last line has been read.
+
+        A question line resets all per-question state, so parsing can start at
+        any question line and give the same questions from there on. When keys
+        is given, answer-key table lines are collected into keys[run] (run
+        counts numbering resets) instead of being read as questions.
+        """
         current_q = None
-        lecture_counter = 1
-        last_q_num = 0
+        q_num = 0
+        run = 0
+        in_key_table = False
         
         # State flag for multiline notes
         collecting_note_mode = False
@@ -47,20 +281,21 @@ class QuestionParser:
             line = line.strip()
             if not line: continue
 
+            # --- Answer-key tables ---
+            if keys is not None:
+                pairs = key_table_pairs(line, in_key_table)
+                in_key_table = pairs is not None
+                if in_key_table:
+                    keys.setdefault(run, {}).update(pairs)
+                    continue
+
             # --- Check New Question ---
             q_match = self.re_num.match(line)
             if q_match:
+                # The previous question can't grow any more
+                if current_q is not None: yield q_num, current_q
+                if int(q_match.group(1)) < q_num: run += 1
                 q_num = int(q_match.group(1))
-                
-                # Check for numbering reset (Lectures)
-                if split_lectures and q_num < last_q_num:
-                    if current_questions:
-                        banks.append((f"_Lecture_{lecture_counter}", current_questions))
-                        current_questions = []
-                        lecture_counter += 1
-                        current_q = None 
-
-                last_q_num = q_num
                 collecting_note_mode = False # Reset note mode on new question
 
                 current_q = {
@@ -70,46 +305,38 @@ class QuestionParser:
                     "correct_options": [],
                     "explanation": ""
                 }
-                current_questions.append(current_q)
                 continue
 
             # --- Parsing inside a question ---
             if current_q:
                 # 1. Check for Answer
-                found_ans = False
-                for kw in self.config['answer_keywords']:
-                    if kw in line:
-                        match = re.search(re.escape(kw) + r'[:.\s-]*([a-zA-Zأ-ي0-9])', line)
-                        if match:
-                            ans_char = match.group(1)
-                            current_q['correct_options'] = [self._map_char_to_index(ans_char)]
-                            found_ans = True
-                            
-                            # Option 1: Inline Notes (on the same line)
-                            if inline_note:
-                                remaining_text = line[match.end():].strip()
-                                # Clean common prefixes like "(" or "-"
-                                remaining_text = re.sub(r'^[-:.)(]+', '', remaining_text).strip()
-                                if remaining_text:
-                                    if current_q['explanation']: current_q['explanation'] += "\n"
-                                    current_q['explanation'] += remaining_text
-                            else:
-                                # Standard logic: check for explicit keyword "ملاحظة"
-                                self._extract_explanation_standard(line[match.end():], current_q)
-
-                            # Enable Multiline Note Mode if Answer found
-                            if multiline_note:
-                                collecting_note_mode = True
-                            
-                        break
-                
-                if found_ans: continue
+                match = self._match_answer(line)
+                if match:
+                    ans_char = match.group(1)
+                    current_q['correct_options'] = [self._map_char_to_index(ans_char)]
+                    
+                    # Option 1: Inline Notes (on the same line)
+                    if inline_note:
+                        remaining_text = line[match.end():].strip()
+                        # Clean common prefixes like "(" or "-"
+                        remaining_text = _NOTE_PREFIX_RE.sub('', remaining_text).strip()
+                        if remaining_text:
+                            if current_q['explanation']: current_q['explanation'] += "\n"
+                            current_q['explanation'] += remaining_text
+                    else:
+                        # Standard logic: check for explicit keyword "ملاحظة"
+                        self._extract_explanation_standard(line[match.end():], current_q)
+
+                    # Enable Multiline Note Mode if Answer found
+                    if multiline_note:
+                        collecting_note_mode = True
+                    continue
 
                 # 2. Check for Options
                 # We only check options if we are NOT in note collecting mode
                 # (Unless the user formatting is messy, but usually notes come last)
-                opt_match = self.re_opt.match(line)
-                if opt_match and not collecting_note_mode:
+                opt_match = None if collecting_note_mode else self.re_opt.match(line)
+                if opt_match:
                     char = opt_match.group(1)
                     current_q['options'].append(f"{char})")
                     continue
@@ -117,50 +344,70 @@ class QuestionParser:
                 # 3. Handle Notes
                 
                 # A. Standard explicit keyword check (always active)
-                is_explicit_note = False
-                for kw in self.config['note_keywords']:
-                    if kw in line:
-                        if current_q['explanation']: current_q['explanation'] += "\n"
-                        current_q['explanation'] += line
-                        is_explicit_note = True
-                        collecting_note_mode = True if multiline_note else False
-                        break
-                if is_explicit_note: continue
+                if self._note_keyword(line) is not None:
+                    if current_q['explanation']: current_q['explanation'] += "\n"
+                    current_q['explanation'] += line
+                    collecting_note_mode = True if multiline_note else False
+                    continue
 
                 # B. Multiline Implicit Notes (Lines under answer)
                 if multiline_note and collecting_note_mode:
                     if current_q['explanation']: current_q['explanation'] += "\n"
                     current_q['explanation'] += line
 
-        if current_questions:
-            suffix = f"_Lecture_{lecture_counter}" if split_lectures and len(banks) > 0 else ""
-            banks.append((suffix, current_questions))
-
-        return banks
+        if current_q is not None: yield q_num, current_q
 
     def _extract_explanation_standard(self, text: str, q_obj: Dict[str, Any]) -> None:
         """Helper to find notes inside the answer line based on keywords only."""
-        for kw in self.config['note_keywords']:
-            if kw in text:
-                start_idx = text.find(kw)
-                note = text[start_idx:].strip()
-                if q_obj['explanation']: q_obj['explanation'] += "\n"
-                q_obj['explanation'] += note
-                return
+        kw = self._note_keyword(text)
+        if kw is not None:
+            note = text[text.find(kw):].strip()
+            if q_obj['explanation']: q_obj['explanation'] += "\n"
+            q_obj['explanation'] += note
+
+    def bank_folder(self, name: str, create_img_folder: bool) -> str:
+        """banks/<name>, created (with its images folder when asked) if missing."""
+        full_path = os.path.join("banks", name)
+        os.makedirs(full_path, exist_ok=True)
+        if create_img_folder:
+            os.makedirs(os.path.join(full_path, "images"), exist_ok=True)
+        return full_path
 
     def save_banks(self, banks_data: List[Tuple[str, List[Dict[str, Any]]]], base_folder: str, create_img_folder: bool = True) -> List[str]:
         results = []
         for suffix, data in banks_data:
-            target_folder_name = base_folder + suffix
-            full_path = os.path.join("banks", target_folder_name)
-            os.makedirs(full_path, exist_ok=True)
-            
-            json_path = os.path.join(full_path, "bank.json")
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            if create_img_folder:
-                os.makedirs(os.path.join(full_path, "images"), exist_ok=True)
+            full_path = self.bank_folder(base_folder + suffix, create_img_folder)
+            write_bank(full_path, data, self.config.get('bank_storage', 'json'))
             results.append(full_path)
         return results
+
+    def save_banks_stream(self, events: Iterable[ParseEvent], base_folder: str, create_img_folder: bool = True) -> List[str]:
+        """Writes parse events to banks as they arrive; same result as save_banks.
+
+        A lecture's name is only known at its end, so its questions go to a
+        temp file that is moved into its folder then. A failure mid-way
+        leaves no partial bank behind. Each run gets its own temp folder, so
+        parallel runs on the same base name never share a temp file.
+        """
+        os.makedirs("banks", exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir="banks", prefix=f".{os.path.basename(base_folder) or 'bank'}-")
+        tmp_base = os.path.join(tmp_dir, "bank")
+        results = []
+        writer = None
+        try:
+            for kind, value in events:
+                if kind == "question":
+                    if writer is None:
+                        writer = BankWriter(tmp_base, self.config.get('bank_storage', 'json'))
+                    writer.add(value)
+                elif writer is not None:
+                    full_path = self.bank_folder(base_folder + value, create_img_folder)
+                    writer.commit(full_path)
+                    writer = None
+                    results.append(full_path)
+        finally:
+            if writer is not None:
+                writer.abort()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return results
 # --- END OF FILE core/parser.py ---
\ No newline at end of file
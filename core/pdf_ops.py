@@ -1,14 +1,33 @@
 # --- START OF FILE core/pdf_ops.py ---
 import fitz  # PyMuPDF
+import io
+import json
 import re
 import os
 import logging
+from collections import OrderedDict
+import numpy as np
 from PIL import Image
 from PyQt6.QtGui import QImage, QPixmap
 from PyQt6.QtCore import QRectF
 from core.config import ConfigManager
+from core.crops import as_crop
+from core.numbering import is_auto_numbered
+from core.pdf_text import HEADER_BAND, FOOTER_BAND
 
 PDF_ZOOM = 3.0 
+RASTER_DETECT_WIDTH = 600  # Pages are downscaled to this width before profiling
+SNAP_MARGIN = 0.03  # Fraction of the page height a stamped rect may move or grow by when snapping
+MEDIA_EXTS = ('.jpg', '.png', '.gif', '.pdf')
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff')
+MULTI_FRAME_EXTS = ('.tif', '.tiff')
+PAGE_CACHE_SIZE = 6  # Rendered pages kept for quick back-and-forth navigation
+TEXT_SIDECAR = "crops_text.json"
+# Extra JPEGs written next to each exported image as "<stem>.<variant>.jpg"
+DEFAULT_DERIVATIVES = {
+    "viewer": {"max_width": 900, "quality": 90},
+    "telegram": {"max_width": 1280, "quality": 90, "max_bytes": 1048576},
+}
 
 def load_pdf_page(doc, page_num):
     page = doc.load_page(page_num)
@@ -18,8 +37,72 @@ def load_pdf_page(doc, page_num):
     qt_img = QImage(img_data, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
     return QPixmap.fromImage(qt_img)
 
-def load_image_file(path):
-    return QPixmap(path)
+def load_image_file(path, frame=None):
+    if not frame and not path.lower().endswith(MULTI_FRAME_EXTS):
+        pix = QPixmap(path)
+        if not pix.isNull(): return pix
+    # TIFF frames (and anything Qt can't read) decode through Pillow
+    with open_image_frame(path, frame) as img:
+        img = img.convert("RGB")
+        qt_img = QImage(img.tobytes(), img.width, img.height, img.width * 3, QImage.Format.Format_RGB888)
+        return QPixmap.fromImage(qt_img)
+
+def open_image_frame(path, frame=None):
+    """Opens an image lazily (header only) positioned on frame."""
+    img = Image.open(path)
+    if frame: img.seek(frame)
+    return img
+
+def image_frame_count(path):
+    """Frames in an image file; only multi-page formats are opened, and only their headers."""
+    if not path.lower().endswith(MULTI_FRAME_EXTS): return 1
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+def natural_key(path):
+    """Sort key that puts IMG_2 before IMG_10."""
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r'(\d+)', path)]
+
+def list_image_folder(folder):
+    """Image files directly in folder, in natural order (one scandir pass, no stat calls)."""
+    with os.scandir(folder) as it:
+        return sorted((e.path for e in it if e.name.lower().endswith(IMAGE_EXTS) and not e.name.startswith('.')),
+                      key=natural_key)
+
+def build_file_list(paths):
+    """Expands sources into cropper pages: ('pdf', doc, page) or ('img', path, frame).
+
+    Nothing is decoded here; pages are rendered on access (see PageCache).
+    """
+    file_list = []
+    for p in sorted(paths, key=natural_key):
+        if p.lower().endswith('.pdf'):
+            d = fitz.open(p)
+            for i in range(len(d)): file_list.append(('pdf', d, i))
+        else:
+            n = image_frame_count(p)
+            file_list.extend(('img', p, i if n > 1 else None) for i in range(n))
+    return file_list
+
+class PageCache:
+    """Small LRU of rendered page pixmaps shared by PDF pages and image frames."""
+    def __init__(self, size=PAGE_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+
+    def clear(self):
+        self._items.clear()
+
+    def get(self, file_entry):
+        file_type, file_obj, extra = file_entry
+        key = (file_type, id(file_obj) if file_type == 'pdf' else file_obj, extra)
+        if key in self._items:
+            self._items.move_to_end(key)
+            return self._items[key]
+        pix = load_pdf_page(file_obj, extra) if file_type == 'pdf' else load_image_file(file_obj, extra)
+        self._items[key] = pix
+        if len(self._items) > self.size: self._items.popitem(last=False)
+        return pix
 
 def analyze_pdf_layout(doc, page_num):
     page = doc.load_page(page_num)
@@ -27,8 +110,8 @@ def analyze_pdf_layout(doc, page_num):
     detected_rects = []
     curr_rect = None
     page_h = page.rect.height
-    header_margin = page_h * 0.10
-    footer_margin = page_h * 0.93
+    header_margin = page_h * HEADER_BAND
+    footer_margin = page_h * FOOTER_BAND
     
     cfg = ConfigManager._load_json()
     stop_keywords = cfg.get("answer_keywords", []) + cfg.get("note_keywords", []) + ["Blue Bits"]
@@ -72,7 +155,171 @@ def analyze_pdf_layout(doc, page_num):
 
     return final_qrects
 
-def save_cropped_images_merged(file_list, pages_data, destination_folder, alignment="right"):
+def render_page_gray(file_type, file_obj, extra, target_width=RASTER_DETECT_WIDTH):
+    """Renders a page as a small grayscale array.
+
+    Returns (gray, scale) where scale maps raster pixels back to scene pixels.
+    """
+    if file_type == 'pdf':
+        page = file_obj.load_page(extra)
+        zoom = target_width / max(1.0, page.rect.width)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+        arr = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        return arr[:, :pix.width], PDF_ZOOM / zoom
+
+    with open_image_frame(file_obj, extra) as src:
+        full_w = src.width
+        # JPEG can decode at reduced size directly, which is much faster than a full decode
+        src.draft('L', (target_width, max(1, src.height * target_width // max(1, full_w))))
+        img = src.convert('L')
+    if img.width > target_width:
+        img = img.resize((target_width, max(1, img.height * target_width // img.width)))
+    return np.asarray(img), full_w / img.width
+
+def find_projection_blocks(gray, ink_threshold=160, gap_factor=2.0):
+    """Proposes question blocks on a grayscale raster without OCR.
+
+    Text lines are found from the horizontal ink projection profile; lines
+    separated by a whitespace gap noticeably larger than the typical line gap
+    start a new block. Returns (x0, y0, x1, y1) tuples in raster pixels.
+    """
+    h, w = gray.shape
+    if h == 0 or w == 0: return []
+    ink = gray < ink_threshold
+    ink[:int(h * HEADER_BAND)] = False
+    ink[int(h * FOOTER_BAND):] = False
+
+    # Rows with only a few dark pixels are scan noise, not text
+    row_profile = ink.sum(axis=1)
+    is_line = row_profile >= max(2, w // 400)
+    edges = np.diff(np.concatenate(([0], is_line.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0: return []
+
+    line_h = float(np.median(ends - starts))
+    gaps = starts[1:] - ends[:-1]
+    split_gap = max(gap_factor * float(np.median(gaps)), line_h * 0.6) if len(gaps) else 0
+    breaks = np.flatnonzero(gaps > split_gap) + 1
+
+    blocks = []
+    for grp_s, grp_e in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(starts)]))):
+        y0, y1 = int(starts[grp_s]), int(ends[grp_e - 1])
+        if y1 - y0 < line_h * 0.5: continue
+        cols = np.flatnonzero(ink[y0:y1].any(axis=0))
+        if len(cols) == 0 or cols[-1] - cols[0] < w * 0.02: continue
+        blocks.append((int(cols[0]), y0, int(cols[-1]) + 1, y1))
+    return blocks
+
+def analyze_raster_layout(file_type, file_obj, extra):
+    """Detects question blocks on image-only pages (scans, photos)."""
+    gray, scale = render_page_gray(file_type, file_obj, extra)
+    padding = 5
+    return [QRectF(x0 * scale - padding, y0 * scale - padding,
+                   (x1 - x0) * scale + (padding * 2), (y1 - y0) * scale + (padding * 2))
+            for x0, y0, x1, y1 in find_projection_blocks(gray)]
+
+def page_scene_size(file_entry):
+    """Scene size (width, height) of a page without rendering it."""
+    file_type, file_obj, extra = file_entry
+    if file_type == 'pdf':
+        rect = file_obj.load_page(extra).rect
+        return rect.width * PDF_ZOOM, rect.height * PDF_ZOOM
+    with open_image_frame(file_obj, extra) as img:
+        return img.size
+
+def snap_to_content(gray, scale, rect, margin, ink_threshold=160):
+    """Fits a scene rect (x, y, w, h) to the ink it covers on a small raster.
+
+    Text lines are kept only if they overlap the original rect, so the
+    margin lets a rect follow shifted content without swallowing the
+    neighbouring question. Returns the rect unchanged when it covers no ink.
+    """
+    x, y, w, h = (v / scale for v in rect)
+    m = margin / scale
+    gh, gw = gray.shape
+    wx0, wy0 = max(0, int(x - m)), max(0, int(y - m))
+    wx1, wy1 = min(gw, int(x + w + m) + 1), min(gh, int(y + h + m) + 1)
+    if wx1 <= wx0 or wy1 <= wy0: return rect
+    ink = gray[wy0:wy1, wx0:wx1] < ink_threshold
+
+    is_line = ink.sum(axis=1) >= 2
+    edges = np.diff(np.concatenate(([0], is_line.view(np.int8), [0])))
+    runs = list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+    hit = [i for i, (s, e) in enumerate(runs) if wy0 + e > y and wy0 + s < y + h]
+    if not hit: return rect
+    # Lines in the margin still belong to the question if they follow without a paragraph gap
+    max_gap = 1.5 * float(np.median([e - s for s, e in runs]))
+    first, last = hit[0], hit[-1]
+    while first > 0 and runs[first][0] - runs[first - 1][1] <= max_gap: first -= 1
+    while last < len(runs) - 1 and runs[last + 1][0] - runs[last][1] <= max_gap: last += 1
+    r0, r1 = int(runs[first][0]), int(runs[last][1])
+    cols = np.flatnonzero(ink[r0:r1].sum(axis=0) >= 1)
+    if len(cols) == 0: return rect
+    padding = 5
+    return ((wx0 + cols[0]) * scale - padding, (wy0 + r0) * scale - padding,
+            (cols[-1] + 1 - cols[0]) * scale + padding * 2, (r1 - r0) * scale + padding * 2)
+
+def stamp_template(file_entry, template, snap=False):
+    """Places a crop template on a page.
+
+    template holds (x, y, w, h, is_note) as fractions of the page size, so
+    it survives scans of a different resolution. Returns (QRectF, is_note)
+    pairs in scene coordinates; with snap each rect is fitted to the page's
+    content (see snap_to_content).
+    """
+    if snap:
+        gray, scale = render_page_gray(*file_entry)
+        page_w, page_h = gray.shape[1] * scale, gray.shape[0] * scale
+    else:
+        page_w, page_h = page_scene_size(file_entry)
+    placed = []
+    for fx, fy, fw, fh, is_note in template:
+        rect = (fx * page_w, fy * page_h, fw * page_w, fh * page_h)
+        if snap: rect = snap_to_content(gray, scale, rect, SNAP_MARGIN * page_h)
+        placed.append((QRectF(*rect), is_note))
+    return placed
+
+def detect_page_layout(file_entry):
+    """Uses the text layer when the page has one, otherwise the raster detector."""
+    file_type, file_obj, extra = file_entry
+    if file_type == 'pdf' and file_obj.load_page(extra).get_text("text").strip():
+        return analyze_pdf_layout(file_obj, extra)
+    return analyze_raster_layout(file_type, file_obj, extra)
+
+def _x_offset(width, max_w, alignment):
+    if alignment == "right":
+        return max_w - width
+    elif alignment == "center":
+        return (max_w - width) // 2
+    return 0
+
+def _clip_text(words, clip):
+    """Joins the words whose centre lies inside clip, one output line per text line."""
+    lines = []
+    last_line = None
+    for x0, y0, x1, y1, word, block_no, line_no, _ in words:
+        if not clip.contains(fitz.Point((x0 + x1) / 2, (y0 + y1) / 2)): continue
+        if (block_no, line_no) != last_line:
+            lines.append([])
+            last_line = (block_no, line_no)
+        lines[-1].append(word)
+    return "\n".join(" ".join(line) for line in lines)
+
+def save_cropped_images_merged(file_list, pages_data, destination_folder, alignment="right", export_format="jpg",
+                               capture_text=False, derivatives=None):
+    """Exports every question (and note) as one merged file per id.
+
+    export_format "jpg" writes raster images; "pdf" writes small vector PDFs
+    that clip the source page, so PDF sources are never rasterized here.
+    With capture_text, the text layer under each crop is written to
+    TEXT_SIDECAR as {"<file stem>": [text of each merged part, ...]}.
+    derivatives ({variant: spec}) are written from the same merged image as
+    "<stem>.<variant>.jpg"; PDF snippets get them on demand instead.
+    pages_data maps page index -> crops (core.crops.Crop records or the
+    legacy {'rect': QRectF, ...} dicts).
+    """
+    as_pdf = export_format == "pdf"
     questions_map = {} 
     notes_map = {}
     auto_counter = 1
@@ -84,56 +331,67 @@ def save_cropped_images_merged(file_list, pages_data, destination_folder, alignm
         
         file_type, file_obj, *extra = file_list[page_idx]
         pil_source = None
+        page = None
         if file_type == 'img':
-            pil_source = Image.open(file_obj)
+            pil_source = open_image_frame(file_obj, extra[0])
+            img_w, img_h = pil_source.size
         else:
             doc = file_obj
             page_num = extra[0]
             page = doc.load_page(page_num)
-            pix = page.get_pixmap(matrix=fitz.Matrix(PDF_ZOOM, PDF_ZOOM))
-            pil_source = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        
-        img_w, img_h = pil_source.size
+            if as_pdf:
+                img_w, img_h = int(page.rect.width * PDF_ZOOM), int(page.rect.height * PDF_ZOOM)
+            else:
+                pix = page.get_pixmap(matrix=fitz.Matrix(PDF_ZOOM, PDF_ZOOM))
+                pil_source = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                img_w, img_h = pil_source.size
+        # One extraction per page; each crop then only filters the word list
+        words = page.get_text("words") if capture_text and page is not None else None
 
         for crop_data in crops_list:
-            rect = crop_data['rect']
-            man_id = crop_data.get('id')
-            man_order = crop_data.get('order', 0)
-            is_note = crop_data.get('is_note', False)
+            crop = as_crop(crop_data)
+            man_id = crop.id
+            man_order = crop.order
+            is_note = crop.is_note
             
-            x1 = max(0, int(rect.left()))
-            y1 = max(0, int(rect.top()))
-            x2 = min(img_w, int(rect.right()))
-            y2 = min(img_h, int(rect.bottom()))
+            x1 = max(0, int(crop.left))
+            y1 = max(0, int(crop.top))
+            x2 = min(img_w, int(crop.right))
+            y2 = min(img_h, int(crop.bottom))
             if x2 <= x1 or y2 <= y1: continue
-            try:
-                sub_img = pil_source.crop((x1, y1, x2, y2))
-            except Exception as e:
-                logging.warning("Failed to crop image region: %s", e)
-                continue
-
-            final_id = 0
-            if man_id is not None and man_id > 0:
+            if page is not None:
+                # Clip rects are in unrotated page space, the scene shows the rotated page
+                clip = fitz.Rect(x1, y1, x2, y2) / PDF_ZOOM * page.derotation_matrix
+            text = _clip_text(words, clip) if words else ""
+            if pil_source is None:
+                part = (doc, page_num, clip, (x2 - x1) / PDF_ZOOM, (y2 - y1) / PDF_ZOOM)
+            else:
+                try:
+                    part = pil_source.crop((x1, y1, x2, y2))
+                except Exception as e:
+                    logging.warning("Failed to crop image region: %s", e)
+                    continue
+
+            if is_auto_numbered(crop):
+                final_id = auto_counter
+                auto_counter += 1
+            elif man_id is not None and man_id > 0:
                 final_id = man_id
                 if not is_note and final_id >= auto_counter:
                     auto_counter = final_id + 1
             else:
-                if is_note:
-                    final_id = max(1, auto_counter - 1)
-                else:
-                    final_id = auto_counter
-                    auto_counter += 1
+                final_id = max(1, auto_counter - 1)
             
             final_order = man_order if man_order is not None else 0
             
             if is_note:
                 if final_id not in notes_map:
                     notes_map[final_id] = []
-                notes_map[final_id].append((final_order, sub_img))
+                notes_map[final_id].append((final_order, part, text))
             else:
                 if final_id not in questions_map:
                     questions_map[final_id] = []
-                questions_map[final_id].append((final_order, sub_img))
+                questions_map[final_id].append((final_order, part, text))
 
     saved_count = 0
     if not os.path.exists(destination_folder):
@@ -149,17 +407,36 @@ def save_cropped_images_merged(file_list, pages_data, destination_folder, alignm
             
             curr_y = 0
             for img in img_list:
-                x_pos = 0
-                if alignment == "right":
-                    x_pos = max_w - img.width
-                elif alignment == "center":
-                    x_pos = (max_w - img.width) // 2
-                else: 
-                    x_pos = 0
-                
-                final_img.paste(img, (x_pos, curr_y))
+                final_img.paste(img, (_x_offset(img.width, max_w, alignment), curr_y))
                 curr_y += img.height
         final_img.save(save_path, "JPEG", quality=95)
+        for variant, spec in (derivatives or {}).items():
+            write_derivative(final_img, derivative_path(save_path, variant), spec)
+
+    def merge_and_save_pdf(part_list, save_path):
+        # Parts are stacked exactly like merge_and_save, in PDF points (scene px / PDF_ZOOM)
+        sizes = [(p[3], p[4]) if isinstance(p, tuple) else (p.width / PDF_ZOOM, p.height / PDF_ZOOM)
+                 for p in part_list]
+        max_w = max(w for w, _ in sizes)
+        out = fitz.open()
+        out_page = out.new_page(width=max_w, height=sum(h for _, h in sizes))
+        curr_y = 0
+        for part, (w, h) in zip(part_list, sizes):
+            x_pos = _x_offset(w, max_w, alignment)
+            target = fitz.Rect(x_pos, curr_y, x_pos + w, curr_y + h)
+            if isinstance(part, tuple):
+                out_page.show_pdf_page(target, part[0], part[1], clip=part[2])
+            else:
+                buf = io.BytesIO()
+                part.convert("RGB").save(buf, "JPEG", quality=95)
+                out_page.insert_image(target, stream=buf.getvalue())
+            curr_y += h
+        out.save(save_path, garbage=3, deflate=True)
+        out.close()
+
+    ext = "pdf" if as_pdf else "jpg"
+    save_fn = merge_and_save_pdf if as_pdf else merge_and_save
+    texts = {}
 
     for q_id, parts in questions_map.items():
         parts.sort(key=lambda x: x[0])
@@ -167,8 +444,9 @@ def save_cropped_images_merged(file_list, pages_data, destination_folder, alignm
         if not imgs: continue
         
         try:
-            save_path = os.path.join(destination_folder, f"{q_id}.jpg")
-            merge_and_save(imgs, save_path)
+            save_path = os.path.join(destination_folder, f"{q_id}.{ext}")
+            save_fn(imgs, save_path)
+            texts[str(q_id)] = [x[2] for x in parts]
             saved_count += 1
         except Exception as e:
             logging.error("Error saving question %s: %s", q_id, e)
@@ -179,10 +457,85 @@ def save_cropped_images_merged(file_list, pages_data, destination_folder, alignm
         if not imgs: continue
         
         try:
-            save_path = os.path.join(destination_folder, f"{q_id}_note.jpg")
-            merge_and_save(imgs, save_path)
+            save_path = os.path.join(destination_folder, f"{q_id}_note.{ext}")
+            save_fn(imgs, save_path)
+            texts[f"{q_id}_note"] = [x[2] for x in parts]
         except Exception as e:
             logging.error("Error saving note %s: %s", q_id, e)
 
+    if capture_text:
+        with open(os.path.join(destination_folder, TEXT_SIDECAR), 'w', encoding='utf-8') as f:
+            json.dump(texts, f, indent=2, ensure_ascii=False)
+
     return saved_count
+
+def find_question_media(img_dir, stem):
+    """Returns the primary file for a question image stem, or None.
+
+    Raster files (jpg/png/gif) and vector snippets (pdf) can both exist after
+    re-exports or manual replacement; the most recently written one wins.
+    Derivatives such as "1.raster.jpg" are never returned here.
+    """
+    found = [os.path.join(img_dir, f"{stem}{ext}") for ext in MEDIA_EXTS]
+    found = [p for p in found if os.path.exists(p)]
+    if not found: return None
+    return max(found, key=os.path.getmtime)
+
+def derivative_path(media_path, variant):
+    """"images/1.pdf" + "raster" -> "images/1.raster.jpg"."""
+    return f"{os.path.splitext(media_path)[0]}.{variant}.jpg"
+
+def get_derivative_spec(variant):
+    """Spec of a named derivative ({"max_width", "quality", "max_bytes"}), None if not configured."""
+    return ConfigManager.get_config_value("export_derivatives", DEFAULT_DERIVATIVES).get(variant)
+
+def write_derivative(img, save_path, spec=None):
+    """Saves a downscaled JPEG copy of img following spec; None keeps full size."""
+    spec = spec or {}
+    max_w = spec.get("max_width")
+    if max_w and img.width > max_w:
+        img = img.resize((max_w, max(1, round(img.height * max_w / img.width))), Image.Resampling.LANCZOS)
+    quality = spec.get("quality", 95)
+    max_bytes = spec.get("max_bytes")
+    while True:
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=quality)
+        if not max_bytes or buf.tell() <= max_bytes or img.width < 200: break
+        # Trade quality first, then resolution, until the file fits
+        if quality > 60:
+            quality -= 10
+        else:
+            img = img.resize((int(img.width * 0.8), max(1, int(img.height * 0.8))), Image.Resampling.LANCZOS)
+    with open(save_path, 'wb') as f:
+        f.write(buf.getvalue())
+
+def ensure_jpeg_derivative(media_path, variant="raster"):
+    """Returns the JPEG a consumer should use for media_path.
+
+    Derivatives written by the export are used while they are at least as new
+    as the primary file. PDF snippets are rendered on demand and cached the
+    same way; other rasters are used as they are.
+    """
+    out_path = derivative_path(media_path, variant)
+    if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(media_path):
+        return out_path
+    if not media_path.lower().endswith(".pdf"):
+        return media_path
+    with fitz.open(media_path) as snippet:
+        pix = snippet.load_page(0).get_pixmap(matrix=fitz.Matrix(PDF_ZOOM, PDF_ZOOM), alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    write_derivative(img, out_path, get_derivative_spec(variant))
+    return out_path
+
+def load_media_pixmap(media_path, max_width=None):
+    """Loads a question image or PDF snippet as a QPixmap, at most max_width wide."""
+    if not media_path.lower().endswith(".pdf"):
+        return QPixmap(media_path)
+    with fitz.open(media_path) as snippet:
+        page = snippet.load_page(0)
+        zoom = PDF_ZOOM
+        if max_width: zoom = min(zoom, max_width / max(1.0, page.rect.width))
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        qt_img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
+        return QPixmap.fromImage(qt_img.copy())
 # --- END OF FILE core/pdf_ops.py ---
\ No newline at end of file
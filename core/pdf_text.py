@@ -0,0 +1,60 @@
+# --- START OF FILE core/pdf_text.py ---
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Optional
+
+import fitz  # PyMuPDF
+
+# Page bands holding running headers and page numbers, shared with layout detection
+HEADER_BAND = 0.10
+FOOTER_BAND = 0.93
+PAGES_PER_TASK = 16  # Pages one worker extracts per task in parallel mode
+
+def is_pdf(path: str) -> bool:
+    return path.lower().endswith('.pdf')
+
+def page_lines(page: fitz.Page) -> List[str]:
+    """Text lines of a page in reading order ("\\n"-terminated), without the header and footer bands."""
+    top, bottom = page.rect.height * HEADER_BAND, page.rect.height * FOOTER_BAND
+    lines = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT, sort=True)["blocks"]:
+        for line in block.get("lines", ()):
+            # Text comes in unrotated page space; the bands are about the page as shown
+            y0 = (fitz.Point(line["bbox"][0], line["bbox"][1]) * page.rotation_matrix).y
+            if y0 < top or y0 > bottom: continue
+            text = "".join(s["text"] for s in line["spans"])
+            if text.strip(): lines.append(text + "\n")
+    return lines
+
+def _range_lines(path: str, start: int, end: int) -> List[str]:
+    """Worker-process side of iter_pdf_lines."""
+    with fitz.open(path) as doc:
+        return [line for i in range(start, end) for line in page_lines(doc.load_page(i))]
+
+def iter_pdf_lines(path: str, workers: Optional[int] = None) -> Iterator[str]:
+    """Streams a PDF's body text line by line, one page at a time.
+
+    With workers > 1, runs of PAGES_PER_TASK pages are extracted in worker
+    processes (spawned, as callers are Qt processes) and yielded in page
+    order, with only a few runs in flight at once.
+    """
+    with fitz.open(path) as doc:
+        n = doc.page_count
+        workers = min(workers or 1, (n + PAGES_PER_TASK - 1) // PAGES_PER_TASK)
+        if workers < 2:
+            for i in range(n):
+                yield from page_lines(doc.load_page(i))
+            return
+    path = os.path.abspath(path)
+    ranges = iter([(s, min(n, s + PAGES_PER_TASK)) for s in range(0, n, PAGES_PER_TASK)])
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque(pool.submit(_range_lines, path, s, e) for s, e in islice(ranges, workers * 2))
+        while pending:
+            done = pending.popleft()
+            nxt = next(ranges, None)
+            if nxt is not None: pending.append(pool.submit(_range_lines, path, *nxt))
+            yield from done.result()
+# --- END OF FILE core/pdf_text.py ---
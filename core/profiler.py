@@ -0,0 +1,64 @@
+# --- START OF FILE core/profiler.py ---
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Deque, Dict, List, Tuple
+
+PROFILE_WINDOW = 600  # Recent samples kept per event for the percentiles
+
+_DISABLED = nullcontext()
+
+class _Timer:
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler: "EventProfiler", name: str) -> None:
+        self._profiler, self._name = profiler, name
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self._profiler.record(self._name, time.perf_counter() - self._start)
+
+class EventProfiler:
+    """Wall-clock cost of named UI events (mouse handlers, repaints, ...).
+
+    measure() returns a shared no-op context while disabled, so the
+    instrumentation can stay in hot paths permanently.
+    """
+    def __init__(self, window: int = PROFILE_WINDOW) -> None:
+        self.enabled = False
+        self._window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, Tuple[int, float, float]] = {}  # name -> (count, total, max)
+
+    def measure(self, name: str):
+        return _Timer(self, name) if self.enabled else _DISABLED
+
+    def record(self, name: str, seconds: float) -> None:
+        if name not in self._samples:
+            self._samples[name] = deque(maxlen=self._window)
+            self._totals[name] = (0, 0.0, 0.0)
+        self._samples[name].append(seconds)
+        count, total, worst = self._totals[name]
+        self._totals[name] = (count + 1, total + seconds, max(worst, seconds))
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self._totals.clear()
+
+    def summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """(event, count, mean ms, p95 ms of recent samples, max ms), slowest p95 first."""
+        rows = []
+        for name, (count, total, worst) in self._totals.items():
+            recent = sorted(self._samples[name])
+            p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+            rows.append((name, count, total / count * 1000, p95 * 1000, worst * 1000))
+        return sorted(rows, key=lambda r: -r[3])
+
+    def report(self) -> str:
+        lines = [f"{'event':<18}{'count':>7}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, count, mean, p95, worst in self.summary():
+            lines.append(f"{name:<18}{count:>7}{mean:>10.2f}{p95:>10.2f}{worst:>10.2f}")
+        return "\n".join(lines)
+# --- END OF FILE core/profiler.py ---
@@ -0,0 +1,195 @@
+# --- START OF FILE core/session.py ---
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.crops import Crop
+
+SESSION_VERSION = 1
+SESSION_EXT = ".cropsession"
+JOURNAL_SUFFIX = ".journal"
+COMPACT_EVERY = 500  # Journal records folded back into the snapshot after this many
+_HASH_CHUNK = 1 << 16
+
+Rows = List[List[Any]]
+
+def quick_file_hash(path: str) -> str:
+    """sha1 over the size, first and last 64 KiB; enough to notice a replaced source."""
+    h = hashlib.sha1()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(_HASH_CHUNK))
+        if size > _HASH_CHUNK:
+            f.seek(max(_HASH_CHUNK, size - _HASH_CHUNK))
+            h.update(f.read(_HASH_CHUNK))
+    return h.hexdigest()
+
+def _signature(path: str) -> Dict[str, Any]:
+    # Content hash for documents; image folders can hold thousands of photos, so those use size + mtime
+    if path.lower().endswith('.pdf'):
+        return {"hash": quick_file_hash(path)}
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime_ns}
+
+def describe_sources(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    return [{"path": os.path.abspath(p), **_signature(p)} for p in paths]
+
+def changed_sources(sources: List[Dict[str, Any]]) -> List[str]:
+    """Paths of recorded sources that are missing or no longer match their signature."""
+    changed = []
+    for s in sources:
+        try:
+            if _signature(s["path"]) != {k: v for k, v in s.items() if k != "path"}: changed.append(s["path"])
+        except OSError:
+            changed.append(s["path"])
+    return changed
+
+def default_session_path(paths: List[str]) -> str:
+    """Autosave location: next to the first source (in load order), like an editor's swap file.
+
+    Several sources add a tag of the whole set, so opening the first file
+    alone (or with other files) never lands on the same session.
+    """
+    first = os.path.abspath(paths[0])
+    if len(paths) == 1: return first + SESSION_EXT
+    tag = hashlib.sha1("\n".join(sorted(os.path.abspath(p) for p in paths)).encode("utf-8")).hexdigest()[:8]
+    return f"{first}.{tag}{SESSION_EXT}"
+
+def backup_session(path: str) -> str:
+    """Moves a session (snapshot and journal) aside to a free "<name>.bakN.cropsession"; returns its path.
+
+    Used before a new session takes over a file that was not restored, so
+    declining a resume never destroys the autosave.
+    """
+    stem = path[:-len(SESSION_EXT)] if path.endswith(SESSION_EXT) else path
+    n = 1
+    while os.path.exists(f"{stem}.bak{n}{SESSION_EXT}") or os.path.exists(f"{stem}.bak{n}{SESSION_EXT}{JOURNAL_SUFFIX}"):
+        n += 1
+    bak = f"{stem}.bak{n}{SESSION_EXT}"
+    os.replace(path, bak)
+    if os.path.exists(path + JOURNAL_SUFFIX): os.replace(path + JOURNAL_SUFFIX, bak + JOURNAL_SUFFIX)
+    return bak
+
+def crop_row(c: Crop) -> List[Any]:
+    return [c.x, c.y, c.w, c.h, c.id, c.order, c.is_note]
+
+def row_crop(row: List[Any], uid: Optional[int] = None) -> Crop:
+    x, y, w, h, gid, order, is_note = row
+    return Crop(x, y, w, h, gid, order, is_note, uid)
+
+def page_rows(crops: Iterable[Crop]) -> Rows:
+    return [crop_row(c) for c in crops]
+
+def _write_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_session(path: str) -> Tuple[List[Dict[str, Any]], Dict[int, Rows], Dict[str, Any]]:
+    """Reads a session snapshot and replays its journal.
+
+    Returns (sources, {page: rows}, meta). A torn last journal line (crash
+    mid-write) is dropped; everything before it is kept.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != SESSION_VERSION:
+        raise ValueError(f"Unsupported session version: {data.get('version')}")
+    pages = {int(p): rows for p, rows in data.get("pages", {}).items()}
+    meta = data.get("meta", {})
+    journal = path + JOURNAL_SUFFIX
+    if os.path.exists(journal):
+        with open(journal, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    logging.warning("Session journal %s ends with a partial record", journal)
+                    break
+                if "p" in rec: pages[rec["p"]] = rec["c"]
+                if "m" in rec: meta.update(rec["m"])
+    return data.get("sources", []), pages, meta
+
+class SessionJournal:
+    """Append-only autosave of a cropper session, written on a background thread.
+
+    The UI thread only enqueues plain rows; the writer appends one JSON line
+    per changed page, fsyncs once per batch, and every COMPACT_EVERY records
+    rewrites the snapshot (temp file + os.replace) and truncates the journal.
+    """
+    def __init__(self, path: str, sources: List[Dict[str, Any]], pages: Dict[int, Rows],
+                 meta: Optional[Dict[str, Any]] = None, compact_every: int = COMPACT_EVERY) -> None:
+        self.path = path
+        self._journal = path + JOURNAL_SUFFIX
+        self.sources = sources
+        self._pages = {p: rows for p, rows in pages.items() if rows}
+        self._meta = dict(meta or {})
+        self._compact_every = compact_every
+        self._pending = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._compact()
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def record_page(self, page: int, rows: Rows) -> None:
+        self._queue.put({"p": page, "c": rows})
+
+    def record_meta(self, **meta: Any) -> None:
+        self._queue.put({"m": meta})
+
+    def flush(self) -> None:
+        """Blocks until everything recorded so far is on disk."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes the final snapshot and stops the writer."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        if "p" in rec:
+            if rec["c"]: self._pages[rec["p"]] = rec["c"]
+            else: self._pages.pop(rec["p"], None)
+        if "m" in rec: self._meta.update(rec["m"])
+
+    def _compact(self) -> None:
+        _write_atomic(self.path, {"version": SESSION_VERSION, "sources": self.sources,
+                                  "pages": {str(p): rows for p, rows in sorted(self._pages.items())},
+                                  "meta": self._meta})
+        with open(self._journal, 'w', encoding='utf-8'):
+            pass
+        self._pending = 0
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            batch = [self._queue.get()]
+            while True:
+                try: batch.append(self._queue.get_nowait())
+                except queue.Empty: break
+            try:
+                records = [r for r in batch if r is not None]
+                closing = len(records) < len(batch)
+                if records:
+                    with open(self._journal, 'a', encoding='utf-8') as f:
+                        for rec in records:
+                            self._apply(rec)
+                            f.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._pending += len(records)
+                if closing or self._pending >= self._compact_every:
+                    self._compact()
+            except OSError as e:
+                logging.warning("Session autosave failed: %s", e)
+            finally:
+                for _ in batch: self._queue.task_done()
+# --- END OF FILE core/session.py ---
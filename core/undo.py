@@ -0,0 +1,154 @@
+# --- START OF FILE core/undo.py ---
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, List, MutableSequence, Optional, Set
+
+UNDO_LIMIT = 1000
+
+Pages = Dict[int, MutableSequence[Any]]
+
+class CropCommand(ABC):
+    """One undoable edit of the per-page crop lists.
+
+    Commands only hold the crops they touch, so a step costs the same no
+    matter how many crops the document has. Crop objects are treated as
+    immutable: an edit stores the old and the new object instead of copying.
+    """
+    @abstractmethod
+    def redo(self, pages: Pages) -> None: ...
+
+    @abstractmethod
+    def undo(self, pages: Pages) -> None: ...
+
+    def pages_touched(self) -> Set[int]:
+        return {self.page}
+
+    def merge(self, other: "CropCommand") -> bool:
+        """Absorbs a follow-up command of the same interaction; False if it can't."""
+        return False
+
+class ReplaceCrop(CropCommand):
+    def __init__(self, page: int, index: int, before: Any, after: Any) -> None:
+        self.page, self.index, self.before, self.after = page, index, before, after
+
+    def redo(self, pages: Pages) -> None:
+        pages[self.page][self.index] = self.after
+
+    def undo(self, pages: Pages) -> None:
+        pages[self.page][self.index] = self.before
+
+    def merge(self, other: CropCommand) -> bool:
+        # A drag emits one geometry change per mouse move; keep the first "before" only
+        if isinstance(other, ReplaceCrop) and (other.page, other.index) == (self.page, self.index):
+            self.after = other.after
+            return True
+        return False
+
+class InsertCrop(CropCommand):
+    def __init__(self, page: int, index: int, crop: Any) -> None:
+        self.page, self.index, self.crop = page, index, crop
+
+    def redo(self, pages: Pages) -> None:
+        pages.setdefault(self.page, []).insert(self.index, self.crop)
+
+    def undo(self, pages: Pages) -> None:
+        pages[self.page].pop(self.index)
+
+class RemoveCrop(InsertCrop):
+    def redo(self, pages: Pages) -> None:
+        InsertCrop.undo(self, pages)
+
+    def undo(self, pages: Pages) -> None:
+        InsertCrop.redo(self, pages)
+
+class MoveCrop(CropCommand):
+    def __init__(self, page: int, src: int, dst: int) -> None:
+        self.page, self.src, self.dst = page, src, dst
+
+    def redo(self, pages: Pages) -> None:
+        lst = pages[self.page]
+        lst.insert(self.dst, lst.pop(self.src))
+
+    def undo(self, pages: Pages) -> None:
+        lst = pages[self.page]
+        lst.insert(self.src, lst.pop(self.dst))
+
+class ReplacePage(CropCommand):
+    """Swaps a whole page's crop list, e.g. after auto-detection."""
+    def __init__(self, page: int, before: List[Any], after: List[Any]) -> None:
+        self.page, self.before, self.after = page, list(before), list(after)
+
+    def redo(self, pages: Pages) -> None:
+        pages.setdefault(self.page, [])[:] = self.after
+
+    def undo(self, pages: Pages) -> None:
+        pages.setdefault(self.page, [])[:] = self.before
+
+class CompoundCommand(CropCommand):
+    """Several commands undone and redone as one step (in reverse on undo)."""
+    def __init__(self, commands: List[CropCommand]) -> None:
+        self.commands = list(commands)
+
+    def redo(self, pages: Pages) -> None:
+        for cmd in self.commands: cmd.redo(pages)
+
+    def undo(self, pages: Pages) -> None:
+        for cmd in reversed(self.commands): cmd.undo(pages)
+
+    def pages_touched(self) -> Set[int]:
+        touched: Set[int] = set()
+        for cmd in self.commands: touched |= cmd.pages_touched()
+        return touched
+
+class UndoHistory:
+    def __init__(self, limit: int = UNDO_LIMIT) -> None:
+        self._undo: deque = deque(maxlen=limit)
+        self._redo: List[CropCommand] = []
+        self._sealed = True
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+        self._sealed = True
+
+    def seal(self) -> None:
+        """Starts a new interaction: the next mergeable command opens a new step."""
+        self._sealed = True
+
+    def push(self, cmd: CropCommand, merge: bool = False) -> None:
+        """Records an already applied command."""
+        self._redo.clear()
+        if merge and not self._sealed and self._undo and self._undo[-1].merge(cmd):
+            return
+        self._undo.append(cmd)
+        self._sealed = not merge
+
+    def execute(self, cmd: CropCommand, pages: Pages, merge: bool = False) -> None:
+        cmd.redo(pages)
+        self.push(cmd, merge)
+
+    def undo(self, pages: Pages) -> Optional[Set[int]]:
+        """Reverts the last step; returns the pages it touched, None if nothing to undo."""
+        if not self._undo: return None
+        cmd = self._undo.pop()
+        cmd.undo(pages)
+        self._redo.append(cmd)
+        self._sealed = True
+        return cmd.pages_touched()
+
+    def redo(self, pages: Pages) -> Optional[Set[int]]:
+        if not self._redo: return None
+        cmd = self._redo.pop()
+        cmd.redo(pages)
+        self._undo.append(cmd)
+        self._sealed = True
+        return cmd.pages_touched()
+# --- END OF FILE core/undo.py ---
@@ -2,7 +2,9 @@
 import sys
 import os
 import json
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
+from core.pdf_ops import DEFAULT_DERIVATIVES
 from ui.menu import MainMenu
 
 def ensure_config():
@@ -24,7 +26,8 @@ def ensure_config():
             "detect_bulk": "Ctrl+B",
             "prev": "Left",
             "next": "Right"
-        }
+        },
+        "export_derivatives": DEFAULT_DERIVATIVES
     }
     
     current = {}
@@ -63,5 +66,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # extractor batch workers in frozen builds
     main()
 # --- END OF FILE main.py ---
\ No newline at end of file
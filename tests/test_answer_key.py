@@ -0,0 +1,62 @@
+"""Unit tests for core/answer_key.py"""
+import json
+import fitz
+from core.answer_key import (extract_answer_key, extract_documents_key, apply_answer_key, write_answer_key,
+                             ANSWER_KEY_FILE)
+
+
+def _marked_pdf():
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=800)
+    y = 40
+
+    def line(text, font="helv"):
+        nonlocal y
+        page.insert_text((30, y), text, fontsize=11, fontname=font)
+        y += 20
+        return fitz.Rect(30, y - 20 - 9, 200, y - 20 + 3)
+
+    line("1- First question")
+    line("a) alpha"); b = line("b) beta"); line("c) gamma")
+    line("2- Second question")
+    line("a) alpha"); line("b) beta"); c = line("c) gamma")
+    line("3- Third question")
+    line("a) alpha", font="hebo"); line("b) beta"); line("c) gamma")
+    line("4- Unmarked question")
+    line("a) alpha"); line("b) beta")
+    page.add_highlight_annot(b)
+    page.draw_rect(c, color=None, fill=(1, 1, 0), overlay=False)
+    return doc
+
+
+def test_extract_marks_from_annots_fills_and_bold():
+    assert extract_answer_key(_marked_pdf()) == {(1, 1): [1], (1, 2): [2], (1, 3): [0]}
+
+
+def test_apply_and_write(tmp_path):
+    bank = [{"question": "1.", "correct_options": [0]}, {"question": "2.", "correct_options": [2]},
+            {"question": "9.", "correct_options": [0]}]
+    assert apply_answer_key(bank, {(1, 1): [1], (1, 2): [2]}) == 1
+    assert [q["correct_options"] for q in bank] == [[1], [2], [0]]
+
+    images = tmp_path / "bank" / "images"
+    images.mkdir(parents=True)
+    (tmp_path / "bank" / "bank.json").write_text(json.dumps(bank), encoding="utf-8")
+    path, changed = write_answer_key(str(images), {(1, 9): [3]})
+    assert path.endswith("bank.json") and changed == 1
+    assert json.loads((tmp_path / "bank" / "bank.json").read_text(encoding="utf-8"))[2]["correct_options"] == [3]
+
+    loose = tmp_path / "loose"
+    loose.mkdir()
+    path, _ = write_answer_key(str(loose), {(1, 4): [0], (2, 1): [1]})
+    assert json.loads(open(path, encoding="utf-8").read()) == {"1": {"4": [0]}, "2": {"1": [1]}}
+    assert path.endswith(ANSWER_KEY_FILE)
+
+
+def test_restarted_numbering_keeps_lectures_apart():
+    # Two lectures numbered 1-4: the second document's marks go to the second lecture only
+    key = extract_documents_key([_marked_pdf(), _marked_pdf()])
+    assert key[(2, 1)] == [1] and len(key) == 6
+    bank = [{"question": f"{n}.", "correct_options": []} for n in (1, 2, 3, 4, 1, 2)]
+    assert apply_answer_key(bank, {(2, 1): [2]}) == 1
+    assert [q["correct_options"] for q in bank] == [[], [], [], [], [2], []]
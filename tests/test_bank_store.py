@@ -0,0 +1,89 @@
+"""Unit tests for core/bank_store.py"""
+import json
+import pytest
+from core.bank_store import (BANK_DB, BANK_JSON, BankWriter, JsonBankStore, SqliteBankStore, bank_storage,
+                             convert_bank, export_json, import_json, open_bank, write_bank)
+from core.parser import QuestionParser
+
+BANK = [{"type": "mcq", "question": f"{i}. Q{i}?", "options": ["a) A", "b) B"], "correct_options": [0],
+         "explanation": "شرح" if i == 2 else ""} for i in range(1, 5)]
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_store_edits(tmp_path, storage):
+    write_bank(str(tmp_path), BANK, storage)
+    assert bank_storage(str(tmp_path)) == storage
+    with open_bank(str(tmp_path)) as store:
+        assert store.count() == 4 and store.get(1) == BANK[1]
+        store.update(1, {**BANK[1], "correct_options": [1]})
+        store.delete(0)
+        with pytest.raises(IndexError):
+            store.update(9, BANK[0])
+    with open_bank(str(tmp_path)) as store:
+        assert [q["question"] for q in store.load_all()] == ["2. Q2?", "3. Q3?", "4. Q4?"]
+        assert store.get(0)["correct_options"] == [1]
+
+
+def test_sqlite_batch_update_is_atomic(tmp_path):
+    write_bank(str(tmp_path), BANK, "sqlite")
+    with SqliteBankStore(str(tmp_path)) as store:
+        with pytest.raises(IndexError):
+            store.update_many({0: {**BANK[0], "explanation": "x"}, 7: BANK[0]})
+        assert store.get(0) == BANK[0]
+
+
+def test_writer_matches_json_dump(tmp_path):
+    for data, name in ((BANK, "full"), ([], "empty")):
+        folder = tmp_path / name
+        folder.mkdir()
+        writer = BankWriter(str(tmp_path / f".{name}"))
+        for q in data:
+            writer.add(q)
+        writer.commit(str(folder))
+        assert (folder / BANK_JSON).read_text(encoding="utf-8") == json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def test_import_export_round_trip(tmp_path):
+    src = tmp_path / "src.json"
+    src.write_text(json.dumps(BANK, indent=2, ensure_ascii=False), encoding="utf-8")
+    folder = tmp_path / "bank"
+    folder.mkdir()
+    assert import_json(str(src), str(folder)).endswith(BANK_DB)
+    export_json(str(folder), str(tmp_path / "out.json"))
+    assert (tmp_path / "out.json").read_bytes() == src.read_bytes()
+
+    # Converting replaces the old file, so the two backends never disagree
+    convert_bank(str(folder), "json")
+    assert not (folder / BANK_DB).exists()
+    assert JsonBankStore(str(folder)).load_all() == BANK
+
+
+def test_parser_saves_sqlite_banks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parser = QuestionParser(config_path="none.json")
+    parser.config["bank_storage"] = "sqlite"
+    (folder,) = parser.save_banks_stream(iter([("question", q) for q in BANK] + [("lecture", "")]), "lec", False)
+    assert bank_storage(folder) == "sqlite"
+    with open_bank(folder) as store:
+        assert store.load_all() == BANK
+    assert not list((tmp_path / "banks").glob(".*"))
+
+
+def test_parser_streams_use_separate_temps(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    parser = QuestionParser(config_path="none.json")
+    others = []
+
+    def events():
+        yield "question", BANK[0]
+        # A second run on the same base name starts while this lecture is still open
+        others.extend(parser.save_banks_stream(iter([("question", BANK[3]), ("lecture", " 2")]), "lec", False))
+        yield "question", BANK[1]
+        yield "lecture", " 1"
+
+    (folder,) = parser.save_banks_stream(events(), "lec", False)
+    with open_bank(folder) as store:
+        assert store.load_all() == BANK[:2]
+    with open_bank(others[0]) as store:
+        assert store.load_all() == BANK[3:]
+    assert not list((tmp_path / "banks").glob(".*"))
@@ -0,0 +1,28 @@
+"""Unit tests for core/batch.py"""
+import json
+import os
+from core.batch import collect_sources, plan_jobs, convert_file, convert_batch
+
+
+def test_collect_and_plan(tmp_path):
+    (tmp_path / "b").mkdir()
+    for name in ("b/Q.txt", "b/a.txt", "b/skip.png", "q.txt"):
+        (tmp_path / name).write_text("", encoding="utf-8")
+    files = collect_sources([str(tmp_path / "b"), str(tmp_path / "q.txt"), str(tmp_path / "b/skip.png")])
+    assert [os.path.basename(f) for f in files] == ["a.txt", "Q.txt", "q.txt"]
+    assert [name for _, name in plan_jobs(files)] == ["a", "Q", "q_2"]
+    assert plan_jobs(files, "course")[0][1] == os.path.join("course", "a")
+
+
+def test_convert_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    good = tmp_path / "good.txt"
+    good.write_text("1. Q?\na) A\nb) B\nanswer: b\n2. Q?\na) A\n", encoding="utf-8")
+    result = convert_file(str(good), "single", {}, False)
+    assert result["questions"] == 2 and result["lines"] == 6
+    assert len(json.loads((tmp_path / "banks" / "single" / "bank.json").read_text(encoding="utf-8"))) == 2
+
+    jobs = plan_jobs([str(good), str(tmp_path / "missing.txt")])
+    results = {os.path.basename(p): (r, e) for p, r, e in convert_batch(jobs, {}, False, workers=2)}
+    assert results["good.txt"][0]["banks"] == [os.path.join("banks", "good")]
+    assert results["missing.txt"][0] is None and results["missing.txt"][1]
@@ -0,0 +1,21 @@
+"""Unit tests for the benchmarks/ harness"""
+from benchmarks.corpus import synthetic_corpus
+from benchmarks.parser_bench import option_sets, case_name, regressions
+from core.parser import QuestionParser
+
+
+def test_corpus_parses_into_lectures(tmp_path):
+    for lang in ("ar", "en"):
+        p = tmp_path / f"{lang}.txt"
+        p.write_text(synthetic_corpus(120, lang=lang, lectures=4, note_density=0.5), encoding="utf-8")
+        banks = QuestionParser(config_path=str(tmp_path / "none.json")).parse_text(str(p), split_lectures=True)
+        assert [len(qs) for _, qs in banks] == [30] * 4
+        assert all(q["correct_options"] for _, qs in banks for q in qs)
+
+
+def test_cases_and_regressions():
+    assert len(option_sets()) == 8 and case_name(option_sets()[0]) == "default"
+    base = {"default": {"lines_per_s": 1000, "peak_kib": 100}}
+    assert regressions({"default": {"lines_per_s": 800, "peak_kib": 120}}, base, 0.25) == []
+    found = regressions({"default": {"lines_per_s": 700, "peak_kib": 130}}, base, 0.25)
+    assert len(found) == 2
@@ -0,0 +1,96 @@
+"""Unit tests for core/crops.py"""
+import pickle
+import random
+from core.crops import Crop, PageCrops, CropPages, GRID_CELL
+from core.undo import UndoHistory, InsertCrop, ReplaceCrop, ReplacePage
+
+
+class _Rect:
+    def __init__(self, x, y, w, h): self._v = (x, y, w, h)
+    def left(self): return self._v[0]
+    def top(self): return self._v[1]
+    def right(self): return self._v[0] + self._v[2]
+    def bottom(self): return self._v[1] + self._v[3]
+
+
+def test_from_dict_and_replace():
+    c = Crop.from_dict({'rect': _Rect(10, 20, 30, 40), 'id': 3, 'order': 1, 'is_note': False})
+    assert (c.left, c.top, c.right, c.bottom) == (10, 20, 40, 60)
+    moved = c.with_rect(_Rect(0, 0, 5, 5)).replace(id=None)
+    assert moved.geometry() == (0, 0, 5, 5) and moved.id is None and moved.order == 1
+    assert c.id == 3
+
+
+def test_pickle_without_qt():
+    c = Crop(1, 2, 3, 4, id=7, uid=9)
+    back = pickle.loads(pickle.dumps(c))
+    assert back.geometry() == c.geometry() and (back.id, back.uid) == (7, 9)
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(5)
+    page = PageCrops(Crop(rng.uniform(0, 2000), rng.uniform(0, 3000), rng.uniform(5, 600), rng.uniform(5, 300))
+                     for _ in range(300))
+    for c in list(page)[:50]:
+        expected = [o for o in page if o is not c and o.intersects(*c.geometry())]
+        assert sorted(map(id, page.overlapping(c))) == sorted(map(id, expected))
+    px, py = 700.0, 1200.0
+    assert sorted(map(id, page.at(px, py))) == sorted(id(o) for o in page if o.contains(px, py))
+
+
+def test_index_follows_edits():
+    page = PageCrops([Crop(0, 0, 100, 100)])
+    a = page[0]
+    page[0] = a.replace(x=3 * GRID_CELL)
+    assert page.at(50, 50) == []
+    assert page.at(3 * GRID_CELL + 50, 50) == [page[0]]
+    page[:] = [Crop(0, 0, 10, 10)]
+    assert page.at(3 * GRID_CELL + 50, 50) == []
+    del page[0]
+    assert page.at(5, 5) == [] and len(page) == 0
+
+
+def test_sorted_position():
+    page = PageCrops([Crop(0, 10, 5, 5), Crop(0, 50, 5, 5)])
+    assert page.sorted_position(30) == 1
+    page.insert(0, Crop(0, 90, 5, 5))
+    assert page.sorted_position(30) is None
+
+
+def test_sorted_position_tracks_random_edits():
+    rng = random.Random(3)
+    page = PageCrops(Crop(0, y, 5, 5) for y in range(0, 100, 10))
+    for _ in range(300):
+        op = rng.random()
+        if op < 0.4:
+            page.insert(rng.randint(-3, len(page) + 2), Crop(0, rng.uniform(0, 100), 5, 5))
+        elif op < 0.7 and len(page):
+            del page[rng.randrange(-len(page), len(page))]
+        elif op < 0.9 and len(page):
+            page[rng.randrange(len(page))] = Crop(0, rng.uniform(0, 100), 5, 5)
+        else:
+            page[:] = sorted(page, key=lambda c: c.y)
+        tops = [c.y for c in page]
+        expected = None if tops != sorted(tops) else sum(t <= 50 for t in tops)
+        assert page.sorted_position(50) == expected
+
+
+def test_uid_assigned_and_kept():
+    a, b = Crop(0, 0, 1, 1), Crop(0, 0, 1, 1)
+    assert a.uid is not None and a.uid != b.uid
+    assert a.replace(x=5).uid == a.uid
+    assert Crop.from_dict({'rect': _Rect(0, 0, 1, 1)}).uid is not None
+
+
+def test_undo_commands_on_crop_pages():
+    pages = CropPages()
+    h = UndoHistory()
+    h.execute(ReplacePage(2, [], [Crop(0, 0, 10, 10)]), pages)
+    assert isinstance(pages[2], PageCrops)
+    h.execute(InsertCrop(2, 1, Crop(0, 20, 10, 10)), pages)
+    h.execute(ReplaceCrop(2, 0, pages[2][0], pages[2][0].replace(x=500)), pages)
+    assert pages[2].at(505, 5)
+    h.undo(pages)
+    assert pages[2].at(5, 5) and not pages[2].at(505, 5)
+    h.undo(pages); h.undo(pages)
+    assert len(pages[2]) == 0
@@ -0,0 +1,55 @@
+"""Unit tests for core/dedupe.py"""
+import random
+import fitz
+import numpy as np
+from core.dedupe import dhash, fingerprint_page, find_duplicates, _hamming
+
+
+def _scan(seed, noise=0):
+    rng = np.random.default_rng(seed)
+    page = np.full((170, 120), 255, dtype=np.uint8)
+    for _ in range(12):
+        y, x = rng.integers(10, 150), rng.integers(5, 60)
+        page[y:y + 6, x:x + rng.integers(20, 55)] = 0
+    if noise:
+        page = np.clip(page.astype(int) + np.random.default_rng(seed + 99).integers(-noise, noise, page.shape), 0, 255)
+    return page.astype(np.uint8)
+
+
+def test_dhash_tolerates_noise_but_not_other_pages():
+    a, a_noisy, b = dhash(_scan(1)), dhash(_scan(1, noise=20)), dhash(_scan(2))
+    assert _hamming(a, a_noisy) < 24 < _hamming(a, b)
+
+
+def test_find_duplicates_mixed_text_and_scans():
+    h1, h2 = dhash(_scan(1)), dhash(_scan(2))
+    fps = [
+        (h1, None),            # 0 scan
+        (h2, "t-a"),           # 1 text page
+        (dhash(_scan(1, 20)), None),  # 2 rescan of 0
+        (h1 ^ 1, "t-b"),       # 3 text page with the same look as 0: compared by image (0 is a scan)
+        (h2, "t-c"),           # 4 same look as 1 but different text: not a duplicate
+        (None, "t-a"),         # 5 same text as 1
+        (None, None),          # 6 blank
+        (None, None),          # 7 blank
+    ]
+    assert find_duplicates(fps) == {2: 0, 3: 0, 5: 1}
+
+
+def test_find_duplicates_scales_without_pairwise_compare():
+    rng = random.Random(0)
+    base = [rng.getrandbits(256) for _ in range(3000)]
+    fps = [(h, None) for h in base] + [(h ^ (1 << rng.randrange(256)), None) for h in base[:50]]
+    dups = find_duplicates(fps)
+    assert dups == {3000 + i: i for i in range(50)}
+
+
+def test_fingerprint_pdf_page():
+    doc = fitz.open()
+    for _ in range(2):
+        page = doc.new_page(width=300, height=400)
+        page.insert_text((20, 50), "1- Same   question", fontsize=12)
+    doc.new_page(width=300, height=400)
+    a, b, blank = (fingerprint_page(('pdf', doc, i)) for i in range(3))
+    assert a == b and a[1] is not None
+    assert blank == (None, None)
@@ -0,0 +1,113 @@
+"""Unit tests for core/incremental.py"""
+import json
+import sqlite3
+import pytest
+from core import bank_store
+from core.incremental import IncrementalBanks, question_blocks
+from core.parser import QuestionParser
+
+SOURCE = "intro line\n1. Q1?\na) A\nanswer: a\n2. Q2?\na) A\nanswer: a\n3. Q3?\na) A\nanswer: a\n"
+
+
+def test_blocks_start_at_question_lines():
+    blocks = question_blocks(QuestionParser(config_path="none.json"), SOURCE.splitlines(True))
+    assert [b[0] for b in blocks] == ["intro line\n", "1. Q1?\n", "2. Q2?\n", "3. Q3?\n"]
+
+
+def test_refresh_patches_only_changed_questions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "src.txt"
+    src.write_text(SOURCE, encoding="utf-8")
+    parser = QuestionParser(config_path="none.json")
+    inc = IncrementalBanks(parser, str(src), "src", {}, False)
+    bank = tmp_path / "banks" / "src" / "bank.json"
+
+    assert list(inc.refresh().values()) == [3]
+    expected = tmp_path / "expected.json"
+    with open(expected, 'w', encoding='utf-8') as f:
+        json.dump(parser.parse_text(str(src))[0][1], f, indent=2, ensure_ascii=False)
+    assert bank.read_bytes() == expected.read_bytes()
+    assert inc.refresh() == {}
+
+    # An edit made to the bank after export survives a source change elsewhere
+    data = json.loads(bank.read_text(encoding="utf-8"))
+    data[0]["explanation"] = "kept"
+    bank.write_text(json.dumps(data), encoding="utf-8")
+    src.write_text(SOURCE.replace("2. Q2?\na) A\nanswer: a", "2. Q2?\na) A\nb) B\nanswer: b\n2. Q2b?\na) A"),
+                   encoding="utf-8")
+    assert list(inc.refresh().values()) == [2]
+    data = json.loads(bank.read_text(encoding="utf-8"))
+    assert data[0]["explanation"] == "kept"
+    assert [q["correct_options"] for q in data] == [[0], [1], [], [0]]
+
+
+def test_refresh_with_key_tables(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "src.txt"
+    src.write_text("1. Q1?\na) A\nb) B\n2. Q2?\na) A\nb) B\n1-a 2-b\n", encoding="utf-8")
+    inc = IncrementalBanks(QuestionParser(config_path="none.json"), str(src), "src", {"answer_key": True}, False)
+    inc.refresh()
+    bank = tmp_path / "banks" / "src" / "bank.json"
+    assert [q["correct_options"] for q in json.loads(bank.read_text(encoding="utf-8"))] == [[0], [1]]
+    src.write_text("1. Q1?\na) A\nb) B\n2. Q2?\na) A\nb) B\n1-a 2-a\n", encoding="utf-8")
+    assert list(inc.refresh().values()) == [1]
+    assert [q["correct_options"] for q in json.loads(bank.read_text(encoding="utf-8"))] == [[0], [0]]
+
+
+def test_locked_bank_is_retried(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bank_store, "LOCK_TIMEOUT", 0.05)
+    src = tmp_path / "src.txt"
+    src.write_text(SOURCE, encoding="utf-8")
+    parser = QuestionParser(config_path="none.json")
+    parser.config["bank_storage"] = "sqlite"
+    inc = IncrementalBanks(parser, str(src), "src", {}, False)
+    inc.refresh()
+
+    src.write_text(SOURCE.replace("2. Q2?\na) A\nanswer: a", "2. Q2?\na) A\nb) B\nanswer: b"), encoding="utf-8")
+    lock = sqlite3.connect(str(tmp_path / "banks" / "src" / bank_store.BANK_DB))
+    lock.execute("BEGIN EXCLUSIVE")
+    with pytest.raises(sqlite3.OperationalError):
+        inc.refresh()
+    lock.rollback()
+    lock.close()
+    assert list(inc.refresh().values()) == [1]
+    with bank_store.open_bank(str(tmp_path / "banks" / "src")) as store:
+        assert store.get(1)["correct_options"] == [1]
+
+
+def test_same_layout_updates_rows_in_place(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "src.txt"
+    src.write_text(SOURCE, encoding="utf-8")
+    parser = QuestionParser(config_path="none.json")
+    parser.config["bank_storage"] = "sqlite"
+    inc = IncrementalBanks(parser, str(src), "src", {}, False)
+    inc.refresh()
+
+    def no_rewrite(self, questions):
+        raise AssertionError("whole bank rewritten")
+    monkeypatch.setattr(bank_store.SqliteBankStore, "replace_all", no_rewrite)
+    src.write_text(SOURCE.replace("3. Q3?\na) A\nanswer: a", "3. Q3?\na) A\nb) B\nanswer: b"), encoding="utf-8")
+    assert list(inc.refresh().values()) == [1]
+    with bank_store.open_bank(str(tmp_path / "banks" / "src")) as store:
+        assert [q["correct_options"] for q in store.load_all()] == [[0], [0], [1]]
+
+
+def test_viewer_deletions_and_edits_survive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "src.txt"
+    src.write_text(SOURCE, encoding="utf-8")
+    inc = IncrementalBanks(QuestionParser(config_path="none.json"), str(src), "src", {}, False)
+    inc.refresh()
+    folder = str(tmp_path / "banks" / "src")
+    with bank_store.open_bank(folder) as store:
+        store.delete(0)
+        store.update(0, {**store.get(0), "explanation": "kept"})
+
+    src.write_text(SOURCE.replace("3. Q3?\na) A\nanswer: a", "3. Q3?\na) A\nb) B\nanswer: b"), encoding="utf-8")
+    assert list(inc.refresh().values()) == [1]
+    with bank_store.open_bank(folder) as store:
+        data = store.load_all()
+    assert [q["question"] for q in data] == ["2.", "3."]
+    assert data[0]["explanation"] == "kept" and data[1]["correct_options"] == [1]
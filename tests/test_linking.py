@@ -0,0 +1,47 @@
+"""Unit tests for core/linking.py"""
+import fitz
+from core.crops import Crop
+from core.linking import question_anchors, align_to_bank, link_crops
+from core.pdf_ops import PDF_ZOOM
+
+
+def _pdf():
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=800)
+    page.insert_text((30, 50), "1- First question", fontsize=11)
+    page.insert_text((30, 300), "2- Second question", fontsize=11)
+    page = doc.new_page(width=400, height=800)
+    page.insert_text((30, 200), "3. Third question", fontsize=11)
+    return doc
+
+
+def _crop(top, bottom, gid=None, order=None, note=False):
+    return Crop(20 * PDF_ZOOM, top * PDF_ZOOM, 300 * PDF_ZOOM, (bottom - top) * PDF_ZOOM, gid, order, note)
+
+
+def test_anchors_in_scene_coordinates():
+    doc = _pdf()
+    anchors = question_anchors(('pdf', doc, 0))
+    assert [a[0] for a in anchors] == [1, 2]
+    assert 35 * PDF_ZOOM < anchors[0][2] < 50 * PDF_ZOOM
+    assert question_anchors(('img', "x.png", None)) == []
+
+
+def test_align_skips_strays_and_restarts():
+    assert align_to_bank([1, 2019, 2, 1, 2], [1, 2, 3, 1, 2]) == [0, None, 1, 3, 4]
+
+
+def test_link_numbers_parts_and_reports():
+    doc = _pdf()
+    files = [('pdf', doc, 0), ('pdf', doc, 1)]
+    bank = [{"question": "1."}, {"question": "2."}, {"question": "3."}, {"question": "4."}]
+    pages = {
+        0: [_crop(30, 100), _crop(100, 150, note=True), _crop(280, 400)],
+        1: [_crop(20, 120), _crop(20, 120)],  # continues question 2 from the previous page
+    }
+    pages[1][1] = pages[1][1].replace(id=2, order=3)  # already right, left alone
+    changes, report = link_crops(files, pages, bank)
+    assert changes == {(0, 0): (1, 1), (0, 1): (1, 1), (0, 2): (2, 1), (1, 0): (2, 2)}
+    assert report["uncropped"] == [(2, 3)]
+    assert report["missing_in_pdf"] == [4]
+    assert not report["orphan_crops"] and not report["unmatched_numbers"]
@@ -0,0 +1,48 @@
+"""Unit tests for core/numbering.py"""
+import random
+import pytest
+from core.crops import Crop
+from core.numbering import AutoIdIndex, is_auto_numbered
+
+
+def crop(gid=None, is_note=False):
+    return Crop(0, 0, 10, 10, id=gid, is_note=is_note)
+
+
+def naive_start(pages, page):
+    return 1 + sum(is_auto_numbered(c) for p, lst in pages.items() if p < page for c in lst)
+
+
+def test_predicate():
+    assert is_auto_numbered(crop())
+    assert not is_auto_numbered(crop(7))
+    assert not is_auto_numbered(crop(is_note=True))
+    assert is_auto_numbered(crop(0))
+
+
+def test_start_for_skips_manual_and_notes():
+    pages = {0: [crop(), crop(), crop(is_note=True)], 1: [crop(5)], 3: [crop()]}
+    index = AutoIdIndex.from_pages(pages, 5)
+    assert [index.start_for(p) for p in range(5)] == [1, 3, 3, 3, 4]
+    assert index.total() == 3
+
+
+def test_updates_match_full_recount():
+    rng = random.Random(3)
+    n = 64
+    pages = {}
+    index = AutoIdIndex(n)
+    for _ in range(500):
+        p = rng.randrange(n)
+        pages[p] = [crop(rng.choice([None, None, 4]), rng.random() < 0.2) for _ in range(rng.randrange(4))]
+        index.set_page(p, pages[p])
+        q = rng.randrange(n + 1)
+        assert index.start_for(q) == naive_start(pages, q)
+
+
+def test_out_of_range_page_raises():
+    index = AutoIdIndex(3)
+    for page in (-1, 3):
+        with pytest.raises(IndexError):
+            index.set_count(page, 2)
+    assert index.total() == 0
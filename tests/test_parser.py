@@ -115,3 +115,71 @@ def test_save_banks(tmp_path, parser, english_txt):
         assert len(data) == 2
     finally:
         os.chdir(original_cwd)
+
+
+def test_parse_iter_events(tmp_path, parser):
+    p = tmp_path / "multi.txt"
+    p.write_text("1. Q1?\na) A\n2. Q2?\na) A\n1. Q3?\na) A\nanswer: a\n", encoding="utf-8")
+    events = list(parser.parse_iter(str(p), split_lectures=True))
+    assert [k for k, _ in events] == ["question", "question", "lecture", "question", "lecture"]
+    assert [v for k, v in events if k == "lecture"] == ["_Lecture_1", "_Lecture_2"]
+    assert events[3][1]["correct_options"] == [0]
+
+
+def test_save_banks_stream_matches_save_banks(tmp_path, parser, arabic_txt):
+    content = open(arabic_txt, encoding="utf-8").read()
+    p = tmp_path / "multi.txt"
+    p.write_text(content + "\n" + content, encoding="utf-8")
+    original_cwd = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        for split in (False, True):
+            a = parser.save_banks(parser.parse_text(str(p), split_lectures=split, multiline_note=True), "list")
+            b = parser.save_banks_stream(parser.parse_iter(str(p), split_lectures=split, multiline_note=True), "stream")
+            assert [x.replace("list", "stream") for x in a] == b
+            for x, y in zip(a, b):
+                with open(os.path.join(x, "bank.json"), 'rb') as fa, open(os.path.join(y, "bank.json"), 'rb') as fb:
+                    assert fa.read() == fb.read()
+        assert not [f for f in os.listdir("banks") if f.endswith(".tmp")]
+    finally:
+        os.chdir(original_cwd)
+
+
+def test_keyword_rules_follow_config_order(tmp_path):
+    cfg = tmp_path / "config.json"
+    cfg.write_text(json.dumps({"answer_keywords": ["الحل", "answer"], "note_keywords": ["hint", "note"]}), encoding="utf-8")
+    parser = QuestionParser(config_path=str(cfg))
+    p = tmp_path / "q.txt"
+    # The first configured keyword present decides, even when a later one would match
+    p.write_text("1. Q?\na) A\nb) B\nanswer: b then الحل\n2. Q?\nanswer: a note: x hint: y\n", encoding="utf-8")
+    (_, qs), = parser.parse_text(str(p))
+    assert qs[0]["correct_options"] == []
+    assert qs[1]["correct_options"] == [0] and qs[1]["explanation"] == "hint: y"
+
+
+def test_parse_parallel_matches_sequential(tmp_path, parser, arabic_txt):
+    from core.parser import chunk_offsets
+    block = open(arabic_txt, encoding="utf-8").read() + "3. ثالث\nأ) نعم\nالجواب: أ\nشرح أول\nسطر تابع\n"
+    p = tmp_path / "big.txt"
+    p.write_bytes((block * 40).replace("\n", "\r\n").encode("utf-8"))
+    chunks = chunk_offsets(str(p), 500)
+    assert len(chunks) > 5 and chunks[0][0] == 0 and chunks[-1][1] == p.stat().st_size
+    for opts in ({}, {"split_lectures": True, "multiline_note": True}, {"inline_note": True}):
+        expected = list(parser.parse_iter(str(p), **opts))
+        assert list(parser.parse_parallel(str(p), workers=2, chunk_size=500, **opts)) == expected
+
+
+def test_answer_key_tables(tmp_path, parser):
+    from core.parser import key_table_pairs
+    assert key_table_pairs("1-a 2-c, 3) b") == {1: 0, 2: 2, 3: 1}
+    assert key_table_pairs("1- a") is None and key_table_pairs("1- a", continuing=True) == {1: 0}
+    assert key_table_pairs("1. Apple is red") is None
+    p = tmp_path / "keyed.txt"
+    p.write_text("1. Q?\nأ) A\nب) B\n2. Q?\nأ) A\nب) B\nanswer: a\n"
+                 "Key:\n1-ب 2-ب\n"
+                 "1. Q?\na) A\nb) B\n2. Q?\n3. Q?\n1-b 2-a\n3-b\n", encoding="utf-8")
+    banks = parser.parse_text(str(p), split_lectures=True, answer_key=True)
+    # An inline answer wins over the key; a table's last row may hold a single pair
+    assert [[q["correct_options"] for q in qs] for _, qs in banks] == [[[1], [0]], [[1], [0], [1]]]
+    # Off by default: key lines are read as (odd) questions
+    assert len(parser.parse_text(str(p))[0][1]) > 4
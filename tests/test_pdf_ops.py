@@ -1,8 +1,10 @@
 """Unit tests for core/pdf_ops.py"""
+import json
 import os
 import sys
 import types
 import pytest
+import numpy as np
 from unittest.mock import MagicMock
 from PIL import Image
 
@@ -40,7 +42,11 @@ def _make_qt_stubs():
 # Install stubs before importing the module under test
 _QRectF = _make_qt_stubs()
 
-from core.pdf_ops import save_cropped_images_merged  # noqa: E402
+import fitz  # noqa: E402
+from core.pdf_ops import (save_cropped_images_merged, find_projection_blocks, analyze_raster_layout,  # noqa: E402
+                          find_question_media, ensure_jpeg_derivative, write_derivative,
+                          snap_to_content, stamp_template, build_file_list, list_image_folder,
+                          render_page_gray, PDF_ZOOM, TEXT_SIDECAR)
 
 
 def test_merge_and_save_single_image(tmp_path):
@@ -117,3 +123,200 @@ def test_invalid_crop_region_skipped(tmp_path):
     count = save_cropped_images_merged(file_list, pages_data, dest)
     assert count == 0
 
+
+
+def _synthetic_page(blocks, width=600, height=850):
+    """White page with a few black 'text lines' per block, like a scanned question sheet."""
+    page = np.full((height, width), 255, dtype=np.uint8)
+    for top, n_lines, x0, x1 in blocks:
+        for k in range(n_lines):
+            y = top + k * 20
+            page[y:y + 10, x0:x1] = 0
+    return page
+
+
+def test_projection_blocks_split_on_large_gaps():
+    page = _synthetic_page([(120, 4, 50, 550), (260, 3, 80, 500), (400, 5, 50, 300)])
+    blocks = find_projection_blocks(page)
+    assert len(blocks) == 3
+    x0, y0, x1, y1 = blocks[1]
+    assert (x0, y0, x1, y1) == (80, 260, 500, 310)
+
+
+def test_projection_blocks_ignore_header_and_footer_bands():
+    page = _synthetic_page([(20, 2, 50, 550), (200, 3, 50, 550), (820, 1, 50, 550)])
+    assert len(find_projection_blocks(page)) == 1
+
+
+def test_projection_blocks_blank_page():
+    assert find_projection_blocks(np.full((500, 400), 255, dtype=np.uint8)) == []
+
+
+def test_analyze_raster_layout_scales_to_image_pixels(tmp_path):
+    page = _synthetic_page([(240, 4, 100, 1100), (520, 4, 100, 1100)], width=1200, height=1700)
+    img_path = str(tmp_path / "scan.png")
+    Image.fromarray(page).save(img_path)
+
+    rects = analyze_raster_layout('img', img_path, None)
+    assert len(rects) == 2
+    # Raster was profiled at half size; rects must come back in full-size pixels
+    assert abs(rects[0].left() - 95) <= 4
+    assert abs(rects[0].right() - 1105) <= 4
+
+
+def test_snap_follows_shifted_content_but_not_neighbours():
+    # Block 2 sits 12px lower than the template rect; the end of block 1 is inside the margin
+    page = _synthetic_page([(120, 4, 50, 550), (262, 3, 80, 500)])
+    x, y, w, h = snap_to_content(page, 1.0, (70, 250, 440, 50), margin=80)
+    assert (x + 5, y + 5, x + w - 5, y + h - 5) == (80, 262, 500, 312)
+    assert snap_to_content(page, 1.0, (50, 600, 100, 50), margin=25) == (50, 600, 100, 50)
+
+
+def test_stamp_template_scales_to_page(tmp_path):
+    page = _synthetic_page([(240, 4, 100, 1100)], width=1200, height=1700)
+    img_path = str(tmp_path / "scan.png")
+    Image.fromarray(page).save(img_path)
+    template = [(0.05, 0.1, 0.9, 0.25, False), (0.1, 0.5, 0.5, 0.1, True)]
+
+    (rect, is_note), (_, note) = stamp_template(('img', img_path, None), template)
+    assert (rect.left(), rect.top(), rect.right(), rect.bottom()) == (60, 170, 1140, 595)
+    assert (is_note, note) == (False, True)
+
+    (snapped, _), _ = stamp_template(('img', img_path, None), template, snap=True)
+    assert abs(snapped.top() - 235) <= 4 and abs(snapped.bottom() - 315) <= 4
+    assert abs(snapped.left() - 95) <= 4 and abs(snapped.right() - 1105) <= 4
+
+
+def _tiff_book(path, n=3):
+    frames = [Image.new("L", (120, 170), 255) for _ in range(n)]
+    for i, f in enumerate(frames):
+        f.paste(0, (10, 20 + 40 * i, 110, 30 + 40 * i))
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+
+def test_tiff_frames_become_lazy_pages(tmp_path):
+    tif = str(tmp_path / "book.tif")
+    _tiff_book(tif)
+    Image.new("RGB", (10, 10)).save(str(tmp_path / "p.png"))
+    pages = build_file_list([tif, str(tmp_path / "p.png")])
+    assert pages == [('img', tif, 0), ('img', tif, 1), ('img', tif, 2), ('img', str(tmp_path / "p.png"), None)]
+    gray, _ = render_page_gray(*pages[2])
+    assert gray[100:110].min() == 0 and gray[20:30].min() == 255
+
+
+def test_export_crops_from_tiff_frame(tmp_path):
+    tif = str(tmp_path / "book.tif")
+    _tiff_book(tif)
+    pages_data = {1: [{'rect': _QRectF(0, 50, 120, 30), 'id': 1, 'order': 0, 'is_note': False}]}
+    dest = str(tmp_path / "out")
+    assert save_cropped_images_merged(build_file_list([tif]), pages_data, dest) == 1
+    with Image.open(os.path.join(dest, "1.jpg")) as out:
+        assert np.asarray(out.convert("L"))[10:20].mean() < 60
+
+
+def test_list_image_folder_natural_order(tmp_path):
+    for name in ("IMG_10.jpg", "IMG_2.JPG", "notes.txt", ".hidden.png", "IMG_1.png"):
+        (tmp_path / name).write_bytes(b"")
+    assert [os.path.basename(p) for p in list_image_folder(str(tmp_path))] == ["IMG_1.png", "IMG_2.JPG", "IMG_10.jpg"]
+
+
+def _text_pdf():
+    doc = fitz.open()
+    page = doc.new_page(width=300, height=400)
+    page.insert_text((20, 50), "1- First question", fontsize=12)
+    page.insert_text((20, 150), "a) option one", fontsize=12)
+    return doc
+
+
+def test_pdf_export_stacks_clipped_parts(tmp_path):
+    doc = _text_pdf()
+    z = PDF_ZOOM
+    file_list = [('pdf', doc, 0)]
+    pages_data = {
+        0: [
+            {'rect': _QRectF(10 * z, 30 * z, 200 * z, 30 * z), 'id': 1, 'order': 1, 'is_note': False},
+            {'rect': _QRectF(10 * z, 130 * z, 100 * z, 30 * z), 'id': 1, 'order': 2, 'is_note': False},
+        ]
+    }
+
+    dest = str(tmp_path / "output")
+    count = save_cropped_images_merged(file_list, pages_data, dest, export_format="pdf")
+    assert count == 1
+    assert not os.path.exists(os.path.join(dest, "1.jpg"))
+    with fitz.open(os.path.join(dest, "1.pdf")) as snippet:
+        page = snippet.load_page(0)
+        assert (round(page.rect.width), round(page.rect.height)) == (200, 60)
+        text = page.get_text()
+        assert text.index("First question") < text.index("option one")
+
+
+def test_jpeg_derivative_rendered_on_demand(tmp_path):
+    doc = _text_pdf()
+    z = PDF_ZOOM
+    pages_data = {0: [{'rect': _QRectF(10 * z, 30 * z, 200 * z, 30 * z), 'id': None, 'order': None, 'is_note': False}]}
+    dest = str(tmp_path / "images")
+    save_cropped_images_merged([('pdf', doc, 0)], pages_data, dest, export_format="pdf")
+
+    media = find_question_media(dest, 1)
+    assert media.endswith("1.pdf")
+    jpg = ensure_jpeg_derivative(media)
+    assert jpg.endswith("1.raster.jpg")
+    assert Image.open(jpg).size == (200 * z, 30 * z)
+    # Derivatives are never picked as the primary file
+    assert find_question_media(dest, 1) == media
+
+
+def test_capture_text_sidecar_follows_part_order(tmp_path):
+    doc = _text_pdf()
+    z = PDF_ZOOM
+    pages_data = {
+        0: [
+            {'rect': _QRectF(10 * z, 130 * z, 200 * z, 30 * z), 'id': 1, 'order': 2, 'is_note': False},
+            {'rect': _QRectF(10 * z, 30 * z, 200 * z, 30 * z), 'id': 1, 'order': 1, 'is_note': False},
+        ]
+    }
+    dest = str(tmp_path / "output")
+    save_cropped_images_merged([('pdf', doc, 0)], pages_data, dest, capture_text=True)
+
+    with open(os.path.join(dest, TEXT_SIDECAR), encoding="utf-8") as f:
+        texts = json.load(f)
+    assert texts == {"1": ["1- First question", "a) option one"]}
+
+
+def test_no_sidecar_without_capture(tmp_path):
+    img = Image.new("RGB", (100, 100), color=(255, 255, 255))
+    img_path = str(tmp_path / "source.jpg")
+    img.save(img_path)
+    pages_data = {0: [{'rect': _QRectF(0, 0, 80, 40), 'id': 1, 'order': 0, 'is_note': False}]}
+    dest = str(tmp_path / "output")
+    save_cropped_images_merged([('img', img_path, None)], pages_data, dest)
+    assert not os.path.exists(os.path.join(dest, TEXT_SIDECAR))
+
+
+def test_derivatives_written_in_same_pass(tmp_path):
+    img = Image.new("RGB", (2000, 1000), color=(200, 30, 30))
+    img_path = str(tmp_path / "source.png")
+    img.save(img_path)
+    pages_data = {
+        0: [
+            {'rect': _QRectF(0, 0, 1800, 300), 'id': 1, 'order': 1, 'is_note': False},
+            {'rect': _QRectF(0, 400, 1800, 300), 'id': 1, 'order': 2, 'is_note': False},
+        ]
+    }
+    derivatives = {"viewer": {"max_width": 900}, "telegram": {"max_width": 1280, "max_bytes": 50000}}
+    dest = str(tmp_path / "output")
+    save_cropped_images_merged([('img', img_path, None)], pages_data, dest, derivatives=derivatives)
+
+    assert Image.open(os.path.join(dest, "1.jpg")).size == (1800, 600)
+    assert Image.open(os.path.join(dest, "1.viewer.jpg")).size == (900, 300)
+    assert Image.open(os.path.join(dest, "1.telegram.jpg")).width <= 1280
+    assert os.path.getsize(os.path.join(dest, "1.telegram.jpg")) <= 50000
+    assert ensure_jpeg_derivative(os.path.join(dest, "1.jpg"), "viewer").endswith("1.viewer.jpg")
+
+
+def test_stale_derivative_falls_back_to_primary(tmp_path):
+    primary = str(tmp_path / "3.jpg")
+    write_derivative(Image.new("RGB", (1000, 100)), str(tmp_path / "3.viewer.jpg"), {"max_width": 500})
+    Image.new("RGB", (50, 50)).save(primary)
+    os.utime(str(tmp_path / "3.viewer.jpg"), (0, 0))
+    assert ensure_jpeg_derivative(primary, "viewer") == primary
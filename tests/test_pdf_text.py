@@ -0,0 +1,33 @@
+"""Unit tests for core/pdf_text.py"""
+import fitz
+import core.pdf_text as pdf_text
+from core.pdf_text import page_lines, iter_pdf_lines
+from core.parser import QuestionParser
+
+
+def _question_pdf(path):
+    doc = fitz.open()
+    body = [["1. First?", "a) yes", "b) no", "answer: b"], ["2. Second?", "a) yes"], ["b) no", "answer: a", "note: spans pages"]]
+    for n, lines in enumerate(body, 1):
+        page = doc.new_page(width=400, height=600)
+        page.insert_text((30, 30), "Course header", fontsize=10)
+        page.insert_text((190, 585), f"3. page {n}", fontsize=10)  # a footer that looks like a question
+        for i, text in enumerate(lines):
+            page.insert_text((30, 100 + 20 * i), text, fontsize=11)
+    doc.save(str(path))
+    return str(path)
+
+
+def test_page_lines_skip_bands(tmp_path):
+    with fitz.open(_question_pdf(tmp_path / "q.pdf")) as doc:
+        assert page_lines(doc[0]) == ["1. First?\n", "a) yes\n", "b) no\n", "answer: b\n"]
+
+
+def test_pdf_to_bank(tmp_path, monkeypatch):
+    path = _question_pdf(tmp_path / "q.pdf")
+    monkeypatch.setattr(pdf_text, "PAGES_PER_TASK", 1)
+    assert list(iter_pdf_lines(path, workers=2)) == list(iter_pdf_lines(path))
+    (_, qs), = QuestionParser(config_path=str(tmp_path / "none.json")).parse_text(path)
+    assert [(q["question"], q["options"], q["correct_options"]) for q in qs] == \
+        [("1.", ["a)", "b)"], [1]), ("2.", ["a)", "b)"], [0])]
+    assert qs[1]["explanation"] == "note: spans pages"
@@ -0,0 +1,26 @@
+"""Unit tests for core/profiler.py"""
+from core.profiler import EventProfiler
+
+
+def test_disabled_records_nothing():
+    p = EventProfiler()
+    with p.measure("paint"):
+        pass
+    assert p.summary() == []
+
+
+def test_summary_and_report():
+    p = EventProfiler(window=10)
+    for ms in range(1, 21):
+        p.record("move", ms / 1000)
+    p.record("paint", 0.5)
+    (slowest, count, mean, p95, worst), move = p.summary()
+    assert slowest == "paint" and count == 1
+    assert move[1] == 20 and round(move[2], 3) == 10.5 and move[4] == 20
+    assert round(move[3]) == 20  # p95 over the last 10 samples only
+    p.enabled = True
+    with p.measure("press"):
+        pass
+    assert "press" in p.report()
+    p.reset()
+    assert p.summary() == []
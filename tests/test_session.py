@@ -0,0 +1,89 @@
+"""Unit tests for core/session.py"""
+import os
+from core.crops import Crop
+from core.session import (SessionJournal, load_session, describe_sources, changed_sources, page_rows,
+                          row_crop, backup_session, default_session_path, JOURNAL_SUFFIX)
+
+
+def _source(tmp_path, data=b"%PDF-1.4 fake"):
+    p = tmp_path / "book.pdf"
+    p.write_bytes(data)
+    return str(p)
+
+
+def test_journal_replay(tmp_path):
+    src = _source(tmp_path)
+    path = str(tmp_path / "s.cropsession")
+    j = SessionJournal(path, describe_sources([src]), {0: page_rows([Crop(1, 2, 3, 4)])})
+    j.record_page(5, page_rows([Crop(10, 20, 30, 40, id=7, order=1)]))
+    j.record_page(0, [])
+    j.record_meta(current=5)
+    j.flush()
+    # Not compacted yet: the state comes from snapshot + journal, as after a crash
+    assert os.path.getsize(path + JOURNAL_SUFFIX) > 0
+    sources, pages, meta = load_session(path)
+    assert sources[0]["path"] == os.path.abspath(src)
+    assert pages[0] == [] and meta["current"] == 5
+    c = row_crop(pages[5][0])
+    assert (c.geometry(), c.id, c.order, c.is_note) == ((10, 20, 30, 40), 7, 1, False)
+    j.close()
+    assert os.path.getsize(path + JOURNAL_SUFFIX) == 0
+    assert load_session(path)[1] == {5: pages[5]}
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "s.cropsession")
+    j = SessionJournal(path, [], {})
+    j.record_page(1, page_rows([Crop(0, 0, 5, 5)]))
+    j.flush()
+    with open(path + JOURNAL_SUFFIX, 'a', encoding='utf-8') as f:
+        f.write('{"p":2,"c":[[0,0')
+    _, pages, _ = load_session(path)
+    assert list(pages) == [1]
+    j.close()
+
+
+def test_periodic_compaction(tmp_path):
+    path = str(tmp_path / "s.cropsession")
+    j = SessionJournal(path, [], {}, compact_every=10)
+    for i in range(25):
+        j.record_page(i, page_rows([Crop(i, 0, 5, 5)]))
+        j.flush()
+    with open(path + JOURNAL_SUFFIX, encoding='utf-8') as f:
+        assert len(f.readlines()) < 10
+    assert len(load_session(path)[1]) == 25
+    j.close()
+
+
+def test_changed_sources(tmp_path):
+    src = _source(tmp_path)
+    sources = describe_sources([src])
+    assert changed_sources(sources) == []
+    with open(src, 'ab') as f:
+        f.write(b"more")
+    assert changed_sources(sources) == [os.path.abspath(src)]
+    os.remove(src)
+    assert changed_sources(sources) == [os.path.abspath(src)]
+
+
+def test_declined_session_stays_readable(tmp_path):
+    src = _source(tmp_path)
+    path = default_session_path([src])
+    old = SessionJournal(path, describe_sources([src]), {3: page_rows([Crop(1, 2, 3, 4)])})
+    old.record_page(4, page_rows([Crop(5, 6, 7, 8)]))
+    old.flush()  # Left uncompacted, as after a crash
+
+    # Declined or mismatched resume: the old session moves aside before a new one takes the path
+    bak = backup_session(path)
+    SessionJournal(path, describe_sources([src]), {}).close()
+    assert sorted(load_session(bak)[1]) == [3, 4]
+    assert load_session(path)[1] == {}
+    assert backup_session(path) != bak
+    old.close()
+
+
+def test_session_path_covers_every_source(tmp_path):
+    a, b = str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")
+    assert default_session_path([a]) != default_session_path([a, b])
+    assert default_session_path([a, b]) != default_session_path([a, str(tmp_path / "c.pdf")])
+    assert default_session_path([a, b]).startswith(a)
@@ -0,0 +1,95 @@
+"""Unit tests for core/undo.py"""
+import pytest
+from core.undo import (UndoHistory, CropCommand, ReplaceCrop, InsertCrop, RemoveCrop, MoveCrop,
+                       ReplacePage, CompoundCommand)
+
+
+def crop(top, **kw):
+    return {'rect': top, 'id': None, 'order': None, 'is_note': False, **kw}
+
+
+@pytest.fixture
+def pages():
+    return {0: [crop(10), crop(50), crop(90)], 3: [crop(20)]}
+
+
+def test_insert_undo_redo(pages):
+    h = UndoHistory()
+    new = crop(30)
+    h.execute(InsertCrop(0, 1, new), pages)
+    assert pages[0][1] is new
+    assert h.undo(pages) == {0}
+    assert len(pages[0]) == 3
+    h.redo(pages)
+    assert pages[0][1] is new
+
+
+def test_drag_merges_into_one_step(pages):
+    h = UndoHistory()
+    original = pages[0][0]
+    h.seal()
+    for top in (11, 12, 13):
+        h.execute(ReplaceCrop(0, 0, pages[0][0], crop(top)), pages, merge=True)
+    assert pages[0][0]['rect'] == 13
+    h.undo(pages)
+    assert pages[0][0] is original
+    assert not h.can_undo
+
+
+def test_seal_splits_drags(pages):
+    h = UndoHistory()
+    h.execute(ReplaceCrop(0, 0, pages[0][0], crop(11)), pages, merge=True)
+    h.seal()
+    h.execute(ReplaceCrop(0, 0, pages[0][0], crop(12)), pages, merge=True)
+    h.undo(pages)
+    assert pages[0][0]['rect'] == 11
+
+
+def test_compound_remove_restores_order(pages):
+    h = UndoHistory()
+    before = list(pages[0])
+    h.execute(CompoundCommand([RemoveCrop(0, 2, pages[0][2]), RemoveCrop(0, 0, pages[0][0])]), pages)
+    assert [c['rect'] for c in pages[0]] == [50]
+    h.undo(pages)
+    assert pages[0] == before
+
+
+def test_move_and_replace_page(pages):
+    h = UndoHistory()
+    h.execute(MoveCrop(0, 0, 2), pages)
+    assert [c['rect'] for c in pages[0]] == [50, 90, 10]
+    h.execute(ReplacePage(5, [], [crop(1)]), pages)
+    assert h.undo(pages) == {5}
+    assert pages[5] == []
+    h.undo(pages)
+    assert [c['rect'] for c in pages[0]] == [10, 50, 90]
+
+
+def test_new_command_clears_redo(pages):
+    h = UndoHistory()
+    h.execute(InsertCrop(3, 0, crop(1)), pages)
+    h.undo(pages)
+    assert h.can_redo
+    h.execute(InsertCrop(3, 0, crop(2)), pages)
+    assert not h.can_redo
+
+
+def test_limit_drops_oldest():
+    pages = {0: []}
+    h = UndoHistory(limit=3)
+    for i in range(5):
+        h.execute(InsertCrop(0, i, crop(i)), pages)
+    steps = 0
+    while h.undo(pages) is not None:
+        steps += 1
+    assert steps == 3
+    assert [c['rect'] for c in pages[0]] == [0, 1]
+
+
+def test_incomplete_command_fails_on_creation():
+    class RedoOnly(CropCommand):
+        def redo(self, pages):
+            pass
+
+    with pytest.raises(TypeError):
+        RedoOnly()
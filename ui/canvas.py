@@ -1,7 +1,14 @@
 # --- START OF FILE ui/canvas.py ---
 from PyQt6.QtWidgets import QGraphicsRectItem, QGraphicsScene, QGraphicsView, QGraphicsPixmapItem
-from PyQt6.QtCore import Qt, QRectF, pyqtSignal, QPointF
-from PyQt6.QtGui import QPen, QBrush, QColor, QFont, QPainter, QWheelEvent, QAction
+from PyQt6.QtCore import Qt, QRectF, pyqtSignal, QPointF, QTimer
+from PyQt6.QtGui import (QPen, QBrush, QColor, QFont, QFontMetricsF, QPainter, QWheelEvent, QAction,
+                         QStaticText, QTransform)
+
+from core.profiler import EventProfiler
+
+GEOMETRY_FLUSH_MS = 16  # Drag updates reach the window at most once per frame
+BADGE_H = 24
+HANDLE_SIZE = 6
 
 class Handle:
     NONE = 0
@@ -32,7 +39,17 @@ class ImageEditorView(QGraphicsView):
         factor = 1.15 if zoom_in else 1 / 1.15
         self.scale(factor, factor)
 
+    def paintEvent(self, event):
+        with self.scene().profiler.measure("view_paint"):
+            super().paintEvent(event)
+
 class CropItem(QGraphicsRectItem):
+    # Created on first paint (QFont needs a QGuiApplication), then shared by all items
+    _font = None
+    _metrics = None
+    # (is_linked_child, is_note) -> (pen, brush, badge colour)
+    _styles = {}
+
     def __init__(self, rect, scene_parent, unique_id, display_text, is_linked_child=False, is_note=False):
         super().__init__(rect)
         self.scene_parent = scene_parent
@@ -40,6 +57,7 @@ class CropItem(QGraphicsRectItem):
         self.display_text = display_text
         self.is_linked_child = is_linked_child
         self.is_note = is_note
+        self._label = None  # (QStaticText, badge width), rebuilt when the text changes
         
         self.setFlags(QGraphicsRectItem.GraphicsItemFlag.ItemIsSelectable)
         self.setAcceptHoverEvents(True)
@@ -47,58 +65,75 @@ class CropItem(QGraphicsRectItem):
         self.update_style()
         
         self.current_handle = Handle.NONE
+        self._hover_handle = None
         self.resize_start_pos = None
         self.initial_rect = None
         self.is_interacting = False
 
+    def sync(self, rect, unique_id, display_text, is_linked_child, is_note):
+        """Updates the item in place; repaints only when something visible changed."""
+        self.unique_id = unique_id
+        if rect != self.rect() and not self.is_interacting:
+            self.setRect(rect)
+        if (display_text, is_linked_child, is_note) != (self.display_text, self.is_linked_child, self.is_note):
+            self.display_text = display_text
+            self.is_linked_child = is_linked_child
+            self.is_note = is_note
+            self._label = None
+            self.update_style()
+            self.update()
+
+    @classmethod
+    def _style(cls, is_linked_child, is_note):
+        key = (is_linked_child, is_note)
+        if key not in cls._styles:
+            # Default Red, Linked (Child) Green, Note Blue
+            color, fill, badge = QColor("#FF3333"), QColor(255, 51, 51, 50), QColor("#D90000")
+            if is_linked_child:
+                color, fill, badge = QColor("#4CAF50"), QColor(76, 175, 80, 50), QColor("#388E3C")
+            if is_note:
+                color, fill, badge = QColor("#4da3ff"), QColor(77, 163, 255, 50), QColor("#1976D2")
+            cls._styles[key] = (QPen(color, 2, Qt.PenStyle.SolidLine), QBrush(fill), badge)
+        return cls._styles[key]
+
     def update_style(self):
-        # Default Red
-        color = QColor("#FF3333") 
-        fill = QColor(255, 51, 51, 50)
-        
-        # Linked (Child) Green
-        if self.is_linked_child:
-            color = QColor("#4CAF50")
-            fill = QColor(76, 175, 80, 50)
-            
-        # Note Blue
-        if self.is_note:
-            color = QColor("#4da3ff")
-            fill = QColor(77, 163, 255, 50)
+        pen, brush, _ = self._style(self.is_linked_child, self.is_note)
+        self.setPen(pen)
+        self.setBrush(brush)
 
-        self.setPen(QPen(color, 2, Qt.PenStyle.SolidLine))
-        self.setBrush(QBrush(fill))
+    def _badge(self):
+        if CropItem._font is None:
+            CropItem._font = QFont("Segoe UI", 10, QFont.Weight.Bold)
+            CropItem._metrics = QFontMetricsF(CropItem._font)
+        if self._label is None:
+            text = str(self.display_text)
+            static = QStaticText(text)
+            static.prepare(QTransform(), CropItem._font)
+            self._label = (static, max(24.0, CropItem._metrics.horizontalAdvance(text) + 10))
+        return self._label
 
     def paint(self, painter, option, widget):
-        super().paint(painter, option, widget)
-        rect = self.rect()
-        
-        bg_color = QColor("#D90000")
-        if self.is_linked_child: bg_color = QColor("#388E3C")
-        if self.is_note: bg_color = QColor("#1976D2")
-        
-        text = str(self.display_text)
-        font = QFont("Segoe UI", 10, QFont.Weight.Bold)
-        fm = lambda: painter.fontMetrics()
-        
-        badge_w = max(24, fm().horizontalAdvance(text) + 10)
-        badge_h = 24
-
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(bg_color)
-        painter.drawRect(QRectF(rect.left(), rect.top(), badge_w, badge_h))
-        painter.setPen(Qt.GlobalColor.white)
-        painter.setFont(font)
-        painter.drawText(QRectF(rect.left(), rect.top(), badge_w, badge_h), 
-                         Qt.AlignmentFlag.AlignCenter, text)
-        
-        if self.isSelected():
-            painter.setBrush(Qt.GlobalColor.white)
-            painter.setPen(QPen(Qt.GlobalColor.black, 1))
-            r = 6
-            for x, y in [(rect.left(), rect.top()), (rect.right()-r, rect.top()),
-                         (rect.right()-r, rect.bottom()-r), (rect.left(), rect.bottom()-r)]:
-                painter.drawRect(QRectF(x, y, r, r))
+        with self.scene_parent.profiler.measure("item_paint"):
+            super().paint(painter, option, widget)
+            rect = self.rect()
+            static, badge_w = self._badge()
+            size = static.size()
+
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self._style(self.is_linked_child, self.is_note)[2])
+            painter.drawRect(QRectF(rect.left(), rect.top(), badge_w, BADGE_H))
+            painter.setPen(Qt.GlobalColor.white)
+            painter.setFont(CropItem._font)
+            painter.drawStaticText(QPointF(rect.left() + (badge_w - size.width()) / 2,
+                                           rect.top() + (BADGE_H - size.height()) / 2), static)
+
+            if self.isSelected():
+                painter.setBrush(Qt.GlobalColor.white)
+                painter.setPen(QPen(Qt.GlobalColor.black, 1))
+                r = HANDLE_SIZE
+                for x, y in [(rect.left(), rect.top()), (rect.right()-r, rect.top()),
+                             (rect.right()-r, rect.bottom()-r), (rect.left(), rect.bottom()-r)]:
+                    painter.drawRect(QRectF(x, y, r, r))
 
     def get_handle_at(self, pos):
         r = self.rect(); m = 10
@@ -110,14 +145,17 @@ class CropItem(QGraphicsRectItem):
         if r.contains(pos): return Handle.MOVE
         return Handle.NONE
 
+    _cursors = {
+        Handle.TOP_LEFT: Qt.CursorShape.SizeFDiagCursor, Handle.BOTTOM_RIGHT: Qt.CursorShape.SizeFDiagCursor,
+        Handle.TOP_RIGHT: Qt.CursorShape.SizeBDiagCursor, Handle.BOTTOM_LEFT: Qt.CursorShape.SizeBDiagCursor,
+        Handle.MOVE: Qt.CursorShape.SizeAllCursor
+    }
+
     def hoverMoveEvent(self, event):
         handle = self.get_handle_at(event.pos())
-        cursors = {
-            Handle.TOP_LEFT: Qt.CursorShape.SizeFDiagCursor, Handle.BOTTOM_RIGHT: Qt.CursorShape.SizeFDiagCursor,
-            Handle.TOP_RIGHT: Qt.CursorShape.SizeBDiagCursor, Handle.BOTTOM_LEFT: Qt.CursorShape.SizeBDiagCursor,
-            Handle.MOVE: Qt.CursorShape.SizeAllCursor
-        }
-        self.setCursor(cursors.get(handle, Qt.CursorShape.ArrowCursor))
+        if handle != self._hover_handle:
+            self._hover_handle = handle
+            self.setCursor(self._cursors.get(handle, Qt.CursorShape.ArrowCursor))
         super().hoverMoveEvent(event)
 
     def mousePressEvent(self, event):
@@ -135,27 +173,33 @@ class CropItem(QGraphicsRectItem):
 
     def mouseMoveEvent(self, event):
         if self.is_interacting and self.current_handle != Handle.NONE:
-            diff = event.scenePos() - self.resize_start_pos
-            r = self.initial_rect
-            l, t, w, h = r.left(), r.top(), r.width(), r.height()
-            dx, dy = diff.x(), diff.y()
-
-            if self.current_handle == Handle.MOVE:
-                new_l = l + dx; new_t = t + dy
-                self.setRect(new_l, new_t, w, h)
-            else:
-                if self.current_handle in [Handle.LEFT, Handle.TOP_LEFT, Handle.BOTTOM_LEFT]: l += dx; w -= dx
-                if self.current_handle in [Handle.RIGHT, Handle.TOP_RIGHT, Handle.BOTTOM_RIGHT]: w += dx
-                if self.current_handle in [Handle.TOP, Handle.TOP_LEFT, Handle.TOP_RIGHT]: t += dy; h -= dy
-                if self.current_handle in [Handle.BOTTOM, Handle.BOTTOM_LEFT, Handle.BOTTOM_RIGHT]: h += dy
-                
-                if w > 10 and h > 10: self.setRect(l, t, w, h)
-            
-            self.scene_parent.notify_geometry_change(self.unique_id, self.rect())
+            with self.scene_parent.profiler.measure("item_drag"):
+                self._drag_to(event.scenePos())
         else:
             super().mouseMoveEvent(event)
 
+    def _drag_to(self, scene_pos):
+        diff = scene_pos - self.resize_start_pos
+        r = self.initial_rect
+        l, t, w, h = r.left(), r.top(), r.width(), r.height()
+        dx, dy = diff.x(), diff.y()
+
+        if self.current_handle == Handle.MOVE:
+            new_l = l + dx; new_t = t + dy
+            self.setRect(new_l, new_t, w, h)
+        else:
+            if self.current_handle in [Handle.LEFT, Handle.TOP_LEFT, Handle.BOTTOM_LEFT]: l += dx; w -= dx
+            if self.current_handle in [Handle.RIGHT, Handle.TOP_RIGHT, Handle.BOTTOM_RIGHT]: w += dx
+            if self.current_handle in [Handle.TOP, Handle.TOP_LEFT, Handle.TOP_RIGHT]: t += dy; h -= dy
+            if self.current_handle in [Handle.BOTTOM, Handle.BOTTOM_LEFT, Handle.BOTTOM_RIGHT]: h += dy
+            
+            if w > 10 and h > 10: self.setRect(l, t, w, h)
+        
+        self.scene_parent.notify_geometry_change(self.unique_id, self.rect())
+
     def mouseReleaseEvent(self, event):
+        if self.is_interacting:
+            self.scene_parent.flush_geometry()
         self.is_interacting = False
         self.current_handle = Handle.NONE
         super().mouseReleaseEvent(event)
@@ -171,16 +215,48 @@ class EditorScene(QGraphicsScene):
         self.start_point = None
         self.current_temp_item = None
         self.note_mode = False
+        self.page_crops = None  # callable -> PageCrops of the shown page, set by the window
+        self.profiler = EventProfiler()
+        self._identity = QTransform()
+        # Drags are coalesced: the latest rect per item is emitted once per frame and on release
+        self._pending_geometry = {}
+        self._geometry_timer = QTimer(self)
+        self._geometry_timer.setSingleShot(True)
+        self._geometry_timer.setInterval(GEOMETRY_FLUSH_MS)
+        self._geometry_timer.timeout.connect(self.flush_geometry)
 
     def notify_interaction_start(self):
+        self.flush_geometry()
         self.interaction_started.emit()
 
     def notify_geometry_change(self, idx, rect):
-        self.item_geometry_changed.emit(idx, rect)
+        self._pending_geometry[idx] = QRectF(rect)
+        if not self._geometry_timer.isActive():
+            self._geometry_timer.start()
+
+    def flush_geometry(self):
+        self._geometry_timer.stop()
+        pending, self._pending_geometry = self._pending_geometry, {}
+        with self.profiler.measure("geometry_commit"):
+            for idx, rect in pending.items():
+                self.item_geometry_changed.emit(idx, rect)
+
+    def view_transform(self):
+        views = self.views()
+        return views[0].transform() if views else self._identity
 
     def mousePressEvent(self, event):
-        clicked_item = self.itemAt(event.scenePos(), QGraphicsView().transform())
-        is_background = (clicked_item is None) or isinstance(clicked_item, QGraphicsPixmapItem)
+        with self.profiler.measure("scene_press"):
+            self._press(event)
+
+    def _press(self, event):
+        pos = event.scenePos()
+        if self.page_crops is not None:
+            # The page's grid index answers without walking the scene's items
+            is_background = not self.page_crops().at(pos.x(), pos.y())
+        else:
+            clicked_item = self.itemAt(pos, self.view_transform())
+            is_background = (clicked_item is None) or isinstance(clicked_item, QGraphicsPixmapItem)
 
         if is_background and event.button() == Qt.MouseButton.LeftButton:
             self.drawing = True
@@ -196,12 +272,17 @@ class EditorScene(QGraphicsScene):
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if self.drawing:
-            new_rect = QRectF(self.start_point, event.scenePos()).normalized()
-            self.current_temp_item.setRect(new_rect)
-        super().mouseMoveEvent(event)
+        with self.profiler.measure("scene_move"):
+            if self.drawing:
+                new_rect = QRectF(self.start_point, event.scenePos()).normalized()
+                self.current_temp_item.setRect(new_rect)
+            super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
+        with self.profiler.measure("scene_release"):
+            self._release(event)
+
+    def _release(self, event):
         if self.drawing:
             self.drawing = False
             final_rect = self.current_temp_item.rect()
@@ -1,15 +1,28 @@
 # --- START OF FILE ui/extractor.py ---
 # (Keep imports and logic the same, just adding setLayoutDirection in __init__)
 import os
+import re
+import sqlite3
+import time
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QLineEdit, QCheckBox, 
                              QFileDialog, QMessageBox, QGroupBox, QRadioButton,
-                             QDialog, QTextBrowser)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+                             QDialog, QTextBrowser, QProgressBar, QListWidget)
+from PyQt6.QtCore import Qt, QThread, QTimer, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QFont
-from core.config import ConfigManager
+from core.config import ConfigManager, CONFIG_PATH
 from ui.common import tr
 
+WATCH_DEBOUNCE_MS = 300  # Editors write a save in several steps; refresh once they settle
+PREVIEW_DEBOUNCE_MS = 250  # Quiet time after the last option/keyword change before re-parsing
+PREVIEW_HEAD_CHARS = 64 * 1024  # The preview is shown for this much text first, then for the whole file
+PREVIEW_SAMPLES = 5
+
+def bank_base_name(file_path, use_filename, folder_name):
+    if use_filename:
+        return os.path.splitext(os.path.basename(file_path))[0]
+    return folder_name if folder_name else "Untitled_Bank"
+
 class HelpDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -28,7 +41,7 @@ class ProcessingWorker(QThread):
     finished = pyqtSignal(str) 
     error = pyqtSignal(str)
 
-    def __init__(self, file_path, folder_name, use_filename, split_lecture, create_imgs, inline_note, multiline_note):
+    def __init__(self, file_path, folder_name, use_filename, split_lecture, create_imgs, inline_note, multiline_note, answer_key=False):
         super().__init__()
         from core.parser import QuestionParser 
         self.parser_cls = QuestionParser
@@ -39,35 +52,115 @@ class ProcessingWorker(QThread):
         self.create_imgs = create_imgs
         self.inline_note = inline_note
         self.multiline_note = multiline_note
+        self.answer_key = answer_key
 
     def run(self):
         try:
             parser = self.parser_cls()
-            banks = parser.parse_text(
+            base_name = bank_base_name(self.file_path, self.use_filename, self.folder_name)
+            # Streamed straight to disk, so large dumps never sit in memory whole;
+            # a file larger than one chunk is parsed on all cores
+            events = parser.parse_parallel(
                 self.file_path, 
                 split_lectures=self.split_lecture,
                 inline_note=self.inline_note,
-                multiline_note=self.multiline_note
+                multiline_note=self.multiline_note,
+                answer_key=self.answer_key
             )
-            if not banks:
+            paths = parser.save_banks_stream(events, base_name, self.create_imgs)
+            if not paths:
                 self.error.emit(tr("no_detect_msg"))
                 return
-            base_name = ""
-            if self.use_filename:
-                base_name = os.path.splitext(os.path.basename(self.file_path))[0]
-            else:
-                base_name = self.folder_name if self.folder_name else "Untitled_Bank"
-            paths = parser.save_banks(banks, base_name, self.create_imgs)
-            msg = f"{tr('success_header')}!\nProcessed {len(banks)} sections.\nSaved to:\n" + "\n".join(paths)
+            msg = f"{tr('success_header')}!\nProcessed {len(paths)} sections.\nSaved to:\n" + "\n".join(paths)
             self.finished.emit(msg)
         except Exception as e:
             self.error.emit(str(e))
 
+def split_keywords(text):
+    return [k.strip() for k in re.split(r"[,،]", text) if k.strip()]
+
+class PreviewWorker(QThread):
+    """Parses the source with the current settings and reports a summary, head first.
+
+    Stale runs are interrupted; results carry the generation they were
+    started for, so a late one from an old run is simply ignored.
+    """
+    ready = pyqtSignal(int, object)  # generation, summary dict
+
+    def __init__(self, generation, file_path, config, options):
+        super().__init__()
+        self.generation = generation
+        self.file_path = file_path
+        self.config = config
+        self.options = options
+
+    def run(self):
+        from core.parser import QuestionParser, source_lines
+        parser = QuestionParser(config=self.config)
+        summary = {"questions": 0, "answered": 0, "noted": 0, "lectures": [], "current": 0,
+                   "samples": [], "complete": False, "error": ""}
+        read = 0
+        head_sent = False
+
+        def lines(src):
+            nonlocal read
+            for line in src:
+                if self.isInterruptionRequested(): return
+                read += len(line)
+                yield line
+
+        try:
+            with source_lines(self.file_path) as src:
+                for kind, value in parser.parse_lines(lines(src), **self.options):
+                    if kind == "question":
+                        summary["questions"] += 1
+                        summary["current"] += 1
+                        summary["answered"] += bool(value["correct_options"])
+                        summary["noted"] += bool(value["explanation"])
+                        if len(summary["samples"]) < PREVIEW_SAMPLES: summary["samples"].append(value)
+                    else:
+                        summary["lectures"].append((value, summary["current"]))
+                        summary["current"] = 0
+                    if not head_sent and read >= PREVIEW_HEAD_CHARS:
+                        head_sent = True
+                        self.ready.emit(self.generation, dict(summary, lectures=list(summary["lectures"])))
+        except Exception as e:
+            summary["error"] = str(e)
+        if self.isInterruptionRequested(): return
+        summary["complete"] = True
+        self.ready.emit(self.generation, summary)
+
+class BatchWorker(QThread):
+    """Converts many files on a process pool; this thread only collects the results."""
+    file_done = pyqtSignal(str, str)  # path, error ("" on success)
+    finished = pyqtSignal(str)
+
+    def __init__(self, jobs, options, create_imgs):
+        super().__init__()
+        self.jobs = jobs
+        self.options = options
+        self.create_imgs = create_imgs
+
+    def run(self):
+        from core.batch import convert_batch
+        start = time.perf_counter()
+        done = failed = questions = lines = size = 0
+        for path, result, err in convert_batch(self.jobs, self.options, self.create_imgs):
+            if result is not None and not result["banks"]: err = tr("no_detect_msg")
+            if err:
+                failed += 1
+            else:
+                done += 1
+                questions += result["questions"]; lines += result["lines"]; size += result["bytes"]
+            self.file_done.emit(path, err or "")
+        secs = max(time.perf_counter() - start, 1e-6)
+        self.finished.emit(tr("batch_summary").format(done, failed, questions, secs, lines / secs, size / secs / 1e6))
+
 class TextExtractorWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle(tr("ext_title"))
-        self.resize(650, 650)
+        self.resize(650, 900)
         
         # RTL Check
         if ConfigManager.get_language() == "ar":
@@ -76,6 +169,21 @@ class TextExtractorWindow(QMainWindow):
             self.setLayoutDirection(Qt.LayoutDirection.LeftToRight)
             
         self.selected_file = None
+        self.batch_files = []
+        self.incremental = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_source_changed)
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(WATCH_DEBOUNCE_MS)
+        self.watch_timer.timeout.connect(self.refresh_watched)
+        self.preview_generation = 0
+        self.preview_worker = None
+        self.stale_previews = []
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.start_preview)
         self.init_ui()
 
     def init_ui(self):
@@ -156,13 +264,23 @@ class TextExtractorWindow(QMainWindow):
         v_file = QVBoxLayout()
         h_sel = QHBoxLayout()
         self.lbl_file = QLineEdit()
-        self.lbl_file.setPlaceholderText("Select .txt file...")
+        self.lbl_file.setPlaceholderText("Select .txt / .pdf file...")
         self.lbl_file.setReadOnly(True)
         btn_browse = QPushButton(tr("browse"))
         btn_browse.clicked.connect(self.browse_file)
+        btn_folder = QPushButton(tr("browse_folder"))
+        btn_folder.clicked.connect(self.browse_folder)
         h_sel.addWidget(self.lbl_file)
         h_sel.addWidget(btn_browse)
+        h_sel.addWidget(btn_folder)
         v_file.addLayout(h_sel)
+        self.progress = QProgressBar()
+        self.progress.setVisible(False)
+        self.batch_log = QListWidget()
+        self.batch_log.setVisible(False)
+        self.batch_log.setMaximumHeight(140)
+        v_file.addWidget(self.progress)
+        v_file.addWidget(self.batch_log)
         gb_file.setLayout(v_file)
         layout.addWidget(gb_file)
 
@@ -171,13 +289,38 @@ class TextExtractorWindow(QMainWindow):
         self.chk_split = QCheckBox(tr("opt_split"))
         self.chk_inline = QCheckBox(tr("opt_inline"))
         self.chk_multiline = QCheckBox(tr("opt_multiline"))
+        self.chk_key_table = QCheckBox(tr("opt_key_table"))
         self.chk_split.setStyleSheet("color: #ffb74d; font-weight: bold;")
         v_opts.addWidget(self.chk_split)
         v_opts.addWidget(self.chk_inline)
         v_opts.addWidget(self.chk_multiline)
+        v_opts.addWidget(self.chk_key_table)
+        from core.parser import QuestionParser
+        cfg = QuestionParser(config_path=CONFIG_PATH).config
+        self.txt_answer_kw = QLineEdit(", ".join(cfg["answer_keywords"]))
+        self.txt_note_kw = QLineEdit(", ".join(cfg["note_keywords"]))
+        self.chk_sqlite = QCheckBox(tr("opt_sqlite"))
+        self.chk_sqlite.setChecked(cfg["bank_storage"] == "sqlite")
+        v_opts.addWidget(self.chk_sqlite)
+        for label, edit in ((tr("answer_kw"), self.txt_answer_kw), (tr("note_kw"), self.txt_note_kw)):
+            h_kw = QHBoxLayout()
+            h_kw.addWidget(QLabel(label))
+            h_kw.addWidget(edit)
+            v_opts.addLayout(h_kw)
+            edit.textChanged.connect(self.schedule_preview)
+        for chk in (self.chk_split, self.chk_inline, self.chk_multiline, self.chk_key_table):
+            chk.toggled.connect(self.schedule_preview)
         gb_opts.setLayout(v_opts)
         layout.addWidget(gb_opts)
 
+        gb_preview = QGroupBox(tr("preview"))
+        v_preview = QVBoxLayout()
+        self.preview = QTextBrowser()
+        self.preview.setMinimumHeight(160)
+        v_preview.addWidget(self.preview)
+        gb_preview.setLayout(v_preview)
+        layout.addWidget(gb_preview)
+
         gb_out = QGroupBox(tr("out_opts"))
         v_out = QVBoxLayout()
         self.radio_fname = QRadioButton(tr("use_fname"))
@@ -194,6 +337,9 @@ class TextExtractorWindow(QMainWindow):
         h_cust.addWidget(self.txt_custom)
         v_out.addLayout(h_cust)
         v_out.addWidget(self.chk_imgs)
+        self.chk_watch = QCheckBox(tr("opt_watch"))
+        self.chk_watch.toggled.connect(lambda on: None if on else self.stop_watch())
+        v_out.addWidget(self.chk_watch)
         gb_out.setLayout(v_out)
         layout.addWidget(gb_out)
 
@@ -203,6 +349,9 @@ class TextExtractorWindow(QMainWindow):
         self.btn_run.setStyleSheet("background-color: #1976D2; color: white; font-weight: bold; font-size: 16px; border: none;")
         self.btn_run.clicked.connect(self.start_processing)
         layout.addWidget(self.btn_run)
+        self.lbl_watch = QLabel("")
+        self.lbl_watch.setStyleSheet("color: #81c784;")
+        layout.addWidget(self.lbl_watch)
         
         btn_back = QPushButton(tr("back_menu"))
         btn_back.setStyleSheet("background: transparent; color: #888; text-decoration: underline; border: none;")
@@ -211,19 +360,88 @@ class TextExtractorWindow(QMainWindow):
         layout.addWidget(btn_back)
 
     def browse_file(self):
-        f, _ = QFileDialog.getOpenFileName(self, tr("open_files"), "", "Text Files (*.txt)")
-        if f:
-            self.selected_file = f
-            self.lbl_file.setText(os.path.basename(f))
+        files, _ = QFileDialog.getOpenFileNames(self, tr("open_files"), "", "Question Sources (*.txt *.pdf)")
+        if files: self.set_sources(files)
+
+    def browse_folder(self):
+        d = QFileDialog.getExistingDirectory(self, tr("browse_folder"))
+        if d: self.set_sources([d])
+
+    def set_sources(self, paths):
+        from core.batch import collect_sources
+        files = collect_sources(paths)
+        if not files:
+            QMessageBox.warning(self, tr("error_header"), tr("error_sel"))
+            return
+        # One file keeps the single-file flow; several go to the batch pool
+        self.selected_file = files[0] if len(files) == 1 else None
+        self.batch_files = files if len(files) > 1 else []
+        self.lbl_file.setText(os.path.basename(files[0]) if len(files) == 1 else tr("batch_files").format(len(files)))
+        self.schedule_preview()
+
+    def parse_options(self):
+        return {"split_lectures": self.chk_split.isChecked(), "inline_note": self.chk_inline.isChecked(),
+                "multiline_note": self.chk_multiline.isChecked(), "answer_key": self.chk_key_table.isChecked()}
+
+    def run_config(self):
+        return {"answer_keywords": split_keywords(self.txt_answer_kw.text()),
+                "note_keywords": split_keywords(self.txt_note_kw.text()),
+                "bank_storage": "sqlite" if self.chk_sqlite.isChecked() else "json"}
+
+    def save_run_config(self):
+        """Runs read keywords and bank storage from config.json, so edited ones are stored there first."""
+        for key, value in self.run_config().items():
+            if ConfigManager.get_config_value(key) != value: ConfigManager.set_config_value(key, value)
+
+    def schedule_preview(self):
+        self.preview_timer.start()
+
+    def start_preview(self):
+        source = self.selected_file or (self.batch_files[0] if self.batch_files else None)
+        if not source: return
+        from core.parser import QuestionParser
+        self.preview_generation += 1
+        if self.preview_worker is not None and self.preview_worker.isRunning():
+            self.preview_worker.requestInterruption()
+            # Kept referenced until it stops; a running QThread must not be destroyed
+            self.stale_previews.append(self.preview_worker)
+            self.preview_worker.finished.connect(lambda w=self.preview_worker: self.stale_previews.remove(w))
+        config = {**QuestionParser(config_path=CONFIG_PATH).config, **self.run_config()}
+        self.preview_worker = PreviewWorker(self.preview_generation, source, config, self.parse_options())
+        self.preview_worker.ready.connect(self.show_preview)
+        self.preview_worker.start()
+
+    def show_preview(self, generation, summary):
+        if generation != self.preview_generation: return
+        lines = []
+        if summary["error"]: lines.append(f"<b>{tr('error_header')}:</b> {summary['error']}")
+        lines.append(tr("preview_summary").format(summary["questions"], summary["answered"], summary["noted"]))
+        lectures = list(summary["lectures"])
+        if not summary["complete"] and summary["current"]: lectures.append(("…", summary["current"]))
+        if len(lectures) > 1:
+            lines.append(tr("preview_lectures").format(len(lectures)) + " " + ", ".join(str(n) for _, n in lectures))
+        if not summary["complete"]: lines.append(f"<i>{tr('preview_partial').format(PREVIEW_HEAD_CHARS // 1024)}</i>")
+        for q in summary["samples"]:
+            answer = ", ".join(q["options"][i] if i < len(q["options"]) else str(i) for i in q["correct_options"]) or "—"
+            note = f" · {q['explanation'][:80]}" if q["explanation"] else ""
+            lines.append(f"<br><b>{q['question']}</b> {' '.join(q['options'])} → {answer}{note}")
+        self.preview.setHtml("<br>".join(lines))
 
     def show_help(self):
         dlg = HelpDialog(self)
         dlg.exec()
 
     def start_processing(self):
+        self.save_run_config()
+        if self.batch_files:
+            self.start_batch()
+            return
         if not self.selected_file:
             QMessageBox.warning(self, tr("error_header"), tr("error_sel"))
             return
+        if self.chk_watch.isChecked():
+            self.start_watch()
+            return
         self.btn_run.setEnabled(False)
         self.btn_run.setText(tr("processing"))
         self.worker = ProcessingWorker(
@@ -233,12 +451,83 @@ class TextExtractorWindow(QMainWindow):
             self.chk_split.isChecked(),
             self.chk_imgs.isChecked(),
             self.chk_inline.isChecked(),
-            self.chk_multiline.isChecked()
+            self.chk_multiline.isChecked(),
+            self.chk_key_table.isChecked()
         )
         self.worker.finished.connect(self.on_success)
         self.worker.error.connect(self.on_error)
         self.worker.start()
 
+    def start_batch(self):
+        from core.batch import plan_jobs
+        # A custom name groups the batch's banks in one folder; otherwise each bank is named after its file
+        group = self.txt_custom.text().strip() if self.radio_custom.isChecked() else ""
+        jobs = plan_jobs(self.batch_files, group)
+        options = self.parse_options()
+        self.btn_run.setEnabled(False)
+        self.btn_run.setText(tr("processing"))
+        self.batch_log.clear()
+        self.batch_log.setVisible(True)
+        self.progress.setRange(0, len(jobs))
+        self.progress.setValue(0)
+        self.progress.setVisible(True)
+        self.worker = BatchWorker(jobs, options, self.chk_imgs.isChecked())
+        self.worker.file_done.connect(self.on_batch_file)
+        self.worker.finished.connect(self.on_success)
+        self.worker.start()
+
+    def on_batch_file(self, path, err):
+        self.progress.setValue(self.progress.value() + 1)
+        name = os.path.basename(path)
+        self.batch_log.addItem(f"✗ {name}: {err}" if err else f"✓ {name}")
+        self.batch_log.scrollToBottom()
+
+    def start_watch(self):
+        """Writes the banks once, then keeps them in step with every save of the source."""
+        from core.incremental import IncrementalBanks
+        from core.parser import QuestionParser
+        self.stop_watch()
+        options = self.parse_options()
+        base_name = bank_base_name(self.selected_file, self.radio_fname.isChecked(), self.txt_custom.text().strip())
+        self.incremental = IncrementalBanks(QuestionParser(), self.selected_file, base_name, options, self.chk_imgs.isChecked())
+        try:
+            written = self.incremental.refresh()
+        except Exception as e:
+            self.incremental = None
+            self.on_error(str(e))
+            return
+        if not written:
+            self.incremental = None
+            QMessageBox.warning(self, tr("error_header"), tr("no_detect_msg"))
+            return
+        self.watcher.addPath(self.selected_file)
+        self.lbl_watch.setText(tr("watch_started").format(sum(written.values()), os.path.basename(self.selected_file)))
+
+    def stop_watch(self):
+        self.watch_timer.stop()
+        if self.watcher.files(): self.watcher.removePaths(self.watcher.files())
+        if self.incremental is not None:
+            self.incremental = None
+            self.lbl_watch.setText(tr("watch_stopped"))
+
+    def on_source_changed(self, path):
+        # Atomic saves replace the file, which drops it from the watcher
+        if path not in self.watcher.files() and os.path.exists(path): self.watcher.addPath(path)
+        self.watch_timer.start()
+
+    def refresh_watched(self):
+        if self.incremental is None: return
+        try:
+            written = self.incremental.refresh()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            # Mid-save reads can fail (missing file, half-written UTF-8), and a bank.db open
+            # in the viewer or sender can be locked; the next change retries
+            self.lbl_watch.setText(f"{tr('error_header')}: {e}")
+            return
+        if written:
+            self.lbl_watch.setText(tr("watch_updated").format(
+                sum(written.values()), ", ".join(os.path.basename(p) for p in written), time.strftime("%H:%M:%S")))
+
     def on_success(self, msg):
         self.btn_run.setEnabled(True)
         self.btn_run.setText(tr("run_btn"))
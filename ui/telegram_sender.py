@@ -13,7 +13,9 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QColor
 
+from core.bank_store import BANK_JSON, bank_storage, open_bank
 from core.config import ConfigManager
+from core.pdf_ops import find_question_media, ensure_jpeg_derivative
 from ui.common import tr
 
 # Try importing Telethon
@@ -51,39 +53,21 @@ class TelegramWorker(QThread):
 
     def get_media_files(self, folder, idx):
         found = []
-        exts = ['.jpg', '.png', '.gif']
         img_dir = os.path.join(folder, "images")
         if not os.path.exists(img_dir): return []
         
-        # Base image
-        for ext in exts:
-            p = os.path.join(img_dir, f"{idx}{ext}")
-            if os.path.exists(p): 
-                found.append(p)
-                break
-        
-        # Sequence images
-        for i in range(1, 11):
-            f_found = False
-            for ext in exts:
-                p = os.path.join(img_dir, f"{idx}_{i}{ext}")
-                if os.path.exists(p):
-                    found.append(p)
-                    f_found = True
-                    break
-            if not f_found: pass 
+        # Base image, then sequence images
+        for stem in [idx] + [f"{idx}_{i}" for i in range(1, 11)]:
+            p = find_question_media(img_dir, stem)
+            if p: found.append(ensure_jpeg_derivative(p, "telegram"))
             
         return sorted(found)
 
     def get_note_media_file(self, folder, idx):
-        exts = ['.jpg', '.png', '.gif']
         img_dir = os.path.join(folder, "images")
         if not os.path.exists(img_dir): return None
-        for ext in exts:
-            p = os.path.join(img_dir, f"{idx}_note{ext}")
-            if os.path.exists(p):
-                return p
-        return None
+        p = find_question_media(img_dir, f"{idx}_note")
+        return ensure_jpeg_derivative(p, "telegram") if p else None
 
     def escape_markdown(self, text):
         if not isinstance(text, str): return str(text)
@@ -92,23 +76,21 @@ class TelegramWorker(QThread):
 
     def run(self):
         try:
-            with open(os.path.join(self.bank_path, "bank.json"), 'r', encoding='utf-8') as f:
-                quizzes = json.load(f)
+            if bank_storage(self.bank_path) is None:
+                raise FileNotFoundError(os.path.join(self.bank_path, BANK_JSON))
+            # Questions are read one at a time, so a bank.db never loads whole
+            with open_bank(self.bank_path) as bank:
+                total = bank.count()
+                if self.mode == "bot":
+                    self.run_bot_mode(bank, total)
+                elif TELETHON_AVAILABLE:
+                    asyncio.run(self.run_user_mode(bank, total))
+                else:
+                    self.error_signal.emit("Telethon not installed.")
         except Exception as e:
             self.error_signal.emit(str(e))
-            return
-
-        total = len(quizzes)
-        
-        if self.mode == "bot":
-            self.run_bot_mode(quizzes, total)
-        else:
-            if TELETHON_AVAILABLE:
-                asyncio.run(self.run_user_mode(quizzes, total))
-            else:
-                self.error_signal.emit("Telethon not installed.")
 
-    def run_bot_mode(self, quizzes, total):
+    def run_bot_mode(self, bank, total):
         token = self.cfg.get("bot_token")
         chat_id = self.cfg.get("chat_id")
         base_url = f"https://api.telegram.org/bot{token}"
@@ -128,7 +110,7 @@ class TelegramWorker(QThread):
                 self.stopped_at_signal.emit(idx)
                 break
                 
-            quiz = quizzes[i]
+            quiz = bank.get(i)
             
             # Check for totally empty question and completely ignore it
             q_text = re.sub(r'^[\d\s\-.)]+', '', quiz.get("question", "")).strip()
@@ -270,7 +252,7 @@ class TelegramWorker(QThread):
             self.finished_signal.emit()
 
 
-    async def run_user_mode(self, quizzes, total):
+    async def run_user_mode(self, bank, total):
         api_id = self.cfg.get("api_id")
         api_hash = self.cfg.get("api_hash")
         chat_id = self.cfg.get("chat_id")
@@ -297,7 +279,7 @@ class TelegramWorker(QThread):
                     self.stopped_at_signal.emit(idx)
                     break
                     
-                quiz = quizzes[i]
+                quiz = bank.get(i)
                 
                 q_text = re.sub(r'^[\d\s\-.)]+', '', quiz.get("question", "")).strip()
                 if not quiz.get("options") and not quiz.get("explanation") and not q_text:
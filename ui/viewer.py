@@ -1,6 +1,5 @@
 # --- START OF FILE ui/viewer.py ---
 import os
-import json
 import shutil
 import re
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -10,9 +9,14 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTextEdit, QFileDialog)
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QPixmap, QFont
+from core.bank_store import bank_storage, convert_bank, open_bank
 from core.config import ConfigManager
+from core.pdf_ops import find_question_media, load_media_pixmap, ensure_jpeg_derivative, TEXT_SIDECAR
 from ui.common import tr
 
+# "12.jpg", "12_note.pdf", "12_2.png", "12.raster.jpg" -> number and the rest of the name
+QUESTION_FILE_RE = re.compile(r'^(\d+)((?:_note|_\d+)?\..+)$')
+
 class OptionEditRow(QWidget):
     def __init__(self, prefix, text, is_correct, on_remove, on_set_correct, button_group):
         super().__init__()
@@ -64,6 +68,7 @@ class QuestionViewer(QMainWindow):
         self.current_bank_data = []
         self.valid_indices = [] # Map UI index -> Actual JSON index
         self.current_bank_path = ""
+        self.store = None
         self.current_q_index = -1
         self.edit_mode = False
         self.temp_correct_idx = 0
@@ -181,6 +186,10 @@ class QuestionViewer(QMainWindow):
         self.combo_banks.currentIndexChanged.connect(self.on_bank_selected)
         header_layout.addWidget(self.combo_banks)
         
+        self.btn_storage = QPushButton()
+        self.btn_storage.clicked.connect(self.convert_storage)
+        header_layout.addWidget(self.btn_storage)
+
         header_layout.addStretch()
         
         self.chk_always_show = QCheckBox(tr("view_always_show"))
@@ -369,15 +378,29 @@ class QuestionViewer(QMainWindow):
     def on_bank_selected(self):
         name = self.combo_banks.currentText()
         self.current_bank_path = os.path.join("banks", name)
-        p = os.path.join(self.current_bank_path, "bank.json")
-        if os.path.exists(p):
-            with open(p, 'r', encoding='utf-8') as f:
-                self.current_bank_data = json.load(f)
+        if self.store is not None: self.store.close()
+        self.store = None
+        has_bank = bank_storage(self.current_bank_path) is not None
+        self.btn_storage.setVisible(has_bank)
+        if has_bank:
+            self.store = open_bank(self.current_bank_path)
+            self.btn_storage.setText(tr("bank_to_json") if self.store.storage == "sqlite" else tr("bank_to_sqlite"))
+            self.current_bank_data = self.store.load_all()
             self.refresh_list(-1)
         else:
             self.current_bank_data = []
             self.list_widget.clear()
 
+    def convert_storage(self):
+        """Switches the current bank between bank.json and bank.db."""
+        target = "json" if self.store.storage == "sqlite" else "sqlite"
+        self.store.close()
+        path = convert_bank(self.current_bank_path, target)
+        QMessageBox.information(self, tr("bank_storage"), tr("bank_converted").format(path))
+        row = self.list_widget.currentRow()
+        self.on_bank_selected()
+        if row >= 0: self.list_widget.setCurrentRow(row)
+
     def refresh_list(self, current_actual_index=-1):
         self.list_widget.blockSignals(True)
         self.list_widget.clear()
@@ -426,10 +449,9 @@ class QuestionViewer(QMainWindow):
             self.lbl_q_num.setText(f"Question #{actual_index+1}")
             self.lbl_q_num.setAlignment(Qt.AlignmentFlag.AlignLeft)
         
-        img_p = os.path.join(self.current_bank_path, "images", f"{actual_index+1}.jpg")
-        if os.path.exists(img_p):
-            pix = QPixmap(img_p)
-            if pix.width() > 900: pix = pix.scaledToWidth(900, Qt.TransformationMode.SmoothTransformation)
+        img_p = find_question_media(os.path.join(self.current_bank_path, "images"), actual_index+1)
+        if img_p:
+            pix = self.load_display_pixmap(img_p)
             self.img_label.setPixmap(pix)
             self.img_label.show()
             self.btn_rep_img.setText("🔄 " + (tr("replace_img") if tr("replace_img") != "replace_img" else "Replace Image"))
@@ -457,6 +479,14 @@ class QuestionViewer(QMainWindow):
         
         QTimer.singleShot(0, lambda: self.scroll_area.verticalScrollBar().setValue(0))
 
+    def load_display_pixmap(self, media_path):
+        # Snippets render at display size; rasters use the export's viewer-size copy when it is fresh
+        if not media_path.lower().endswith(".pdf"):
+            media_path = ensure_jpeg_derivative(media_path, "viewer")
+        pix = load_media_pixmap(media_path, 900)
+        if pix.width() > 900: pix = pix.scaledToWidth(900, Qt.TransformationMode.SmoothTransformation)
+        return pix
+
     def toggle_edit_mode(self):
         self.edit_mode = not self.edit_mode
         q = self.current_bank_data[self.current_q_index]
@@ -528,8 +558,7 @@ class QuestionViewer(QMainWindow):
         q['options'] = final_opts
         q['correct_options'] = [self.temp_correct_idx]
         
-        with open(os.path.join(self.current_bank_path, "bank.json"), 'w', encoding='utf-8') as f:
-            json.dump(self.current_bank_data, f, indent=2, ensure_ascii=False)
+        self.store.update(self.current_q_index, q)
             
         self.toggle_edit_mode()
         self.refresh_list(self.current_q_index)
@@ -579,10 +608,9 @@ class QuestionViewer(QMainWindow):
         
         self.lbl_expl.setText(f"<b>{ans_txt_label} {correct+1}</b><br><br><b>{expl_header}</b><br>{expl_text}")
         
-        note_img_p = os.path.join(self.current_bank_path, "images", f"{self.current_q_index+1}_note.jpg")
-        if os.path.exists(note_img_p):
-            pix = QPixmap(note_img_p)
-            if pix.width() > 900: pix = pix.scaledToWidth(900, Qt.TransformationMode.SmoothTransformation)
+        note_img_p = find_question_media(os.path.join(self.current_bank_path, "images"), f"{self.current_q_index+1}_note")
+        if note_img_p:
+            pix = self.load_display_pixmap(note_img_p)
             self.note_img_label.setPixmap(pix)
             self.note_img_label.show()
         else:
@@ -622,10 +650,16 @@ class QuestionViewer(QMainWindow):
 
     def open_cropper_for_image(self):
         from ui.window import ImageCropperApp
-        img_p = os.path.join(self.current_bank_path, "images", f"{self.current_q_index+1}.jpg")
-        if not os.path.exists(img_p):
+        img_dir = os.path.join(self.current_bank_path, "images")
+        img_p = find_question_media(img_dir, self.current_q_index+1)
+        if not img_p:
             QMessageBox.warning(self, "Error", "No image exists for this question.")
             return
+        if img_p.lower().endswith(".pdf"):
+            # The cropper edits rasters; the cropped result becomes the newest (primary) file
+            jpg_p = os.path.join(img_dir, f"{self.current_q_index+1}.jpg")
+            shutil.copy(ensure_jpeg_derivative(img_p), jpg_p)
+            img_p = jpg_p
         self.cropper_ref = ImageCropperApp(single_image_mode=True)
         self.cropper_ref.load_single_image(img_p)
         self.cropper_ref.show()
@@ -634,36 +668,37 @@ class QuestionViewer(QMainWindow):
         if QMessageBox.question(self, tr("delete"), tr("confirm_delete")) != QMessageBox.StandardButton.Yes: return
         idx = self.current_q_index
         self.current_bank_data.pop(idx)
-        img_dir = os.path.join(self.current_bank_path, "images")
-        
-        t_img = os.path.join(img_dir, f"{idx+1}.jpg")
-        if os.path.exists(t_img): os.remove(t_img)
-        t_note_img = os.path.join(img_dir, f"{idx+1}_note.jpg")
-        if os.path.exists(t_note_img): os.remove(t_note_img)
-        
-        curr = idx + 2
-        while True:
-            old = os.path.join(img_dir, f"{curr}.jpg")
-            old_note = os.path.join(img_dir, f"{curr}_note.jpg")
-            
-            moved_any = False
-            if os.path.exists(old): 
-                shutil.move(old, os.path.join(img_dir, f"{curr-1}.jpg"))
-                moved_any = True
-            if os.path.exists(old_note):
-                shutil.move(old_note, os.path.join(img_dir, f"{curr-1}_note.jpg"))
-                moved_any = True
-                
-            if not moved_any and not os.path.exists(os.path.join(img_dir, f"{curr+1}.jpg")): 
-                break
-            curr += 1
-            
-        with open(os.path.join(self.current_bank_path, "bank.json"), 'w', encoding='utf-8') as f:
-            json.dump(self.current_bank_data, f, indent=2, ensure_ascii=False)
+        self.shift_question_files(os.path.join(self.current_bank_path, "images"), idx + 1)
+        self.store.delete(idx)
             
         next_idx = min(idx, len(self.current_bank_data)-1)
         self.refresh_list(next_idx)
 
+    def shift_question_files(self, img_dir, deleted_num):
+        """Removes every file of question N (images, notes, snippets, derivatives) and renumbers later ones."""
+        if not os.path.isdir(img_dir): return
+        by_num = {}
+        for name in os.listdir(img_dir):
+            m = QUESTION_FILE_RE.match(name)
+            if m: by_num.setdefault(int(m.group(1)), []).append(m.group(2))
+        for rest in by_num.pop(deleted_num, []):
+            os.remove(os.path.join(img_dir, f"{deleted_num}{rest}"))
+        for num in sorted(n for n in by_num if n > deleted_num):
+            for rest in by_num[num]:
+                shutil.move(os.path.join(img_dir, f"{num}{rest}"), os.path.join(img_dir, f"{num-1}{rest}"))
+
+        sidecar = os.path.join(img_dir, TEXT_SIDECAR)
+        if os.path.exists(sidecar):
+            texts = ConfigManager._load_json(sidecar)
+            shifted = {}
+            for key, val in texts.items():
+                num, sep, rest = key.partition("_")
+                if not num.isdigit(): shifted[key] = val; continue
+                if int(num) == deleted_num: continue
+                new_num = int(num) - 1 if int(num) > deleted_num else int(num)
+                shifted[f"{new_num}{sep}{rest}"] = val
+            ConfigManager._save_json(shifted, sidecar)
+
     def go_home(self):
         from ui.menu import MainMenu
         self.menu = MainMenu(None); self.menu.show(); self.close()
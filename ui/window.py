@@ -1,20 +1,65 @@
 # --- START OF FILE ui/window.py ---
 import os
+import json
 import logging
 import fitz
-import copy
+import threading
 from PyQt6.QtWidgets import (QMainWindow, QFileDialog, QMessageBox, 
                              QLabel, QVBoxLayout, QWidget, QToolBar, 
                              QStatusBar, QInputDialog, QProgressDialog, QApplication,
                              QMenu, QPushButton)
 from PyQt6.QtGui import QAction, QKeySequence
-from PyQt6.QtCore import Qt, QSize, QUrl
+from PyQt6.QtCore import Qt, QSize, QUrl, QRectF, QTimer, QThread, pyqtSignal
 
 from core.config import ConfigManager
-from core.pdf_ops import load_pdf_page, load_image_file, save_cropped_images_merged, analyze_pdf_layout
+from core.crops import Crop, CropPages
+from core.answer_key import extract_documents_key, write_answer_key
+from core.bank_store import BANK_DB, SqliteBankStore
+from core.linking import link_crops
+from core.dedupe import fingerprint_page, find_duplicates
+from core.numbering import AutoIdIndex, is_auto_numbered
+from core.session import (SESSION_EXT, SessionJournal, load_session, describe_sources, changed_sources,
+                          default_session_path, backup_session, page_rows, row_crop)
+from core.undo import (UndoHistory, ReplaceCrop, InsertCrop, RemoveCrop, MoveCrop,
+                       ReplacePage, CompoundCommand)
+from core.pdf_ops import (save_cropped_images_merged, detect_page_layout, page_scene_size, stamp_template,
+                          build_file_list, list_image_folder, natural_key, PageCache, IMAGE_EXTS, DEFAULT_DERIVATIVES)
 from ui.common import tr
 from ui.canvas import EditorScene, ImageEditorView, CropItem
 
+class DuplicateScanWorker(QThread):
+    """Fingerprints every page in the background and reports repeated pages."""
+    progress_signal = pyqtSignal(int, int)
+    finished_signal = pyqtSignal(int, dict)  # generation, {duplicate page: first page}
+
+    def __init__(self, sources, generation):
+        super().__init__()
+        # (file_type, path, extra): the worker opens its own documents, fitz objects are not shared across threads
+        self.sources = sources
+        self.generation = generation
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        docs = {}
+        fingerprints = []
+        try:
+            for i, (file_type, path, extra) in enumerate(self.sources):
+                if self._stop_event.is_set(): return
+                obj = path
+                if file_type == 'pdf':
+                    if path not in docs: docs[path] = fitz.open(path)
+                    obj = docs[path]
+                fingerprints.append(fingerprint_page((file_type, obj, extra)))
+                if i % 25 == 0: self.progress_signal.emit(i, len(self.sources))
+            self.finished_signal.emit(self.generation, find_duplicates(fingerprints))
+        except Exception as e:
+            logging.warning("Duplicate page scan failed: %s", e)
+        finally:
+            for d in docs.values(): d.close()
+
 class ImageCropperApp(QMainWindow):
     def __init__(self, single_image_mode=False):
         super().__init__()
@@ -28,31 +73,47 @@ class ImageCropperApp(QMainWindow):
             self.setLayoutDirection(Qt.LayoutDirection.LeftToRight)
 
         self.file_list = []
+        self.page_cache = PageCache()
         self.current_index = 0
         self.merge_alignment = "right"
-        self.pages_crops = {} 
-        self.undo_stack = []
-        self.redo_stack = []
+        self.export_format = "jpg"
+        self.pages_crops = CropPages()
+        self.history = UndoHistory()
+        self.auto_ids = AutoIdIndex()  # first automatic question id per page
+        self.crop_items = {}  # crop uid -> CropItem on the current page
         self.single_image_mode = single_image_mode
+        self.session = None  # SessionJournal autosaving pages_crops
+        self.crop_template = []  # (x, y, w, h, is_note) as fractions of the page size
+        self.duplicates = {}  # page -> earlier page with the same content
+        self.dup_worker = None
+        self._dup_generation = 0
 
         ConfigManager.load_window_state("cropper", self)
         self.init_ui()
 
     def closeEvent(self, event):
         ConfigManager.save_window_state("cropper", self)
+        self.stop_duplicate_scan()
+        if self.session:
+            self.session.close()
+            self.session = None
         super().closeEvent(event)
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
-            supported = ('.pdf', '.png', '.jpg', '.jpeg')
-            if any(url.toLocalFile().lower().endswith(supported) for url in event.mimeData().urls()):
+            supported = ('.pdf',) + IMAGE_EXTS
+            if any(url.toLocalFile().lower().endswith(supported) or os.path.isdir(url.toLocalFile())
+                   for url in event.mimeData().urls()):
                 event.acceptProposedAction()
                 return
         event.ignore()
 
     def dropEvent(self, event):
-        paths = [url.toLocalFile() for url in event.mimeData().urls()
-                 if url.toLocalFile().lower().endswith(('.pdf', '.png', '.jpg', '.jpeg'))]
+        paths = []
+        for url in event.mimeData().urls():
+            p = url.toLocalFile()
+            if os.path.isdir(p): paths.extend(list_image_folder(p))
+            elif p.lower().endswith(('.pdf',) + IMAGE_EXTS): paths.append(p)
         if paths:
             self.load_files(paths)
             event.acceptProposedAction()
@@ -71,6 +132,9 @@ class ImageCropperApp(QMainWindow):
             self.add_action("Home", tr("home"), self.go_home, None)
             self.toolbar.addSeparator()
             self.add_action("Open", tr("open_files"), self.open_files_dialog, None)
+            self.add_action("OpenFolder", tr("open_folder"), self.open_folder_dialog, None)
+            self.add_action("OpenSession", tr("open_session"), self.open_session_dialog, None)
+            self.add_action("SaveSession", tr("save_session"), self.save_session_dialog, None)
             
         self.add_action("Save", tr("save"), self.perform_save_direct, "save")
         
@@ -82,6 +146,21 @@ class ImageCropperApp(QMainWindow):
             self.btn_align.setMenu(menu)
             self.toolbar.addWidget(self.btn_align)
 
+            self.btn_format = QPushButton(tr("export_format_menu") + f" ({tr('format_jpg')})")
+            fmt_menu = QMenu(self)
+            for k in ["jpg", "pdf"]:
+                fmt_menu.addAction(tr(f"format_{k}"), lambda m=k: self.set_export_format(m, tr(f"format_{m}")))
+            self.btn_format.setMenu(fmt_menu)
+            self.toolbar.addWidget(self.btn_format)
+
+            self.act_capture_text = QAction(tr("capture_text"), self)
+            self.act_capture_text.setCheckable(True)
+            self.toolbar.addAction(self.act_capture_text)
+
+            self.act_answer_key = QAction(tr("answer_key"), self)
+            self.act_answer_key.setCheckable(True)
+            self.toolbar.addAction(self.act_answer_key)
+
         self.toolbar.addSeparator()
         self.act_undo = self.add_action("Undo", tr("undo"), self.undo, "undo")
         self.act_redo = self.add_action("Redo", tr("redo"), self.redo, "redo")
@@ -103,26 +182,43 @@ class ImageCropperApp(QMainWindow):
         
         self.add_action("Unlink", tr("unlink_crops"), self.unlink_crop, "unlink")
 
+        self.toolbar.addSeparator()
+        self.act_profiler = QAction(tr("profiler"), self)
+        self.act_profiler.setCheckable(True)
+        self.act_profiler.toggled.connect(self.toggle_profiler)
+        self.toolbar.addAction(self.act_profiler)
+
         if not self.single_image_mode:
             self.toolbar.addSeparator()
             self.add_action("DetectPage", tr("auto_page"), self.auto_detect_current_page, "detect_page")
             self.add_action("DetectBulk", tr("auto_bulk"), self.auto_detect_batch, "detect_bulk")
+            self.add_action("CaptureTemplate", tr("capture_template"), self.capture_template, None)
+            self.add_action("ApplyTemplate", tr("apply_template"), self.apply_template_batch, None)
+            self.add_action("LinkBank", tr("link_bank"), self.link_to_bank, None)
             self.toolbar.addSeparator()
             
             self.act_prev = self.add_action("Prev", tr("prev"), lambda: self.navigate(-1), "prev")
             self.lbl_page_info = QLabel(" 0 / 0 ")
             self.toolbar.addWidget(self.lbl_page_info)
             self.act_next = self.add_action("Next", tr("next"), lambda: self.navigate(1), "next")
+            self.act_skip_dups = QAction(tr("skip_duplicates"), self)
+            self.act_skip_dups.setCheckable(True)
+            self.toolbar.addAction(self.act_skip_dups)
         
         self.update_undo_redo_buttons()
 
         self.scene = EditorScene()
+        self.scene.page_crops = self.get_current_page_crops
         self.view = ImageEditorView(self.scene)
         self.layout.addWidget(self.view)
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
 
-        self.scene.interaction_started.connect(self.push_undo)
+        self.profiler_timer = QTimer(self)
+        self.profiler_timer.setInterval(1000)
+        self.profiler_timer.timeout.connect(self.show_profiler_status)
+
+        self.scene.interaction_started.connect(self.history.seal)
         self.scene.item_geometry_changed.connect(self.handle_geometry_update)
         self.scene.item_created.connect(self.handle_creation)
 
@@ -147,10 +243,33 @@ class ImageCropperApp(QMainWindow):
         else:
             self.act_note_mode.setText("🟩 " + tr("mark_note"))
 
+    def toggle_profiler(self, checked):
+        profiler = self.scene.profiler
+        if checked:
+            profiler.reset()
+            profiler.enabled = True
+            self.profiler_timer.start()
+            return
+        profiler.enabled = False
+        self.profiler_timer.stop()
+        report = profiler.report()
+        logging.info("Canvas profile:\n%s", report)
+        box = QMessageBox(QMessageBox.Icon.Information, tr("profiler"), tr("profiler_report"), parent=self)
+        box.setDetailedText(report)
+        box.exec()
+
+    def show_profiler_status(self):
+        stats = {name: p95 for name, _, _, p95, _ in self.scene.profiler.summary()}
+        self.status_bar.showMessage("  |  ".join(f"{k} p95 {v:.1f} ms" for k, v in stats.items()), 1500)
+
     def set_alignment(self, mode, label):
         self.merge_alignment = mode
         self.btn_align.setText(tr("align_menu") + f" ({label})")
 
+    def set_export_format(self, fmt, label):
+        self.export_format = fmt
+        self.btn_format.setText(tr("export_format_menu") + f" ({label})")
+
     def go_home(self):
         from ui.menu import MainMenu
         self.menu = MainMenu(None)
@@ -158,17 +277,7 @@ class ImageCropperApp(QMainWindow):
         self.close()
 
     def get_current_page_crops(self):
-        if self.current_index not in self.pages_crops: self.pages_crops[self.current_index] = []
-        return self.pages_crops[self.current_index]
-
-    def _calc_auto_id_start(self):
-        count = 1
-        for p in sorted(self.pages_crops.keys()):
-            if p == self.current_index: break
-            for item in self.pages_crops[p]:
-                if item.get('id') is None and not item.get('is_note', False): 
-                    count += 1
-        return count
+        return self.pages_crops.setdefault(self.current_index)
 
     def link_crop_manual(self):
         sel = self.scene.selectedItems()
@@ -177,147 +286,359 @@ class ImageCropperApp(QMainWindow):
         data = self.get_current_page_crops()[item.unique_id]
         
         # Changed Default ID to current max - 1 (previous question)
-        default_id = max(1, self._calc_auto_id_start() - 1)
+        default_id = max(1, self.auto_ids.start_for(self.current_index) - 1)
         gid, ok = QInputDialog.getInt(self, tr("link_crops"), tr("link_prompt_id"), default_id, 1, 99999)
         if ok:
             order, ok2 = QInputDialog.getInt(self, tr("link_crops"), tr("link_prompt_order"), 1, 0, 99)
             if ok2:
-                self.push_undo()
-                data['id'] = gid; data['order'] = order
+                self.execute(ReplaceCrop(self.current_index, item.unique_id, data, data.replace(id=gid, order=order)))
                 self.draw_overlays_only()
 
     def unlink_crop(self):
-        self.push_undo()
-        for item in self.scene.selectedItems():
-            if isinstance(item, CropItem):
-                c = self.get_current_page_crops()[item.unique_id]
-                c['id'] = None; c['order'] = None; c['is_note'] = False
+        lst = self.get_current_page_crops()
+        cmds = [ReplaceCrop(self.current_index, item.unique_id, lst[item.unique_id],
+                            lst[item.unique_id].replace(id=None, order=None, is_note=False))
+                for item in self.scene.selectedItems() if isinstance(item, CropItem)]
+        if cmds: self.execute(CompoundCommand(cmds))
         self.draw_overlays_only()
 
     def renumber_selected_crop(self):
         sel = self.scene.selectedItems()
         if not sel: return
-        self.push_undo()
         item = sel[0]
         lst = self.get_current_page_crops()
         if item.unique_id < len(lst):
              new_pos, ok = QInputDialog.getInt(self, tr("renumber"), "Position:", item.unique_id + 1, 1, len(lst))
              if ok:
-                 lst.insert(new_pos-1, lst.pop(item.unique_id))
+                 self.execute(MoveCrop(self.current_index, item.unique_id, new_pos-1))
                  self.draw_overlays_only()
     
     def delete_selected_crop(self):
         sel = self.scene.selectedItems()
         if not sel: return
-        self.push_undo()
         lst = self.get_current_page_crops()
-        for i in sorted([x.unique_id for x in sel if isinstance(x, CropItem)], reverse=True):
-            if i < len(lst): lst.pop(i)
+        cmds = [RemoveCrop(self.current_index, i, lst[i])
+                for i in sorted([x.unique_id for x in sel if isinstance(x, CropItem)], reverse=True) if i < len(lst)]
+        if cmds: self.execute(CompoundCommand(cmds))
         self.draw_overlays_only()
 
     def handle_geometry_update(self, idx, rect):
-        self.get_current_page_crops()[idx]['rect'] = rect
+        data = self.get_current_page_crops()[idx]
+        self.execute(ReplaceCrop(self.current_index, idx, data, data.with_rect(rect)), merge=True)
+        self.warn_overlaps(self.get_current_page_crops()[idx])
         
     def handle_creation(self, rect, is_note):
         # Setup automatic linking correctly for notes
-        prev_id = max(1, self._calc_auto_id_start() - 1)
+        prev_id = max(1, self.auto_ids.start_for(self.current_index) - 1)
         new_id = prev_id if is_note else None
         
-        self.get_current_page_crops().append({'rect': rect, 'id': new_id, 'order': None, 'is_note': is_note})
-        self.get_current_page_crops().sort(key=lambda x: x['rect'].top())
+        crop = self.make_crop(rect, new_id, None, is_note)
+        lst = self.get_current_page_crops()
+        pos = lst.sorted_position(crop.top)
+        if pos is not None:
+            self.execute(InsertCrop(self.current_index, pos, crop))
+        else:
+            # Manual renumbering left the page unsorted; keep the old re-sort semantics
+            self.execute(ReplacePage(self.current_index, lst, sorted([*lst, crop], key=lambda x: x.top)))
         self.draw_overlays_only()
+        self.warn_overlaps(crop)
+
+    def warn_overlaps(self, crop):
+        """Status-bar hint when a drawn or edited crop covers others (its merge would repeat their content)."""
+        n = len(self.get_current_page_crops().overlapping(crop))
+        if n: self.status_bar.showMessage(tr("crop_overlaps").format(n), 4000)
+
+    def make_crop(self, rect, gid=None, order=None, is_note=False):
+        return Crop.from_rect(rect, id=gid, order=order, is_note=is_note)
 
     def draw_overlays_only(self):
-        self.scene.clearSelection()
-        for i in self.scene.items(): 
-            if isinstance(i, CropItem): self.scene.removeItem(i)
+        """Syncs the scene's CropItems with the current page, touching only items that changed."""
         crops = self.get_current_page_crops()
-        cnt = self._calc_auto_id_start()
+        cnt = self.auto_ids.start_for(self.current_index)
+        live = {}
         for i, d in enumerate(crops):
-            is_note = d.get('is_note', False)
-            lbl = f"{d['id']}_{d['order']}" if d.get('id') else str(cnt)
+            is_note = d.is_note
+            lbl = f"{d.id}_{d.order}" if d.id else str(cnt)
             if is_note:
                 lbl += " (N)"
-            if not d.get('id') and not is_note: 
+            if is_auto_numbered(d):
                 cnt += 1
-            self.scene.addItem(CropItem(d['rect'], self.scene, i, lbl, bool(d.get('id')), is_note))
+            item = self.crop_items.pop(d.uid, None)
+            if item is None:
+                item = CropItem(QRectF(*d.geometry()), self.scene, i, lbl, bool(d.id), is_note)
+                self.scene.addItem(item)
+            else:
+                item.sync(QRectF(*d.geometry()), i, lbl, bool(d.id), is_note)
+            live[d.uid] = item
+        for stale in self.crop_items.values():
+            self.scene.removeItem(stale)
+        self.crop_items = live
 
     def auto_detect_current_page(self):
         if not self.file_list: return
-        self.push_undo()
         f = self.file_list[self.current_index]
-        if f[0] == 'pdf':
-            try:
-                r = analyze_pdf_layout(f[1], f[2])
-                self.pages_crops[self.current_index] = [{'rect':x, 'id':None, 'order':None, 'is_note': False} for x in r]
-                self.draw_overlays_only()
-            except Exception as e:
-                logging.warning("Auto-detect failed: %s", e)
+        try:
+            r = detect_page_layout(f)
+            new_crops = [self.make_crop(x) for x in r]
+            self.execute(ReplacePage(self.current_index, self.get_current_page_crops(), new_crops))
+            self.draw_overlays_only()
+            self.status_bar.showMessage(tr("detect_msg").format(len(r)) if r else tr("no_detect_msg"), 5000)
+        except Exception as e:
+            logging.warning("Auto-detect failed: %s", e)
 
     def auto_detect_batch(self):
         if not self.file_list: return
         text, ok = QInputDialog.getText(self, tr("auto_bulk"), tr("bulk_prompt").format(len(self.file_list)), text="2-{}".format(len(self.file_list)))
-        if ok and text:
-            try:
-                if '-' in text: s, e = map(int, text.split('-'))
-                else: s = e = int(text)
-                self.push_undo()
-                pd = QProgressDialog(tr("processing"), "Cancel", 0, e-s+1, self)
-                pd.setWindowModality(Qt.WindowModality.WindowModal)
-                cnt = 0
-                for i in range(s-1, e):
-                    if pd.wasCanceled(): break
-                    f = self.file_list[i]
-                    if f[0] == 'pdf':
-                        r = analyze_pdf_layout(f[1], f[2])
-                        self.pages_crops[i] = [{'rect':x, 'id':None, 'order':None, 'is_note': False} for x in r]
-                    cnt += 1; pd.setValue(cnt); QApplication.processEvents()
-                if (s-1) <= self.current_index < e: self.draw_overlays_only()
-            except Exception as e:
-                logging.warning("Auto-detect batch failed: %s", e)
+        pages = self.page_range(text) if ok and text else None
+        if pages:
+            self.run_page_batch(pages, lambda i: [self.make_crop(x) for x in detect_page_layout(self.file_list[i])])
+
+    def page_range(self, text):
+        """(start, end) 1-based pages from "start-end" or "n"; None, with a status message, if invalid."""
+        try:
+            if '-' in text: s, e = map(int, text.split('-'))
+            else: s = e = int(text)
+        except ValueError:
+            s = e = 0
+        if not 1 <= s <= e <= len(self.file_list):
+            self.status_bar.showMessage(tr("bad_page_range").format(text.strip(), len(self.file_list)), 5000)
+            return None
+        return s, e
+
+    def run_page_batch(self, pages, build):
+        """Replaces the crops of each page in the checked 1-based range pages with build(page)."""
+        self.scene.flush_geometry()
+        cmds = []
+        s, e = pages
+        try:
+            pd = QProgressDialog(tr("processing"), "Cancel", 0, e-s+1, self)
+            pd.setWindowModality(Qt.WindowModality.WindowModal)
+            cnt = 0
+            for i in range(s-1, e):
+                if pd.wasCanceled(): break
+                cmd = ReplacePage(i, self.pages_crops.get(i, []), build(i))
+                cmd.redo(self.pages_crops); cmds.append(cmd)
+                cnt += 1; pd.setValue(cnt); QApplication.processEvents()
+        except Exception as ex:
+            logging.warning("Batch over pages %s-%s failed: %s", s, e, ex)
+        finally:
+            # The whole range is one undo step, even when cancelled or failed half-way
+            if cmds:
+                self.history.push(CompoundCommand(cmds))
+                self.pages_changed({c.page for c in cmds})
+                self.update_undo_redo_buttons()
+                self.draw_overlays_only()
+
+    def capture_template(self):
+        crops = self.get_current_page_crops()
+        if not self.file_list or not crops:
+            self.status_bar.showMessage(tr("template_empty"), 5000)
+            return
+        w, h = page_scene_size(self.file_list[self.current_index])
+        self.crop_template = [(c.x / w, c.y / h, c.w / w, c.h / h, c.is_note) for c in crops]
+        self.status_bar.showMessage(tr("template_captured").format(len(crops)), 5000)
+
+    def apply_template_batch(self):
+        if not self.file_list: return
+        if not self.crop_template:
+            QMessageBox.information(self, tr("apply_template"), tr("template_empty"))
+            return
+        n = len(self.file_list)
+        first = self.current_index + 2 if self.current_index + 1 < n else 1
+        text, ok = QInputDialog.getText(self, tr("apply_template"), tr("bulk_prompt").format(n), text=f"{first}-{n}")
+        pages = self.page_range(text) if ok and text else None
+        if not pages: return
+        snap = QMessageBox.question(self, tr("apply_template"), tr("template_snap_prompt")) == QMessageBox.StandardButton.Yes
+        template = self.crop_template
+        # Stamped crops are auto-numbered; a stamped note attaches to the question before it
+        self.run_page_batch(pages, lambda i: [self.make_crop(r, None, None, is_note)
+                                             for r, is_note in stamp_template(self.file_list[i], template, snap)])
+
+    def link_to_bank(self):
+        """Renumbers every crop so the exported N.jpg matches question N of a parsed bank."""
+        if not self.file_list: return
+        f, _ = QFileDialog.getOpenFileName(self, tr("link_bank"), "", f"Banks (*.json {BANK_DB})")
+        if not f: return
+        try:
+            if os.path.basename(f) == BANK_DB:
+                with SqliteBankStore(os.path.dirname(f)) as store: bank = store.load_all()
+            else:
+                with open(f, 'r', encoding='utf-8') as fh: bank = json.load(fh)
+            self.scene.flush_geometry()
+            changes, report = link_crops(self.file_list, self.pages_crops, bank)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        cmds = []
+        for (page, idx), (gid, order) in sorted(changes.items()):
+            crop = self.pages_crops[page][idx]
+            cmds.append(ReplaceCrop(page, idx, crop, crop.replace(id=gid, order=order)))
+        if cmds:
+            self.execute(CompoundCommand(cmds))
+            self.draw_overlays_only()
+        lines = [tr("link_bank_done").format(len(cmds))]
+        for key, items in report.items():
+            if items:
+                shown = ", ".join(str(x) for x in items[:40])
+                lines.append(tr(f"link_{key}").format(len(items)) + "\n  " + shown + (" ..." if len(items) > 40 else ""))
+        QMessageBox.information(self, tr("link_bank"), "\n".join(lines))
 
     def navigate(self, d):
         n = self.current_index + d
+        if self.act_skip_dups.isChecked():
+            while n in self.duplicates: n += 1 if d > 0 else -1
         if 0 <= n < len(self.file_list):
             self.current_index = n
+            if self.session: self.session.record_meta(current=n)
             self.load_page(n, True)
             self.update_labels()
             
     def update_labels(self):
-        self.lbl_page_info.setText(f" {self.current_index+1} / {len(self.file_list)} ")
+        text = f" {self.current_index+1} / {len(self.file_list)} "
+        if self.current_index in self.duplicates:
+            text += tr("duplicate_of").format(self.duplicates[self.current_index] + 1) + " "
+        self.lbl_page_info.setText(text)
+
+    def start_duplicate_scan(self):
+        self.stop_duplicate_scan()
+        self.duplicates = {}
+        self._dup_generation += 1
+        if len(self.file_list) < 2: return
+        sources = [(t, o.name if t == 'pdf' else o, e) for t, o, e in self.file_list]
+        self.dup_worker = DuplicateScanWorker(sources, self._dup_generation)
+        self.dup_worker.progress_signal.connect(self.on_duplicate_progress)
+        self.dup_worker.finished_signal.connect(self.on_duplicates_found)
+        self.dup_worker.start()
+
+    def stop_duplicate_scan(self):
+        if self.dup_worker:
+            self.dup_worker.stop()
+            self.dup_worker.wait()
+            self.dup_worker = None
+
+    def on_duplicate_progress(self, done, total):
+        # Queued updates of a scan that was already replaced are dropped
+        if self.sender() is not self.dup_worker: return
+        self.status_bar.showMessage(tr("duplicates_scanning").format(done, total), 2000)
+
+    def on_duplicates_found(self, generation, duplicates):
+        if generation != self._dup_generation: return
+        self.duplicates = duplicates
+        if duplicates:
+            self.status_bar.showMessage(tr("duplicates_found").format(len(duplicates)), 8000)
+        self.update_labels()
 
     def load_page(self, idx, fit=False):
+        self.scene.flush_geometry()
         self.scene.clear()
+        self.crop_items = {}
         t, o, e = self.file_list[idx]
-        pix = load_pdf_page(o, e) if t == 'pdf' else load_image_file(o)
+        pix = self.page_cache.get((t, o, e))
         self.scene.addPixmap(pix)
         self.scene.setSceneRect(0, 0, pix.width(), pix.height())
         if fit: self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
         self.draw_overlays_only()
 
     def open_files_dialog(self):
-        f, _ = QFileDialog.getOpenFileNames(self, tr("open_files"), "", "Files (*.pdf *.png *.jpg)")
+        f, _ = QFileDialog.getOpenFileNames(self, tr("open_files"), "", "Files (*.pdf *.png *.jpg *.jpeg *.tif *.tiff)")
         if f: self.load_files(f)
+
+    def open_folder_dialog(self):
+        folder = QFileDialog.getExistingDirectory(self, tr("open_folder"))
+        if not folder: return
+        paths = list_image_folder(folder)
+        if paths: self.load_files(paths)
+        else: QMessageBox.information(self, tr("open_folder"), tr("folder_no_images"))
         
-    def load_files(self, paths):
-        self.file_list = []
-        for p in sorted(paths):
-            if p.lower().endswith('.pdf'):
-                d = fitz.open(p)
-                for i in range(len(d)): self.file_list.append(('pdf', d, i))
-            else: self.file_list.append(('img', p, None))
+    def load_files(self, paths, session_path=None):
+        paths = sorted(paths, key=natural_key)
+        self.file_list = build_file_list(paths)
+        self.page_cache.clear()
         if self.file_list:
-            self.current_index = 0
-            self.pages_crops = {}
-            self.undo_stack.clear()
-            self.load_page(0, True)
+            self.history.clear()
+            self.start_session(paths, session_path)
+            self.auto_ids = AutoIdIndex.from_pages(self.pages_crops, len(self.file_list))
+            self.update_undo_redo_buttons()
+            self.load_page(self.current_index, True)
+            self.start_duplicate_scan()
             self.update_labels()
 
+    def start_session(self, paths, session_path=None):
+        """Restores crops from the session file of these sources (asking first
+        for the autosave), then keeps autosaving to it."""
+        if self.session: self.session.close()
+        explicit = session_path is not None
+        session_path = session_path or default_session_path(paths)
+        pages, meta = {}, {}
+        if os.path.exists(session_path):
+            restored = False
+            try:
+                sources, pages, meta = load_session(session_path)
+            except (OSError, ValueError) as e:
+                logging.warning("Could not read session %s: %s", session_path, e)
+            else:
+                same = [s["path"] for s in sources] == [os.path.abspath(p) for p in paths]
+                restored = explicit or (same and (not any(pages.values()) or QMessageBox.question(
+                    self, tr("session_title"), tr("resume_session_prompt")) == QMessageBox.StandardButton.Yes))
+                if restored and changed_sources(sources):
+                    QMessageBox.warning(self, tr("session_title"), tr("session_sources_changed"))
+            if not restored:
+                # The new session starts with a snapshot at this path; keep the old one readable
+                pages, meta = {}, {}
+                try:
+                    bak = backup_session(session_path)
+                    self.status_bar.showMessage(tr("session_backup").format(bak), 8000)
+                except OSError as e:
+                    logging.warning("Could not move session %s aside: %s", session_path, e)
+                    self.session = None
+                    self.pages_crops = CropPages()
+                    self.current_index = 0
+                    return
+        self.pages_crops = CropPages({p: [row_crop(r) for r in rows]
+                                      for p, rows in pages.items() if p < len(self.file_list)})
+        self.current_index = min(max(0, meta.get("current", 0)), len(self.file_list) - 1)
+        self.open_journal(session_path, describe_sources(paths))
+
+    def open_journal(self, path, sources):
+        try:
+            self.session = SessionJournal(path, sources, {p: page_rows(c) for p, c in self.pages_crops.items()},
+                                          {"current": self.current_index})
+        except OSError as e:
+            logging.warning("Session autosave disabled: %s", e)
+            self.session = None
+
+    def open_session_dialog(self):
+        f, _ = QFileDialog.getOpenFileName(self, tr("open_session"), "", f"Sessions (*{SESSION_EXT})")
+        if not f: return
+        try:
+            sources, _, _ = load_session(f)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
+        missing = [s["path"] for s in sources if not os.path.exists(s["path"])]
+        if missing:
+            QMessageBox.critical(self, tr("session_title"), tr("session_missing_files").format("\n".join(missing)))
+            return
+        self.load_files([s["path"] for s in sources], session_path=f)
+
+    def save_session_dialog(self):
+        if not self.session: return
+        f, _ = QFileDialog.getSaveFileName(self, tr("save_session"), self.session.path, f"Sessions (*{SESSION_EXT})")
+        if not f: return
+        if not f.endswith(SESSION_EXT): f += SESSION_EXT
+        sources = self.session.sources
+        self.session.close()
+        self.open_journal(f, sources)
+        self.status_bar.showMessage(tr("session_saved").format(f), 5000)
+
     def load_single_image(self, path):
         self.file_list = [('img', path, None)]
+        self.page_cache.clear()
         self.current_index = 0
-        self.pages_crops = {}
-        self.undo_stack.clear()
+        self.pages_crops = CropPages()
+        self.auto_ids = AutoIdIndex(1)
+        self.history.clear()
+        self.update_undo_redo_buttons()
         self.load_page(0, True)
 
     def perform_save_direct(self):
@@ -336,28 +657,44 @@ class ImageCropperApp(QMainWindow):
         else:
             folder = QFileDialog.getExistingDirectory(self, tr("save"))
             if folder:
-                c = save_cropped_images_merged(self.file_list, self.pages_crops, folder, self.merge_alignment)
-                QMessageBox.information(self, tr("success_header"), tr("saved_msg").format(c))
+                derivatives = ConfigManager.get_config_value("export_derivatives", DEFAULT_DERIVATIVES)
+                c = save_cropped_images_merged(self.file_list, self.pages_crops, folder, self.merge_alignment,
+                                               self.export_format, self.act_capture_text.isChecked(), derivatives)
+                msg = tr("saved_msg").format(c)
+                if self.act_answer_key.isChecked():
+                    docs = list({id(o): o for t, o, _ in self.file_list if t == 'pdf'}.values())
+                    path, n = write_answer_key(folder, extract_documents_key(docs))
+                    msg += "\n" + tr("answer_key_msg").format(n, path)
+                QMessageBox.information(self, tr("success_header"), msg)
     
-    def push_undo(self):
-        self.undo_stack.append(copy.deepcopy(self.pages_crops))
-        if len(self.undo_stack) > 50:
-            self.undo_stack.pop(0)
-        self.redo_stack.clear()
+    def execute(self, cmd, merge=False):
+        self.scene.flush_geometry()  # a pending drag lands before (and apart from) this command
+        self.history.execute(cmd, self.pages_crops, merge)
+        self.pages_changed(cmd.pages_touched())
         self.update_undo_redo_buttons()
+
+    def pages_changed(self, pages):
+        """Refreshes per-page derived state after the crops of pages changed."""
+        for p in pages:
+            crops = self.pages_crops.get(p, ())
+            self.auto_ids.set_page(p, crops)
+            if self.session: self.session.record_page(p, page_rows(crops))
+
     def undo(self):
-        if self.undo_stack:
-            self.redo_stack.append(copy.deepcopy(self.pages_crops))
-            self.pages_crops = self.undo_stack.pop()
+        self.scene.flush_geometry()
+        touched = self.history.undo(self.pages_crops)
+        if touched is not None:
+            self.pages_changed(touched)
             self.update_undo_redo_buttons()
             self.draw_overlays_only()
     def redo(self):
-        if self.redo_stack:
-            self.undo_stack.append(copy.deepcopy(self.pages_crops))
-            self.pages_crops = self.redo_stack.pop()
+        self.scene.flush_geometry()
+        touched = self.history.redo(self.pages_crops)
+        if touched is not None:
+            self.pages_changed(touched)
             self.update_undo_redo_buttons()
             self.draw_overlays_only()
     def update_undo_redo_buttons(self):
-        self.act_undo.setEnabled(bool(self.undo_stack))
-        self.act_redo.setEnabled(bool(self.redo_stack))
+        self.act_undo.setEnabled(self.history.can_undo)
+        self.act_redo.setEnabled(self.history.can_redo)
 # --- END OF FILE ui/window.py ---
\ No newline at end of file